@@ -154,6 +154,12 @@ def configRead():
     metaInfo.cacheDirectory     = metaInfo.cmdOpts.cacheDir or config.get('FileNames','cache_dir',defCacheDir)
     if metaInfo.cmdOpts.cache is None: metaInfo.useCache = config.getBool('Process','cache',True)
     else: metaInfo.useCache = metaInfo.cmdOpts.cache
+    metaInfo.cacheBackend       = metaInfo.cmdOpts.cacheBackend or config.get('Process','cache_backend','files')
+    hypercore.cache.cache.precheck = config.getBool('Process','cache_precheck',True)
+    hypercore.cache.contents.budget = config.getInt('Process','content_cache_size',64)*1024*1024
+    hypercore.cache.contents.mapsize = config.getInt('Process','mmap_size',100)*1024*1024
+    if metaInfo.cmdOpts.incremental is None: metaInfo.incremental = config.getBool('Process','incremental',True)
+    else: metaInfo.incremental = metaInfo.cmdOpts.incremental
     metaInfo.htmlDir            = metaInfo.cmdOpts.htmlDir or config.get('FileNames','htmlDir',os.path.split(sys.argv[0])[0] + os.sep + "html" + os.sep)
     metaInfo.css_file           = config.get('FileNames','css_file','hypersql.css')
     metaInfo.css_url            = config.get('FileNames','css_url','')
@@ -194,6 +200,15 @@ def configRead():
         metaInfo.scanInString = config.getBool('Process','whereused_scan_instring')
     else:
         metaInfo.scanInString = metaInfo.cmdOpts.scanInString
+    metaInfo.scanEngine = metaInfo.cmdOpts.scanEngine or config.get('Process','whereused_scan_engine','regex').lower()
+    if metaInfo.scanEngine not in ['regex','token']:
+        metaInfo.scanEngine = 'regex'
+    if metaInfo.cmdOpts.jobs is None:
+        metaInfo.jobs = config.getInt('Process','jobs',1)
+    else: metaInfo.jobs = metaInfo.cmdOpts.jobs
+    if metaInfo.jobs < 1:
+        from multiprocessing import cpu_count
+        metaInfo.jobs = cpu_count()
     # Section VERIFICATION
     JavaDocVars['javadoc_mandatory'] = config.getBool('Verification','javadoc_mandatory',False)
     JavaDocVars['javadoc_mandatory_objects'] = config.getList('Verification','javadoc_mandatory_objects',['func','proc','pkg'])
@@ -217,6 +232,9 @@ def configRead():
     metaInfo.graphLenNeato = metaInfo.cmdOpts.len_neato or config.get('DepGraph','len_neato','')
     metaInfo.graphLenFdp = metaInfo.cmdOpts.len_fdp or config.get('DepGraph','len_fdp','')
     metaInfo.graphDistCirco = metaInfo.cmdOpts.mindist_circo or config.get('DepGraph','mindist_circo','')
+    if metaInfo.cmdOpts.graphvizTimeout is None:
+        metaInfo.graphTimeout = config.getInt('DepGraph','timeout',0)
+    else: metaInfo.graphTimeout = metaInfo.cmdOpts.graphvizTimeout
     metaInfo.depGraphObjects = metaInfo.cmdOpts.depObjects or config.getList('DepGraph','objects',['view','pkg','proc','func'])
     metaInfo.makeDepGraph = {}
     metaInfo.makeDepGraph['file2file']     = config.getBool('DepGraph','file2file',True)
@@ -237,6 +255,13 @@ def configRead():
     if metaInfo.makeDepGraph['object2file']:   metaInfo.depGraphCount += 1
     if metaInfo.makeDepGraph['object2object']: metaInfo.depGraphCount += 1
     metaInfo.depGraphDelTmp = config.getBool('DepGraph','deltmp',True)
+    if metaInfo.cmdOpts.subgraphDepth is None:
+        metaInfo.depGraphSubDepth = config.getInt('DepGraph','subgraph_depth',0)
+    else: metaInfo.depGraphSubDepth = metaInfo.cmdOpts.subgraphDepth
+    metaInfo.depGraphSubObjects = config.getList('DepGraph','subgraph_objects',['pkg','view'])
+    hypercore.cache.keep['depgraph'] = config.getInt('DepGraph','cache_days',30)
+    metaInfo.graphFormat = metaInfo.cmdOpts.graphFormat or config.get('DepGraph','format','png').lower()
+    metaInfo.graphLayouts = [fmt.lower() for fmt in config.getList('DepGraph','layout',[]) if fmt] # both checked in main (with logging set up)
     # Section LOGGING
     if metaInfo.cmdOpts.progress is None:
         metaInfo.printProgress = config.getBool('Logging','progress',True)
@@ -292,9 +317,6 @@ def configRead():
 #------------------------------------------------------------------------------
 def confDeps():
     """ Check dependent options and fix them, if necessary """
-    if metaInfo.indexPage['depgraph']!='':
-        dg = depgraph()
-        if not dg.deps_ok: metaInfo.indexPage['depgraph'] = ''
     if metaInfo.cmdOpts.cron:
         metaInfo.cmdOpts.screenLogLevel = 'ERROR'
         metaInfo.printProgress = False
@@ -375,6 +397,26 @@ if __name__ == "__main__":
       logger.info(_('where_used shortref scan enabled'))
     else:
       logger.info(_('where_used shortref scan disabled'))
+    if metaInfo.cacheBackend not in hypercore.cache.backends:
+      logger.warn(_('Unknown cache backend "%s", using the files cache backend'), metaInfo.cacheBackend)
+      metaInfo.cacheBackend = 'files'
+    elif metaInfo.cacheBackend == 'sqlite' and hypercore.cache.sqlite3 is None:
+      logger.warn(_('SQLite is not available, using the files cache backend'))
+      metaInfo.cacheBackend = 'files'
+    if metaInfo.graphFormat not in ['png','svg']:
+      logger.warn(_('Unsupported graph format "%s", using png'), metaInfo.graphFormat)
+      metaInfo.graphFormat = 'png'
+    for fmt in [fmt for fmt in metaInfo.graphLayouts if fmt not in ['plain','json']]:
+      logger.warn(_('Unsupported graph layout "%s", ignored'), fmt)
+      metaInfo.graphLayouts.remove(fmt)
+    if metaInfo.indexPage['depgraph']!='' and metaInfo.graphvizMod!='builtin' and not depgraph(metaInfo.graphvizMod).deps_ok():
+      logger.warn(_('Graphviz (%s) not found, using the built-in layout'), metaInfo.graphvizMod)
+      metaInfo.graphvizMod = 'builtin'
+    if metaInfo.graphvizMod == 'builtin': # it only draws SVG, and has no layout output
+      if metaInfo.graphLayouts:
+        logger.warn(_('The built-in layout writes no layout output, ignoring the layout setting'))
+      metaInfo.graphFormat = 'svg'
+      metaInfo.graphLayouts = []
 
     top_level_directory = metaInfo.topLevelDirectory
     if not os.path.exists(top_level_directory):
@@ -431,6 +473,9 @@ if __name__ == "__main__":
     CreateHyperlinkedSourceFilePages()
     CreateUnitTests()
 
+    logger.info(_('%(written)d pages written, %(unchanged)d pages unchanged'), {'written':HTMLPage.written, 'unchanged':HTMLPage.unchanged})
+    for ctype in sorted(hypercore.cache.stats.keys()):
+        logger.info(_('Cache %(ctype)s: %(hits)d hits, %(misses)d misses'), {'ctype':ctype, 'hits':hypercore.cache.stats[ctype]['hits'], 'misses':hypercore.cache.stats[ctype]['misses']})
     logger.info('Processed %s total lines: %s empty, %s plain comments, %s plain code, %s mixed', \
         metaInfo.getLoc('totals'), metaInfo.getLoc('empty'), metaInfo.getLoc('comment'), metaInfo.getLoc('code'), \
         metaInfo.getLoc('totals') - metaInfo.getLoc('empty') - metaInfo.getLoc('comment') - metaInfo.getLoc('code'))
@@ -7,7 +7,7 @@ $Id$
 Example usage:
 
 g = depgraph()
-if g.deps_ok:
+if g.deps_ok():
   g.set_graph('a -> b\nb -> c')
   #g.set_graph(['a -> b','b -> c'])
   g.make_graph('ab.png','png','Vera')
@@ -19,7 +19,10 @@ from iz_tools.system import *
 from hypercore.gettext_init import langpath, langs
 from os import sep as os_sep, path as os_path, access as os_access, unlink as os_unlink
 from tempfile import NamedTemporaryFile
+from hashlib import md5
+from copy import copy
 from hypercore.logger import logg
+from layeredgraph import parse_dot, make_svg
 logger = logg.getLogger('DepGraph')
 
 # Setup gettext support
@@ -58,6 +61,8 @@ class depgraph(object):
         self.len_neato = '' # 'rank separator' for neato
         self.len_fdp = '' # 'rank separator' for fdp
         self.mindist_circo = '' # 'rank separator' for circo
+        self.timeout = 0  # max seconds for graphviz to draw a graph (0 = no limit)
+        self.fallback = None # depgraph object to draw with if graphviz exceeds the timeout
         self.deltmp = deltmp
         self.set_mod(mod)
         self.set_charset(charset)
@@ -211,6 +216,58 @@ class depgraph(object):
         if x==0 or y==0: self.size = ''
         else: self.size = `x`+','+`y`
 
+    def set_timeout(self,seconds):
+        """
+        Limit the time graphviz may take to draw a graph
+        Without that, we wait until graphviz is done.
+        @param self
+        @param int seconds max seconds per graph, or 0 to reset
+        """
+        if not is_int(seconds):
+            logger.error(_('%(func)s was called with wrong parameter type: required: [%(req)s], given: [%(got)s]'), {'func':'depgraph.set_timeout','req':'int','got':','.join(is_what(seconds))})
+            return
+        self.timeout = seconds
+
+    def set_fallback(self,dg):
+        """
+        Setup another depgraph object to draw the graph with if graphviz does
+        not finish within the timeout (see set_timeout)
+        @param self
+        @param mixed dg depgraph object (e.g. pydepgraph), or None to reset
+        """
+        self.fallback = dg
+
+    def get_props(self,ftype='png'):
+        """
+        Obtain the command line options to pass to graphviz with the current settings
+        @param self
+        @param string ftype graphics type (see make_graph)
+        @return string props
+        """
+        props = ' -T'+ftype+' -Nstyle=filled'
+        if self.fontname!='': props += ' -Nfontname="'+self.fontname+'"'
+        if self.fontsize!='': props += ' -Nfontsize="'+str(self.fontsize)+'"'
+        if self.size!='': props += ' -Gsize="'+self.size+'"'
+        if self.mod == 'fdp' and self.len_fdp != '': props += ' -Elen='+str(self.len_fdp)
+        elif self.mod == 'neato' and self.len_neato != '': props += ' -Elen='+str(self.len_neato)
+        elif self.mod == 'dot' and self.ranksep_dot != '': props += ' -Granksep='+str(self.ranksep_dot)
+        elif self.mod == 'twopi' and self.ranksep_twopi != '': props += ' -Granksep='+str(self.ranksep_twopi)
+        elif self.mod == 'circo' and self.mindist_circo != '': props += ' -Gmindist='+str(self.mindist_circo)
+        if self.charset!='': props += ' -Gcharset="'+self.charset+'"'
+        return props
+
+    def get_key(self,ftype='png'):
+        """
+        Obtain a key identifying the graph (i.e. its definition) along with the
+        settings it is drawn with - e.g. to cache the resulting image by
+        @param self
+        @param string ftype graphics type (see make_graph)
+        @return string key (MD5 hex digest)
+        """
+        graph = self.graph
+        if isinstance(graph,unicode): graph = graph.encode('utf-8')
+        return md5(self.mod + self.get_props(ftype) + '\n' + graph).hexdigest()
+
     def make_graph(self,fname,ftype='png'):
         """
         Create the dependency graph as a file named fname of the type ftype
@@ -235,18 +292,78 @@ class depgraph(object):
         outfile.write( 'digraph ' + self.name + '{\n' + self.graph +'\n}\n' )
         outfile.close()
         # Call graphviz to generate the image
-        props = ' -T'+ftype+' -Nstyle=filled'
+        props = self.get_props(ftype)
         parms = ' -o '+fname+' '+tmpname
-        if self.fontname!='': props += ' -Nfontname="'+self.fontname+'"'
-        if self.fontsize!='': props += ' -Nfontsize="'+self.fontsize+'"'
-        if self.size!='': props += ' -Gsize="'+self.size+'"'
-        if self.mod == 'fdp' and self.len_fdp != '': props += ' -Elen='+self.len_fdp
-        elif self.mod == 'neato' and self.len_neato != '': props += ' -Elen='+self.len_neato
-        elif self.mod == 'dot' and self.ranksep_dot != '': props += ' -Granksep='+self.ranksep_dot
-        elif self.mod == 'twopi' and self.ranksep_twopi != '': props += ' -Granksep='+self.ranksep_twopi
-        elif self.mod == 'circo' and self.mindist_circo != '': props += ' -Gmindist='+self.mindist_twopi
-        if self.charset!='': props += ' -Gcharset="'+self.charset+'"'
-        out,err = popen( self.bin + props + parms )
         logger.debug('calling "'+self.bin + props + parms +'"')
+        try:
+            out,err = popen( self.bin + props + parms, self.timeout )
+        except ProcessTimeout:
+            err = _('%(mod)s did not finish within %(secs)d seconds') % {'mod':self.mod, 'secs':self.timeout}
+            if self.fallback is not None:
+                dg = copy(self.fallback)
+                dg.set_graph(self.graph)
+                if dg.make_graph(fname,ftype) == '':
+                    err += ' - ' + _('used the %s layout instead') % dg.mod
         if self.deltmp: os_unlink(tmpname)
         return err
+
+
+#=======================================================[ PyDepGraph class ]===
+class pydepgraph(depgraph):
+    """
+    Generate dependency graphs with the built-in layered layout (see the
+    layeredgraph module) - no external application required. Only SVG output
+    is supported; of the rank separators, the one for dot is used.
+    """
+
+    def __init__(self,charset='utf-8',deltmp=True):
+        """
+        Create the instance
+        @param self
+        @param optional string charset charset to use (see set_charset). Default: 'utf-8'
+        @param optional boolean deltmp Whether to delete the temporary graph definition file. Default: True
+        """
+        depgraph.__init__(self,'builtin',charset,deltmp)
+
+    def set_mod(self,mod='builtin'):
+        """
+        There is only the built-in module to use
+        @param self
+        @param optional string mod ignored
+        """
+        self.bin = ''
+        self.mod = 'builtin'
+
+    def get_props(self,ftype='svg'):
+        """
+        Obtain the settings the graph is drawn with (see depgraph.get_key)
+        @param self
+        @param string ftype graphics type (see make_graph)
+        @return string props
+        """
+        return ' -T%s -Nfontname="%s" -Nfontsize="%s" -Granksep=%s' % (ftype, self.fontname, self.fontsize, self.ranksep_dot)
+
+    def make_graph(self,fname,ftype='svg'):
+        """
+        Create the dependency graph as a file named fname
+        @param self
+        @param string fname name of the graphics file to create
+        @param optional string ftype graphics type. Only 'svg' is supported.
+        @return string error message (if any - otherwise empty string)
+        """
+        if ftype != 'svg':
+            return _('the built-in layout only supports SVG, not %s') % ftype
+        if self.graph == '':
+            logger.error(_('make_graph() called on an empty graph!'))
+            return
+        if not self.deltmp:
+            outfile = fopen(fname + '.tmp','w')
+            outfile.write( 'digraph ' + self.name + '{\n' + self.graph +'\n}\n' )
+            outfile.close()
+        nodes, edges = parse_dot(self.graph)
+        svg = make_svg(nodes, edges, self.fontname, self.fontsize, self.ranksep_dot)
+        if isinstance(svg,unicode): svg = svg.encode('utf-8')
+        outfile = open(fname,'wb')
+        outfile.write(svg)
+        outfile.close()
+        return ''
@@ -6,6 +6,8 @@ __revision__ = '$Id$'
 import time # for makeHTMLFooter
 from os import path as os_path # for getDualCodeLink, purge_html, CreateIndexPage, MakeFileIndex, CreateDepGraphIndex
 from os import listdir,unlink  # for purge_html
+import re, codecs              # for HTMLPage
+from hashlib import md5        # for HTMLPage, CreateDepGraphIndex
 from hypercore.elements import metaInfo
 from progress import *
 from iz_tools.system import fopen
@@ -24,6 +26,65 @@ from hypercore.logger import logg
 logname = 'GenHTML'
 logger = logg.getLogger('GenHTML')
 
+#============================================================[ page output ]===
+#------------------------------------------------------------------------------
+class HTMLPage(object):
+    """
+    File-like object to write a generated page to. The content is collected
+    until the page is closed, and only written to disk if it differs from the
+    page already there - so unchanged pages keep their mtime (which keeps
+    rsync and HTTP caching effective). For this, each page carries a
+    fingerprint of its content (not counting the "generated at" time stamp)
+    in a trailing HTML comment.
+    """
+    written   = 0 # statistics: pages written
+    unchanged = 0 # statistics: pages left untouched
+    marker    = '<!-- HyperSQL page fingerprint: %s -->\n'
+    timestamp = re.compile(r"(<DIV ID='generated'>[^<]*<A [^>]*>[^<]*</A>[^<]*?) at [^<]*</DIV>")
+
+    def __init__(self,fname,enc=None):
+        """
+        Setup the page
+        @param self
+        @param string fname name of the file to write the page to
+        @param optional string enc encoding to use (default: metaInfo.encoding)
+        """
+        self.fname  = fname
+        self.encode = codecs.getencoder(enc or metaInfo.encoding)
+        self.parts  = []
+
+    def write(self,content):
+        """
+        Add content to the page (encoded right away, so encoding errors are
+        raised here just as with a file opened via fopen)
+        @param self
+        @param string content
+        """
+        self.parts.append(self.encode(content)[0])
+
+    def close(self):
+        """
+        Write the page to disk - unless an identical copy is already there
+        @param self
+        """
+        content = ''.join(self.parts)
+        self.parts = []
+        fprint = self.marker % md5(self.timestamp.sub(r'\1</DIV>',content)).hexdigest()
+        if os_path.isfile(self.fname) and os_path.getsize(self.fname) >= len(fprint):
+            infile = open(self.fname,'rb')
+            infile.seek(-len(fprint),2)
+            same = infile.read() == fprint
+            infile.close()
+            if same:
+                HTMLPage.unchanged += 1
+                return
+        outfile = open(self.fname,'wb')
+        outfile.write(content)
+        outfile.write('\n' + fprint)
+        outfile.close()
+        HTMLPage.written += 1
+
+
 #=====================================================[ directory handling ]===
 #------------------------------------------------------------------------------
 def CreateDirectories():
@@ -65,7 +126,7 @@ def CleanRemovedFromCache():
     if metaInfo.useCache:
         printProgress(_('Checking cache for copies of already deleted/moved files'), logname)
         import hypercore.cache
-        cache = hypercore.cache.cache(metaInfo.cacheDirectory)
+        cache = hypercore.cache.getCache(metaInfo.cacheDirectory,metaInfo.cacheBackend)
         dc    = cache.removeObsolete(metaInfo.topLevelDirectory)
         logger.info(_('%s obsolete files removed from cache'), dc)
 
@@ -73,7 +134,8 @@ def CleanRemovedFromCache():
 #------------------------------------------------------------------------------
 def purge_cache():
     if metaInfo.cmdOpts.purge_cache is not None:
-        cache = hypercore.cache.cache(metaInfo.cacheDirectory)
+        import hypercore.cache
+        cache = hypercore.cache.getCache(metaInfo.cacheDirectory,metaInfo.cacheBackend)
         for name in metaInfo.cmdOpts.purge_cache: cache.clear(name)
     CleanRemovedFromCache()
 
@@ -290,7 +352,7 @@ def CreateIndexPage():
 
     from iz_tools.system import fopen
 
-    outfile = fopen(os_path.join(metaInfo.htmlDir,'index.html'), 'w', metaInfo.encoding)
+    outfile = HTMLPage(os_path.join(metaInfo.htmlDir,'index.html'))
     outfile.write(MakeHTMLHeader('Index'))
 
     outfile.write('<H1 ID="infotitle">' + metaInfo.title_prefix + ' '+_('HyperSQL Reference')+'</H1>\n')
@@ -321,7 +383,7 @@ def MakeFileIndex(objectType):
     if metaInfo.indexPage[objectType] == '':  # this index is disabled
         return
 
-    outfile = fopen(os_path.join(metaInfo.htmlDir,metaInfo.indexPage[objectType]), "w", metaInfo.encoding)
+    outfile = HTMLPage(os_path.join(metaInfo.htmlDir,metaInfo.indexPage[objectType]))
     outfile.write(MakeHTMLHeader(objectType))
 
     if objectType == 'file':
@@ -362,87 +424,191 @@ def MakeFileIndex(objectType):
     outfile.close()
 
 
+#------------------------------------------------------------------------------
+# pan/zoom for the dependency graph page (see CreateDepGraphIndex)
+graphViewer = """<SCRIPT TYPE="text/javascript">//<![CDATA[
+(function() {
+  var view = document.getElementById('depview'), img = document.getElementById('depimg');
+  var scale = 1, x = 0, y = 0, drag = null;
+  function apply() { img.style.transform = 'translate('+x+'px,'+y+'px) scale('+scale+')'; }
+  function reset() { scale = Math.min(1, view.clientWidth / (img.naturalWidth || view.clientWidth)); x = 0; y = 0; apply(); }
+  view.onwheel = function(e) {
+    e.preventDefault();
+    var r = view.getBoundingClientRect(), mx = e.clientX - r.left, my = e.clientY - r.top;
+    var f = e.deltaY < 0 ? 1.25 : 0.8;
+    x = mx - (mx - x) * f; y = my - (my - y) * f; scale *= f; apply();
+  };
+  view.onmousedown = function(e) { e.preventDefault(); drag = [e.clientX - x, e.clientY - y]; };
+  document.onmousemove = function(e) { if (drag) { x = e.clientX - drag[0]; y = e.clientY - drag[1]; apply(); } };
+  document.onmouseup = function() { drag = null; };
+  view.ondblclick = reset;
+  img.onload = reset;
+  if (img.complete) reset();
+})();
+//]]></SCRIPT>
+"""
+
 #------------------------------------------------------------------------------
 def CreateDepGraphIndex():
     """ Generate the depgraphs and their index page """
 
-    from depgraph import depgraph
-    from shutil import copy2
+    from depgraph import depgraph, pydepgraph
+    from copy import copy
+    from multiprocessing.pool import ThreadPool
     if metaInfo.useCache: import hypercore.cache
 
     if metaInfo.indexPage['depgraph']=='':
         return
 
-    g = depgraph(metaInfo.graphvizMod, metaInfo.encoding, metaInfo.depGraphDelTmp)
-    if not g.deps_ok: # we cannot do anything
+    if metaInfo.graphvizMod == 'builtin':
+        g = pydepgraph(metaInfo.encoding, metaInfo.depGraphDelTmp)
+    else:
+        g = depgraph(metaInfo.graphvizMod, metaInfo.encoding, metaInfo.depGraphDelTmp)
+    if not g.deps_ok(): # we cannot do anything
         logger.error(_('Graphviz trouble - unable to generate the graph'))
         return
 
-    i = 0
-    pbarInit(_('Creating dependency graphs'), i, metaInfo.depGraphCount, logname)
-
-    g.set_fontname(metaInfo.fontName)
-    g.set_fontsize(metaInfo.fontSize)
-    g.set_ranksep(metaInfo.graphRankSepDot,'dot')
-    g.set_ranksep(metaInfo.graphRankSepTwopi,'twopi')
-    g.set_ranksep(metaInfo.graphLenFdp,'fdp')
-    g.set_ranksep(metaInfo.graphLenNeato,'neato')
-    g.set_ranksep(metaInfo.graphDistCirco,'circo')
+    # objects to draw their neighbourhood for
+    if metaInfo.depGraphSubDepth > 0:
+        subnodes = metaInfo.depGraph.getNodes('object2object',metaInfo.depGraphSubObjects)
+    else: subnodes = []
 
-    if metaInfo.useCache: cache = hypercore.cache.cache(metaInfo.cacheDirectory)
+    # the image, plus the layout outputs (if any)
+    formats = [metaInfo.graphFormat] + [fmt for fmt in metaInfo.graphLayouts if fmt != metaInfo.graphFormat]
 
-    def makePng(gtyp,i):
+    i = 0
+    pbarInit(_('Creating dependency graphs'), i, (metaInfo.depGraphCount + len(subnodes)) * len(formats), logname)
+
+    # SVG graphs Graphviz fails to draw in time are drawn with the built-in layout
+    engines = [g]
+    if g.mod != 'builtin' and metaInfo.graphTimeout and metaInfo.graphFormat == 'svg':
+        engines.append(pydepgraph(metaInfo.encoding, True))
+    for dg in engines:
+        dg.set_fontname(metaInfo.fontName)
+        dg.set_fontsize(metaInfo.fontSize)
+        dg.set_ranksep(metaInfo.graphRankSepDot,'dot')
+        dg.set_ranksep(metaInfo.graphRankSepTwopi,'twopi')
+        dg.set_ranksep(metaInfo.graphLenFdp,'fdp')
+        dg.set_ranksep(metaInfo.graphLenNeato,'neato')
+        dg.set_ranksep(metaInfo.graphDistCirco,'circo')
+    g.set_timeout(metaInfo.graphTimeout)
+    if len(engines) > 1: g.set_fallback(engines[1])
+
+    if metaInfo.useCache: cache = hypercore.cache.getCache(metaInfo.cacheDirectory,metaInfo.cacheBackend)
+
+    def prepare(gname,data):
+        """
+        Setup a graph to draw in all formats (with a copy of the depgraph object,
+        so multiple graphs can be drawn in parallel) - except for those found in
+        the cache for the very same definition and settings
+        @param string gname name of the graph file (without extension)
+        @param string data DOT text of the graph
+        @return list of tuples (fname, object dg, string key, string ftype) of the
+                graph files to draw
         """
-        Create the graph file
+        dg = copy(g)
+        dg.set_graph(data)
+        tasks = []
+        for ftype in formats:
+            fname = gname + '.' + ftype
+            key = dg.get_key(ftype)
+            if metaInfo.useCache:
+                try:
+                    if cache.getFile(key,'depgraph',os_path.join(metaInfo.htmlDir,fname)): continue
+                except:
+                    logger.error(_('Error while copying %s from cache'), fname)
+            tasks.append((fname, dg, key, ftype))
+        return tasks
+
+    def prepareGraph(gtyp):
+        """
+        Check whether a graph needs to be drawn (see prepare)
         @param string gtyp which depGraph to process (file2file, file2object...)
+        @return list of tuples (fname, dg, key, ftype) of the graph files to draw
+        """
+        if metaInfo.depGraph.count(gtyp):
+            return prepare('depgraph_'+gtyp, metaInfo.depGraph.getDot(gtyp,metaInfo.colors))
+        else: # no data, no graph
+            if gtyp=='file2file': name = _('file to file')
+            elif gtyp=='file2object': name = _('file to object')
+            elif gtyp=='object2file': name = _('object to file')
+            elif gtyp=='object2object': name = _('object to object')
+            else: name = _('unknown dependency graph type')
+            logger.debug(_('No dependency data for %s'), name)
+        return []
+
+    def subgraphName(name):
+        """
+        Obtain the name of the neighbourhood graph for an object
+        @param string name node name of the object
+        @return string gname name of the graph file (without extension)
+        """
+        if isinstance(name,unicode): name = name.encode('utf-8')
+        return 'depgraph_o2o_' + md5(name).hexdigest()[:12]
+
+    def prepareSubgraph(name):
         """
-        if metaInfo.makeDepGraph[gtyp]:
-            if metaInfo.depGraph[gtyp]:
-                gname = 'depgraph_'+gtyp+'.png'
-                # check the cache first
-                done = False
-                if metaInfo.useCache:
-                    tmp = cache.get(gtyp,'depdata').split('\n')
-                    if tmp==metaInfo.depGraph[gtyp]:
-                        try:
-                          copy2(os_path.join(metaInfo.cacheDirectory,gname), os_path.join(metaInfo.htmlDir,gname))
-                          done = True
-                        except:
-                          logger.error(_('Error while copying %s from cache'), gname)
-                if not done:
-                    g.set_graph(metaInfo.depGraph[gtyp])
-                    res = g.make_graph(metaInfo.htmlDir + gname)
-                    if res=='':
-                        if metaInfo.useCache:
-                          try:
-                            cache.put(gtyp,'depdata','\n'.join(metaInfo.depGraph[gtyp]))
-                            copy2(os_path.join(metaInfo.htmlDir,gname), os_path.join(metaInfo.cacheDirectory,gname))
-                          except:
-                            logger.error(_('Error while copying %s to cache'), gname)
-                    else:
-                        logger.error(_('Graphviz threw an error:') + res.strip())
-            else: # no data, no graph
-                if gtyp=='file2file': name = _('file to file')
-                elif gtyp=='file2object': name = _('file to object')
-                elif gtyp=='object2file': name = _('object to file')
-                elif gtyp=='object2object': name = _('object to object')
-                else: name = _('unknown dependency graph type')
-                logger.debug(_('No dependency data for %s'), name)
-            i += 1
-            pbarUpdate(i)
-        return i
-                
-    # draw the graphs
-    i = makePng('file2file',i)
-    i = makePng('file2object',i)
-    i = makePng('object2file',i)
-    i = makePng('object2object',i)
-
-    outfile = fopen(os_path.join(metaInfo.htmlDir,metaInfo.indexPage['depgraph']), "w", metaInfo.encoding)
+        Collect the neighbourhood graph of an object, and check whether it needs
+        to be drawn (see prepare)
+        @param string name node name of the object
+        @return list of tuples (fname, dg, key, ftype) of the graph files to draw
+        """
+        data = metaInfo.depGraph.getNeighbourhood('object2object',name,metaInfo.depGraphSubDepth,metaInfo.colors)
+        return prepare(subgraphName(name), data)
+
+    def drawGraph(task):
+        """
+        Draw a graph
+        @param tuple task (fname, dg, key, ftype) as returned by prepare
+        @return tuple (task, string error) with error being the stderr from graphviz
+        """
+        fname, dg, key, ftype = task
+        return task, dg.make_graph(metaInfo.htmlDir + fname, ftype)
+
+    # check which graphs need to be drawn
+    tasks = []
+    for gtyp in ['file2file','file2object','object2file','object2object']:
+        if not metaInfo.makeDepGraph[gtyp]: continue
+        todo = prepareGraph(gtyp)
+        tasks += todo
+        i += len(formats) - len(todo)
+        pbarUpdate(i)
+    for name in subnodes:
+        todo = prepareSubgraph(name)
+        tasks += todo
+        i += len(formats) - len(todo)
+        pbarUpdate(i)
+
+    # draw the graphs: graphviz runs in separate processes, so we just need threads to wait for them
+    # (the built-in layout does not profit from them, but does not suffer either)
+    if metaInfo.jobs > 1 and len(tasks) > 1:
+        pool = ThreadPool(min(metaInfo.jobs,len(tasks)))
+        results = pool.imap_unordered(drawGraph,tasks)
+    else:
+        pool = None
+        results = (drawGraph(task) for task in tasks)
+    for task, res in results:
+        fname, dg, key, ftype = task
+        if res=='':
+            if metaInfo.useCache:
+              try:
+                cache.putFile(key,'depgraph',os_path.join(metaInfo.htmlDir,fname))
+              except:
+                logger.error(_('Error while copying %s to cache'), fname)
+        else:
+            logger.error(_('Graphviz threw an error:') + res.strip())
+        i += 1
+        pbarUpdate(i)
+    if pool:
+        pool.close()
+        pool.join()
+
+    outfile = HTMLPage(os_path.join(metaInfo.htmlDir,metaInfo.indexPage['depgraph']))
     outfile.write(MakeHTMLHeader('depgraph'))
     outfile.write("<H1>"+_('Dependency Graph')+"</H1>\n")
 
-    sel = _('Access from') + " <SELECT NAME=\"graph\" onChange=\"document.getElementById('depimg').src='depgraph_'+this.value+'.png';\">"
+    ext = '.' + metaInfo.graphFormat
+    sel = _('Access from') + " <SELECT NAME=\"graph\" onChange=\"document.getElementById('depimg').src='depgraph_'+this.value+'"+ext+"';\">"
     if metaInfo.makeDepGraph['file2file']:
         sel += "<OPTION VALUE='file2file'>" + _("file to file") + "</OPTION>"
     if metaInfo.makeDepGraph['file2object']:
@@ -452,13 +618,26 @@ def CreateDepGraphIndex():
     if metaInfo.makeDepGraph['object2object']:
         sel += "<OPTION VALUE='object2object'>" + _("object to object") + "</OPTION>"
     sel += "</SELECT><BR>"
+    if subnodes:
+        sel += _('Neighbourhood of') + " <SELECT NAME=\"subgraph\" onChange=\"document.getElementById('depimg').src=this.value;\">"
+        for name in subnodes:
+            sel += "<OPTION VALUE='" + subgraphName(name) + ext + "'>" + metaInfo.depGraph.getLabel(name) + "</OPTION>"
+        sel += "</SELECT><BR>"
 
+    defsrc = ''
     for obj in ['file2file','file2object','object2file','object2object']:
         if metaInfo.makeDepGraph[obj]:
-            defsrc = 'depgraph_' + obj
+            defsrc = 'depgraph_' + obj + ext
             break;
+    if not defsrc and subnodes: defsrc = subgraphName(subnodes[0]) + ext
 
-    outfile.write('<DIV ALIGN="center">\n' + sel + '\n<IMG ID="depimg" SRC="'+ defsrc + '.png" ALT="'+_('Dependency Graph')+'" ALIGN="center">\n</DIV>\n')
+    if metaInfo.graphFormat == 'svg': # large vector graphics: let the browser zoom and pan
+        outfile.write('<DIV ALIGN="center">\n' + sel + '</DIV>\n')
+        outfile.write('<DIV ID="depview" STYLE="position:relative;overflow:hidden;height:80vh;border:1px solid #ccc;cursor:move;" TITLE="'+_('Zoom with the mouse wheel, move by dragging, double-click to reset')+'">\n'
+            + '<IMG ID="depimg" SRC="'+ defsrc + '" ALT="'+_('Dependency Graph')+'" STYLE="position:absolute;left:0;top:0;transform-origin:0 0;">\n</DIV>\n')
+        outfile.write(graphViewer)
+    else:
+        outfile.write('<DIV ALIGN="center">\n' + sel + '\n<IMG ID="depimg" SRC="'+ defsrc + '" ALT="'+_('Dependency Graph')+'" ALIGN="center">\n</DIV>\n')
 
     outfile.write(MakeHTMLFooter('depgraph'))
     outfile.close()
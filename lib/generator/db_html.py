@@ -8,7 +8,7 @@ import time # for makeHTMLFooter
 import os
 from hypercore.elements import metaInfo
 from hypercore.javadoc import JavaDocVars
-from .commonhtml import getDualCodeLink,makeDualCodeRef,makeUsageCol,MakeHTMLHeader,MakeHTMLFooter
+from .commonhtml import getDualCodeLink,makeDualCodeRef,makeUsageCol,MakeHTMLHeader,MakeHTMLFooter,HTMLPage
 from progress import *
 from iz_tools.system import fopen
 import hypercore.cache # for HyperLinkedSourceFilePages
@@ -66,7 +66,7 @@ def MakeMethodIndex(objectType):
                 objectTupleList.append((elem_info.name.upper(), elem_info, file_info, package_info)) # append as tuple for case insensitive sort
     objectTupleList.sort(key=lambda x: x[0])
 
-    outfile = fopen(os.path.join(metaInfo.htmlDir,metaInfo.indexPage[objectType]), "w", metaInfo.encoding)
+    outfile = HTMLPage(os.path.join(metaInfo.htmlDir,metaInfo.indexPage[objectType]))
     outfile.write(MakeHTMLHeader(objectType))
     outfile.write("<H1>"+html_title+"</H1>\n")
     outfile.write("<TABLE CLASS='apilist'>\n")
@@ -163,7 +163,7 @@ def MakeElemIndex(objectType):
 
     objectTupleList.sort(key=lambda x: x[0])
 
-    outfile = fopen(os.path.join(metaInfo.htmlDir,metaInfo.indexPage[objectType]), "w", metaInfo.encoding)
+    outfile = HTMLPage(os.path.join(metaInfo.htmlDir,metaInfo.indexPage[objectType]))
     outfile.write(MakeHTMLHeader(objectType))
     outfile.write('<H1>'+html_title+'</H1>\n')
     outfile.write('<TABLE CLASS="apilist">\n')
@@ -239,7 +239,7 @@ def MakePackageIndex():
 
     packagetuplelist.sort(key=lambda x: x[0])
 
-    outfile = fopen(os.path.join(metaInfo.htmlDir,metaInfo.indexPage['package']), "w", metaInfo.encoding)
+    outfile = HTMLPage(os.path.join(metaInfo.htmlDir,metaInfo.indexPage['package']))
     outfile.write(MakeHTMLHeader('package'))
     outfile.write('<H1>'+_('Index Of All Packages')+'</H1>\n')
     outfile.write('<TABLE CLASS="apilist">\n')
@@ -279,7 +279,7 @@ def MakePackagesWithFuncsAndProcsIndex():
 
     packagetuplelist.sort(key=lambda x: x[0])
 
-    outfile = fopen(os.path.join(metaInfo.htmlDir,metaInfo.indexPage['package_full']), 'w', metaInfo.encoding)
+    outfile = HTMLPage(os.path.join(metaInfo.htmlDir,metaInfo.indexPage['package_full']))
     outfile.write(MakeHTMLHeader('package_full'))
     outfile.write('<H1>'+_('Index Of All Packages, Their Functions And Procedures')+'</H1>\n')
 
@@ -327,7 +327,7 @@ def MakeFormIndex():
     if metaInfo.indexPage['form'] == '': return     # Forms disabled = nothing to do here
     printProgress(_('Creating %s index') % 'Form', logname)
 
-    outfile = fopen(os.path.join(metaInfo.htmlDir,metaInfo.indexPage['form']), "w", metaInfo.encoding)
+    outfile = HTMLPage(os.path.join(metaInfo.htmlDir,metaInfo.indexPage['form']))
     outfile.write(MakeHTMLHeader('form'))
     outfile.write("<H1>"+_('Index Of All Forms')+"</H1>\n")
     outfile.write("<TABLE CLASS='apilist'>\n")
@@ -367,7 +367,7 @@ def MakeFormIndexWithUnits():
     if metaInfo.indexPage['form_full'] == '': return     # Forms disabled = nothing to do here
     printProgress(_('Creating full form index'), logname)
 
-    outfile = fopen(os.path.join(metaInfo.htmlDir,metaInfo.indexPage['form_full']), "w", metaInfo.encoding)
+    outfile = HTMLPage(os.path.join(metaInfo.htmlDir,metaInfo.indexPage['form_full']))
     outfile.write(MakeHTMLHeader('form_full'))
     outfile.write("<H1>"+_('Index of all Forms including their ProgramUnits')+"</H1>\n")
     outfile.write("<TABLE CLASS='apilist'>\n")
@@ -496,7 +496,7 @@ def MakeTaskList(taskType):
     proceduretuplelist.sort(key=lambda x: x[0])
     formtuplelist.sort(key=lambda x: x[0])
 
-    outfile = fopen(os.path.join(metaInfo.htmlDir,metaInfo.indexPage[taskType]), "w", metaInfo.encoding)
+    outfile = HTMLPage(os.path.join(metaInfo.htmlDir,metaInfo.indexPage[taskType]))
     outfile.write(MakeHTMLHeader(taskType))
     if taskType == 'bug':
         outfile.write('<H1>'+_('List of open Bugs')+'</H1>\n')
@@ -584,9 +584,9 @@ def CreateHyperlinkedSourceFilePages():
     Very basic syntax highlighting is performed here as well if code is included.
     """
     from hypercore.helpers import size_format, num_format
-    from hypercore.codeformatter import hypercode
-    from sys import argv
-    import fileinput, re
+    from hypercore.codeformatter import hypercode, hyperlinkCalls
+    from hypercore.lexicon import getWords
+    from hashlib import md5
     def ObjectDetailsListItem(item,i,fsize,fileInfo):
         """
         Write the row for the overview
@@ -622,21 +622,51 @@ def CreateHyperlinkedSourceFilePages():
         @return list linelist list of code lines
         """
         if fInfo.fileType == 'sql':
-            infile = fopen(fInfo.fileName, "r", metaInfo.encoding)
-            infile_line_list = infile.readlines()
-            infile.close()
+            infile_line_list = hypercore.cache.contents.readLines(fInfo.fileName, metaInfo.encoding)
         else:
             if metaInfo.useCache:
-                try:
-                    formcode = cache.get(fInfo.fileName,'formcode')
-                except:
-                    formcode = ''
+                formcode = hypercore.cache.contents.readFormCode(fInfo.fileName,cache)
             else:
                 formcode = '' ### need to re-create in case caching is turned off
             infile_line_list = formcode.split('\n')
             for line in range(len(infile_line_list)): infile_line_list[line] += '\n'
         return infile_line_list
 
+    def getCode(fInfo):
+        """
+        Obtain the highlighted source code (from cache, if possible)
+        @param object fInfo fileInfo object
+        @return string code
+        """
+        if metaInfo.useCache:
+            if cache.check(fInfo.fileName,'code'):
+                code = cache.get(fInfo.fileName,'code')
+            else:
+                code = hypercode(readCodeFromFile(fInfo), sqlkeywords, sqltypes)
+                cache.put(fInfo.fileName, 'code', code)
+        else:
+            code = hypercode(readCodeFromFile(fInfo), sqlkeywords, sqltypes)
+        return code
+
+    def getCodeLinks(fInfo):
+        """
+        Collect the targets of the calls to hyperlink in the code
+        @param object fInfo fileInfo object
+        @return list links tuples (string package name, string object name,
+                string href, boolean same file) in the order they are applied
+        """
+        links = []
+        for pInfo in fInfo.packageInfoList:
+            for w in pInfo.whatUsed.keys():
+                for u in pInfo.whatUsed[w]:
+                    if u[2] in ['file','pkg','view']: continue
+                    try: opname = u[3].parent.name
+                    except: opname = ''
+                    oname = u[3].name
+                    href  = u[0].getHtmlName() + '#L' + repr(u[1])
+                    links.append((opname, oname, href, fInfo.fileName==u[0].fileName))
+        return links
+
     def formPkgFuncDetails(fu):
         """
         Prepare form package function/procedure details for HTML
@@ -651,21 +681,13 @@ def CreateHyperlinkedSourceFilePages():
         return html
 
     top_level_directory = metaInfo.topLevelDirectory
-    if metaInfo.useCache: cache = hypercore.cache.cache(metaInfo.cacheDirectory)
+    if metaInfo.useCache: cache = hypercore.cache.getCache(metaInfo.cacheDirectory,metaInfo.cacheBackend)
     pbarInit(_("Creating hyperlinked source file pages"),0,len(metaInfo.fileInfoList), logname)
     if metaInfo.includeSourceLimit > 0:
         logger.info( _('Source code inclusion is limited to files smaller than %s'), size_format(metaInfo.includeSourceLimit,0) )
 
-    sqlkeywords = []
-    sqltypes    = []
-    for line in fileinput.input((os.path.split(argv[0])[0] or os.getcwd()) + os.sep + 'sql.keywords'):
-      if line.strip()[0]=='#':
-        continue
-      sqlkeywords.append(line.strip())
-    for line in fileinput.input((os.path.split(argv[0])[0] or os.getcwd()) + os.sep + 'sql.types'):
-      if line.strip()[0]=='#':
-        continue
-      sqltypes.append(line.strip())
+    sqlkeywords = getWords('keywords')
+    sqltypes    = getWords('types')
 
     k = 0
     for file_info in metaInfo.fileInfoList:
@@ -680,7 +702,7 @@ def CreateHyperlinkedSourceFilePages():
         # generate a file name for us to write to (+1 for delimiter)
         outfilename = file_info.getHtmlName()
 
-        outfile = fopen(os.path.join(metaInfo.htmlDir,outfilename), "w", metaInfo.encoding)
+        outfile = HTMLPage(os.path.join(metaInfo.htmlDir,outfilename))
         outfile.write(MakeHTMLHeader(file_info.fileName[len(top_level_directory)+1:]))
         outfile.write('<H1>' + file_info.fileName[len(top_level_directory)+1:] + '</H1>\n')
 
@@ -875,31 +897,22 @@ def CreateHyperlinkedSourceFilePages():
         if metaInfo.includeSource and ( metaInfo.includeSourceLimit==0 or codesize <= metaInfo.includeSourceLimit ):
             outfile.write('\n<H2>'+_('Source')+'</H2>\n')
             outfile.write('<PRE>')
-            if metaInfo.useCache:
-                if cache.check(file_info.fileName,'code'):
-                    code = cache.get(file_info.fileName,'code')
+            # Shall we hyperlink calls? The linked code only depends on the
+            # source and the link targets, so we can take it from the cache
+            # if neither of them changed
+            if metaInfo.linkCodeCalls:
+                links = getCodeLinks(file_info)
+                lhash = md5(repr(links)).hexdigest()
+                cached = False
+                if metaInfo.useCache and cache.check(file_info.fileName,'linkedcode'):
+                    cached = cache.getObj(file_info.fileName,'linkedcode',0)
+                if cached and cached[0] == lhash:
+                    code = cached[1]
                 else:
-                    code = hypercode(readCodeFromFile(file_info), sqlkeywords, sqltypes)
-                    cache.put(file_info.fileName, 'code', code)
+                    code = hyperlinkCalls(getCode(file_info), links)
+                    if metaInfo.useCache: cache.putObj(file_info.fileName, 'linkedcode', (lhash, code))
             else:
-                code = hypercode(readCodeFromFile(file_info), sqlkeywords, sqltypes)
-            # Shall we hyperlink calls?
-            if metaInfo.linkCodeCalls:
-                if len(file_info.packageInfoList) > 0:
-                    for p in range(len(file_info.packageInfoList)):
-                        for w in file_info.packageInfoList[p].whatUsed.keys():
-                            for u in file_info.packageInfoList[p].whatUsed[w]:
-                                if u[2] in ['file','pkg','view']: continue
-                                try: opname = u[3].parent.name
-                                except: opname = ''
-                                oname = u[3].name
-                                href  = u[0].getHtmlName() + '#L' + repr(u[1])
-                                patt = re.compile('\\b('+opname+')\\.('+oname+')\\b',re.I)
-                                oricode = code
-                                code = patt.sub('\\1.<A HREF="'+href+'">\\2</A>',code)
-                                if code==oricode and file_info.fileName==u[0].fileName: # no match on full name
-                                    patt = re.compile('\\b('+oname+')(\\s*\\()')
-                                    code = patt.sub('<A HREF="'+href+'">\\1</A>\\2',code)
+                code = getCode(file_info)
             try:
                 if len(metaInfo.encoding)>8 and metaInfo.encoding[0:8].lower()=='iso-8859':
                     # though \xa4 should be '&curren;', it usually is '&euro;'. u'\xa4' does not translate to iso-8859-*
@@ -1026,7 +1039,7 @@ def CreateWhereUsedPages():
             used_list = obj.whatUsed
             pname = _('What Used List for %s') % obj.name
             fname = metaInfo.htmlDir + 'what_used_%d.html' % unum
-        outfile = fopen(fname, 'w', metaInfo.encoding)
+        outfile = HTMLPage(fname)
         if otype=='tab':
             outfile.write(MakeHTMLHeader(pname))
             outfile.write( makeUsageTableHead(_('Table'),obj.name,page) )
@@ -8,7 +8,7 @@ from hypercore.elements import metaInfo
 from hypercore.helpers  import num_format,size_format
 from hypercore.javadoc  import JavaDocVars
 from iz_tools.system    import fopen
-from .commonhtml        import MakeHTMLHeader, MakeHTMLFooter
+from .commonhtml        import MakeHTMLHeader, MakeHTMLFooter, HTMLPage
 from shutil             import copy2
 
 # Setup gettext support
@@ -331,7 +331,7 @@ def MakeStatsPage():
     from os import path as os_path
     printProgress(_('Creating statistics page'), logname)
 
-    outfile = fopen(metaInfo.htmlDir + metaInfo.indexPage['stat'], 'w', metaInfo.encoding)
+    outfile = HTMLPage(metaInfo.htmlDir + metaInfo.indexPage['stat'])
     outfile.write(MakeHTMLHeader('stat',True,'initCharts();'))
     try:
         copy2(os_path.join(metaInfo.scriptpath,'diagram.js'), os_path.join(metaInfo.htmlDir,'diagram.js'))
@@ -6,10 +6,67 @@ Copyright 2010 Itzchak Rehberg & IzzySoft
 
 import os
 import cPickle
-from iz_tools.system import fopen
+import zlib
+import time
+from hashlib import md5
+from collections import OrderedDict
+from iz_tools.system import fopen, file_map_lines
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+ctypes = ['code','linkedcode','formcode','objects','usage'] # per-file caches (see removeObsolete)
+keep   = {'depgraph':30} # keyed caches (see putFile): ctype -> days an unused entry is kept (0: forever)
+dropped = ['depdata']    # caches no longer used, their entries are removed (see removeObsolete)
+stats  = {} # hits and misses per ctype: ctype -> {'hits':int, 'misses':int}
+hashes = {} # content hashes calculated during this run: (fname, mtime, size) -> string hash
+
+def record(ctype,hit):
+    """
+    Record a cache hit or miss (see the stats dictionary)
+    @param string ctype type of the cached part
+    @param boolean hit whether it was a hit (True) or a miss (False)
+    @return boolean hit
+    """
+    if ctype not in stats: stats[ctype] = {'hits':0, 'misses':0}
+    if hit: stats[ctype]['hits'] += 1
+    else: stats[ctype]['misses'] += 1
+    return hit
+
+def statsCopy():
+    """
+    Obtain a copy of the stats dictionary (see statsSince)
+    @return dict stats
+    """
+    return dict([(ctype, dict(counts)) for ctype, counts in stats.items()])
+
+def statsSince(before):
+    """
+    Obtain the hits and misses recorded since a copy of the stats was taken
+    (e.g. by a job in a worker process, whose stats the parent does not see)
+    @param dict before copy of the stats dictionary (see statsCopy)
+    @return dict stats (in the format of the stats dictionary)
+    """
+    delta = {}
+    for ctype in stats:
+        prev = before.get(ctype,{'hits':0, 'misses':0})
+        delta[ctype] = {'hits':stats[ctype]['hits'] - prev['hits'], 'misses':stats[ctype]['misses'] - prev['misses']}
+    return delta
+
+def addStats(delta):
+    """
+    Add the hits and misses recorded elsewhere (see statsSince) to the stats
+    @param dict delta stats to add
+    """
+    for ctype in delta:
+        if ctype not in stats: stats[ctype] = {'hits':0, 'misses':0}
+        stats[ctype]['hits'] += delta[ctype]['hits']
+        stats[ctype]['misses'] += delta[ctype]['misses']
 
 class cache(object):
     """ A simple caching mechanism """
+    precheck = True # trust mtime and size of the original file, and only check its hash if they changed
 
     def __init__(self,dirname):
         """
@@ -50,9 +107,56 @@ class cache(object):
         #return cname[len(self.dirname):-len(ctype)-1].replace('%2f',os.sep)
         return cname[0:-len(ctype)-1].replace('%2f',os.sep)
 
+    def origin(self,fname):
+        """
+        Obtain the metadata of the original file
+        @param self
+        @param string fname name of the original file
+        @return tuple (float mtime, int size, string hash) - (0, 0, '-') if there's
+                no such file (e.g. for depgraph images)
+        """
+        if not os.path.isfile(fname): return (0, 0, '-')
+        return (os.path.getmtime(fname), os.path.getsize(fname), self.hashfile(fname))
+
+    def hashfile(self,fname):
+        """
+        Calculate the hash of a files content. It is read in chunks, and the
+        hash is kept for the run as long as mtime and size do not change (see
+        hashes) - so each file is only read once for all ctypes
+        @param self
+        @param string fname name of the file
+        @return string hash (MD5 hex digest)
+        """
+        key = (fname, os.path.getmtime(fname), os.path.getsize(fname))
+        if key in hashes: return hashes[key]
+        fhash = md5()
+        ofile = open(fname,'rb')
+        chunk = ofile.read(1048576)
+        while chunk:
+            fhash.update(chunk)
+            chunk = ofile.read(1048576)
+        ofile.close()
+        hashes[key] = fhash.hexdigest()
+        return hashes[key]
+
+    def count(self,ctype,hit):
+        """
+        Record a cache hit or miss (see the stats dictionary)
+        @param self
+        @param string ctype type of the cached part
+        @param boolean hit whether it was a hit (True) or a miss (False)
+        @return boolean hit
+        """
+        return record(ctype,hit)
+
     def check(self,fname,ctype,ftim=0):
         """
-        Check whether the copy in cache is up-to-date
+        Check whether the copy in cache is up-to-date. The copy is considered
+        valid as long as the content of the original file did not change: if
+        mtime and size still match those recorded with the copy, the content is
+        not even looked at (unless the pre-check is disabled, see precheck);
+        otherwise, its hash is compared (so a new mtime alone, e.g. after a
+        fresh checkout, does not expire the copy)
         @param self
         @param string fname name of the original file
         @param string ctype type of the cached part
@@ -62,53 +166,142 @@ class cache(object):
                should correspond to what os.path.getmtime() would have returned.
         @return boolean up2date
         """
-        if ftim==0 and not os.path.isfile(fname): return False # no origin
-        if not os.path.isdir(self.dirname): return False # no cache dir
+        if ftim==0 and not os.path.isfile(fname): return self.count(ctype,False) # no origin
+        meta = self.getMeta(fname,ctype)
+        if meta is None: return self.count(ctype,False) # no cache (or no content)
+        mtime, size, fhash, stored = meta
+        if ftim==0:
+            ftim  = os.path.getmtime(fname)
+            valid = os.path.getsize(fname) == size
+            if valid and not (self.precheck and ftim == mtime):
+                valid = self.hashfile(fname) == fhash
+                if valid: self.setMeta(fname,ctype,(ftim,size,fhash)) # content unchanged, just touched
+        else: valid = ftim <= stored
+        if not valid: self.remove(fname,ctype) # expired
+        return self.count(ctype,valid)
+
+    def getMeta(self,fname,ctype):
+        """
+        Get the metadata stored along with a cache entry
+        @param self
+        @param string fname name of the original file
+        @param string ctype type of the cached part
+        @return tuple (float mtime, int size, string hash, float stored) with mtime,
+                size and hash of the original file when the entry was stored, and
+                the time the entry was stored at - or None if there's no such entry
+                (or it has no content)
+        """
         cname = self.makename(fname,ctype)
-        if not os.path.isfile(cname): return False # no cache
-        if os.path.getsize(cname) == 0: return False # no content
-        if ftim==0: ftim = os.path.getmtime(fname)
-        if ftim > os.path.getmtime(cname): # expired
-            os.unlink(cname)
-            return False
-        return True
+        if not os.path.isfile(cname): return None # no cache
+        cfile = open(cname,'rb')
+        head  = cfile.readline().split()
+        cfile.close()
+        if len(head) != 3 or os.path.getsize(cname) <= len(' '.join(head)) +1: return None # old format or no content
+        try: return (float(head[0]), int(head[1]), head[2], os.path.getmtime(cname))
+        except ValueError: return None
+
+    def setMeta(self,fname,ctype,meta):
+        """
+        Update the metadata of a cache entry (keeping its content)
+        @param self
+        @param string fname name of the original file
+        @param string ctype type of the cached part
+        @param tuple meta (float mtime, int size, string hash) of the original file
+        """
+        self.store(fname,ctype,self.fetch(fname,ctype),meta)
+
+    def remove(self,fname,ctype):
+        """
+        Remove an entry from the cache
+        @param self
+        @param string fname name of the original file
+        @param string ctype type of the cached part
+        """
+        os.unlink(self.makename(fname,ctype))
+
+    def touch(self,fname,ctype):
+        """
+        Mark an entry as used (so it is kept, see removeObsolete)
+        @param self
+        @param string fname name of the original file (or key)
+        @param string ctype type of the cached part
+        """
+        os.utime(self.makename(fname,ctype),None)
 
     def removeObsolete(self,basedir=''):
         """
         Cleanup files from cache which do no longer exist in the original location
-        (i.e. which have been deleted/moved, so they would no longer match)
+        (i.e. which have been deleted/moved, so they would no longer match), keyed
+        entries not used for too long (see keep), and those of caches no longer
+        used (see dropped)
         @param self
         @param optional string basedir   base directory of original codebase
         @return int removed              how many files have been removed
         """
         if not os.path.isdir(self.dirname): return 0 # no cache dir
         names=os.listdir(self.dirname)
+        now = time.time()
         dc = 0
         for i in names:
             splitted = i.split('.')
             ctype = splitted[len(splitted)-1]
-            if not ctype in ['code','formcode']: continue
-            if not os.path.isfile(self.getOName(i,ctype)):
-                os.unlink( os.path.join(self.dirname, i) )
+            cname = os.path.join(self.dirname, i)
+            if ctype in ctypes: obsolete = not os.path.isfile(self.getOName(i,ctype))
+            elif keep.get(ctype): obsolete = os.path.getmtime(cname) < now - keep[ctype]*86400
+            else: obsolete = ctype in dropped
+            if obsolete:
+                os.unlink(cname)
                 dc += 1
         return dc
-            
 
-    def get(self,fname,ctype):
+    def fetch(self,fname,ctype):
         """
-        Get the string from cache content for a given file
+        Get the raw content of an entry
         @param self
         @param string fname name of the original file
         @param string ctype type of the cached part
-        @return string content (empty string if none)
+        @return string content (None if not found)
         """
         cname = self.makename(fname,ctype)
-        if not os.path.isfile(cname): return '' # no cache
-        cfile = fopen(cname,'r','zip')
-        cont  = cfile.read().decode(self.encoding)
+        if not os.path.isfile(cname): return None # no cache
+        cfile = open(cname,'rb')
+        cfile.readline() # metadata
+        cont  = cfile.read()
         cfile.close()
         return cont
 
+    def store(self,fname,ctype,content,meta=None):
+        """
+        Save the raw content of an entry, preceded by a line holding the metadata
+        of the original file
+        @param self
+        @param string fname name of the original file
+        @param string ctype type of the cached part
+        @param string content
+        @param optional tuple meta (float mtime, int size, string hash) of the original
+               file (obtained via origin if not given)
+        """
+        mtime, size, fhash = meta or self.origin(fname)
+        cfile = open(self.makename(fname,ctype),'wb')
+        cfile.write('%r %d %s\n' % (mtime, size, fhash))
+        cfile.write(content)
+        cfile.close()
+
+    def get(self,fname,ctype):
+        """
+        Get the string from cache content for a given file
+        @param self
+        @param string fname name of the original file
+        @param string ctype type of the cached part
+        @return string content (empty string if none)
+        """
+        cont = self.fetch(fname,ctype)
+        if not cont: return '' # no cache
+        try:
+            return zlib.decompress(cont).decode(self.encoding)
+        except zlib.error: # left from an older version
+            return ''
+
     def getObj(self,fname,ctype,ftim):
         """
         Get the object from cache content for a given file. Uses cPickle
@@ -117,12 +310,9 @@ class cache(object):
         @param string ctype type of the cached part
         @return obj content or False if not found in cache
         """
-        cname = self.makename(fname,ctype)
-        if not os.path.isfile(cname): return False # no cache
-        cfile = open(cname,'r')
-        cont  = cPickle.load(cfile)
-        cfile.close()
-        return cont
+        cont = self.fetch(fname,ctype)
+        if not cont: return False # no cache
+        return cPickle.loads(cont)
 
     def put(self,fname,ctype,content):
         """
@@ -132,11 +322,7 @@ class cache(object):
         @param string ctype type of the cached part
         @param string content
         """
-        cname = self.makename(fname,ctype)
-        cfile = fopen(cname,'w','zip')
-        cont = content.encode(self.encoding)
-        cfile.write( cont )
-        cfile.close()
+        self.store(fname, ctype, zlib.compress(content.encode(self.encoding)))
 
     def putObj(self,fname,ctype,obj):
         """
@@ -146,10 +332,37 @@ class cache(object):
         @param string ctype type of the cached part
         @param object obj
         """
-        cname = self.makename(fname,ctype)
-        cfile = open(cname,'w')
-        cPickle.dump(obj,cfile,cPickle.HIGHEST_PROTOCOL)
-        cfile.close()
+        self.store(fname, ctype, cPickle.dumps(obj,cPickle.HIGHEST_PROTOCOL))
+
+    def getFile(self,key,ctype,target):
+        """
+        Restore a file (e.g. a graph image) kept in the cache. Those are not
+        bound to an original file, but identified by a key (e.g. a hash)
+        @param self
+        @param string key key the file was stored with (see putFile)
+        @param string ctype type of the cached part
+        @param string target name of the file to restore
+        @return boolean found
+        """
+        cont = self.fetch(key,ctype)
+        if not cont: return self.count(ctype,False)
+        tfile = open(target,'wb')
+        tfile.write(cont)
+        tfile.close()
+        self.touch(key,ctype)
+        return self.count(ctype,True)
+
+    def putFile(self,key,ctype,source):
+        """
+        Keep a copy of a file (e.g. a graph image) in the cache
+        @param self
+        @param string key key to store the file with (see getFile)
+        @param string ctype type of the cached part
+        @param string source name of the file to keep
+        """
+        sfile = open(source,'rb')
+        self.store(key,ctype,sfile.read())
+        sfile.close()
 
     def clear(self,ctype='all'):
         """
@@ -158,10 +371,245 @@ class cache(object):
         @param optional ctype type (extension) of cache to remove (default: 'all')
         """
         if ctype=='all':
-            for fname in os.listdir(self.dirname): os.unlink(fname)
+            for fname in os.listdir(self.dirname): os.unlink(os.path.join(self.dirname,fname))
         else:
             ext = '.'+ctype
             pos = len(ext)
             for fname in os.listdir(self.dirname):
                 if fname[len(fname)-pos:]==ext: os.unlink(os.path.join(self.dirname,fname))
 
+
+
+class dbcache(cache):
+    """
+    Cache keeping all entries in a single SQLite database (instead of one
+    file per entry), indexed by the original file name and the type of the
+    cached part. Along with each entry, mtime, size and MD5 hash of the
+    original file are stored.
+    """
+    dbname = 'cache.db'
+
+    def __init__(self,dirname):
+        """
+        Setup the object and open (or create) the database
+        @param self
+        @param string dirname name of the cache directory
+        """
+        cache.__init__(self,dirname)
+        self.db = sqlite3.connect(os.path.join(dirname,self.dbname), timeout=60) # parallel jobs may write concurrently
+        self.db.text_factory = str
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL') # it's a cache: a lost entry just needs to be created again
+        self.db.execute('CREATE TABLE IF NOT EXISTS cache (fname TEXT, ctype TEXT, mtime REAL, size INTEGER, hash TEXT, stored REAL, content BLOB, PRIMARY KEY (fname,ctype))')
+        self.db.commit()
+
+    def getMeta(self,fname,ctype):
+        """
+        Get the metadata stored along with a cache entry
+        @param self
+        @param string fname name of the original file
+        @param string ctype type of the cached part
+        @return tuple (float mtime, int size, string hash, float stored) or None
+                (see cache.getMeta)
+        """
+        row = self.db.execute('SELECT mtime, size, hash, stored FROM cache WHERE fname=? AND ctype=? AND length(content)>0', (fname,ctype)).fetchone()
+        if row is None: return None
+        return tuple(row)
+
+    def setMeta(self,fname,ctype,meta):
+        """
+        Update the metadata of a cache entry (keeping its content)
+        @param self
+        @param string fname name of the original file
+        @param string ctype type of the cached part
+        @param tuple meta (float mtime, int size, string hash) of the original file
+        """
+        self.db.execute('UPDATE cache SET mtime=?, size=?, hash=? WHERE fname=? AND ctype=?', meta + (fname,ctype))
+        self.db.commit()
+
+    def remove(self,fname,ctype):
+        """
+        Remove an entry from the cache
+        @param self
+        @param string fname name of the original file
+        @param string ctype type of the cached part
+        """
+        self.db.execute('DELETE FROM cache WHERE fname=? AND ctype=?', (fname,ctype))
+        self.db.commit()
+
+    def removeObsolete(self,basedir=''):
+        """
+        Cleanup entries from cache whose files do no longer exist in the original
+        location (i.e. which have been deleted/moved, so they would no longer match),
+        keyed entries not used for too long (see keep), and those of caches no
+        longer used (see dropped)
+        @param self
+        @param optional string basedir   base directory of original codebase
+        @return int removed              how many entries have been removed
+        """
+        gone = [ (fname,) for (fname,) in self.db.execute('SELECT DISTINCT fname FROM cache WHERE ctype IN (%s)' % ','.join('?'*len(ctypes)), ctypes)
+                 if not os.path.isfile(fname) ]
+        dc = 0
+        for fname in gone:
+            dc += self.db.execute('DELETE FROM cache WHERE fname=? AND ctype IN (%s)' % ','.join('?'*len(ctypes)), fname + tuple(ctypes)).rowcount
+        for ctype, days in keep.items():
+            if days: dc += self.db.execute('DELETE FROM cache WHERE ctype=? AND stored<?', (ctype, time.time() - days*86400)).rowcount
+        dc += self.db.execute('DELETE FROM cache WHERE ctype IN (%s)' % ','.join('?'*len(dropped)), dropped).rowcount
+        self.db.commit()
+        return dc
+
+    def touch(self,fname,ctype):
+        """
+        Mark an entry as used (so it is kept, see removeObsolete)
+        @param self
+        @param string fname name of the original file (or key)
+        @param string ctype type of the cached part
+        """
+        self.db.execute('UPDATE cache SET stored=? WHERE fname=? AND ctype=?', (time.time(),fname,ctype))
+        self.db.commit()
+
+    def fetch(self,fname,ctype):
+        """
+        Get the raw content of an entry
+        @param self
+        @param string fname name of the original file
+        @param string ctype type of the cached part
+        @return string content (None if not found)
+        """
+        row = self.db.execute('SELECT content FROM cache WHERE fname=? AND ctype=?', (fname,ctype)).fetchone()
+        if row is None: return None
+        return str(row[0])
+
+    def store(self,fname,ctype,content,meta=None):
+        """
+        Save the raw content of an entry, along with the metadata of the original file
+        @param self
+        @param string fname name of the original file
+        @param string ctype type of the cached part
+        @param string content
+        @param optional tuple meta (float mtime, int size, string hash) of the original
+               file (obtained via origin if not given)
+        """
+        mtime, size, fhash = meta or self.origin(fname)
+        self.db.execute('INSERT OR REPLACE INTO cache (fname,ctype,mtime,size,hash,stored,content) VALUES (?,?,?,?,?,?,?)',
+                        (fname, ctype, mtime, size, fhash, time.time(), sqlite3.Binary(content)))
+        self.db.commit()
+
+    def clear(self,ctype='all'):
+        """
+        Remove cached content
+        @param self
+        @param optional ctype type of cache to remove (default: 'all')
+        """
+        if ctype=='all': self.db.execute('DELETE FROM cache')
+        else: self.db.execute('DELETE FROM cache WHERE ctype=?', (ctype,))
+        self.db.commit()
+
+
+class contentcache(object):
+    """
+    In-memory cache of the contents of source files (and of the code of Oracle
+    Forms), so each of them is read only once per run - as long as the budget
+    allows. When the budget is exceeded, the least recently used contents are
+    dropped (and read again on their next use).
+    """
+    budget = 64 * 1024 * 1024 # max size of all contents kept (in characters, 0 = keep nothing)
+    mapsize = 100 * 1024 * 1024 # files of this size (in bytes) or larger are memory-mapped instead (0 = never)
+
+    def __init__(self):
+        """
+        Setup the object
+        @param self
+        """
+        self.entries = OrderedDict() # key -> (content, size)
+        self.size    = 0
+
+    def get(self,key):
+        """
+        Obtain a content from the cache
+        @param self
+        @param mixed key file name (or tuple (file name, ctype))
+        @return mixed content or None if it's not (or no longer) cached
+        """
+        entry = self.entries.pop(key,None)
+        if entry is None:
+            record('content',False)
+            return None
+        self.entries[key] = entry # most recently used
+        record('content',True)
+        return entry[0]
+
+    def put(self,key,content,size):
+        """
+        Keep a content, dropping the least recently used ones if needed
+        @param self
+        @param mixed key file name (or tuple (file name, ctype))
+        @param mixed content content to keep
+        @param int size size of the content
+        """
+        if key in self.entries: self.size -= self.entries.pop(key)[1]
+        if size > self.budget: return
+        while self.entries and self.size + size > self.budget:
+            self.size -= self.entries.popitem(last=False)[1][1]
+        self.entries[key] = (content, size)
+        self.size += size
+
+    def readLines(self,fname,encoding=None):
+        """
+        Obtain the lines of a source file. Large files (see mapsize) are not
+        read (nor kept), but memory-mapped.
+        @param self
+        @param string fname name of the file
+        @param optional string encoding encoding of the file (see iz_tools.system.fopen)
+        @return list lines (a copy, so it can be modified by the caller) - or a
+                read-only iz_tools.system.MappedLines object for large files
+        """
+        if self.mapsize and os.path.getsize(fname) >= self.mapsize:
+            try:
+                return file_map_lines(fname,encoding)
+            except ValueError: # encoding does not allow for it, so read the file
+                pass
+        lines = self.get(fname)
+        if lines is None:
+            infile = fopen(fname, "r", encoding)
+            lines = infile.readlines()
+            infile.close()
+            self.put(fname, lines, sum([len(line) for line in lines]))
+        return list(lines)
+
+    def readFormCode(self,fname,fcache):
+        """
+        Obtain the code of an Oracle Forms XML file as stored in the cache by
+        the object scan
+        @param self
+        @param string fname name of the XML file
+        @param object fcache cache instance to read the code from
+        @return string formcode
+        """
+        formcode = self.get((fname,'formcode'))
+        if formcode is None:
+            try:
+                formcode = fcache.get(fname,'formcode')
+            except:
+                formcode = ''
+            self.put((fname,'formcode'), formcode, len(formcode))
+        return formcode
+
+contents  = contentcache() # shared by all stages of the run
+
+backends  = {'files':cache, 'sqlite':dbcache}
+instances = {} # (pid, dirname, backend) -> cache instance
+
+def getCache(dirname,backend='files'):
+    """
+    Obtain the cache instance for the given directory. Instances are re-used
+    within the same process (but not shared with forked worker processes, so
+    each of them opens its own database connection)
+    @param string dirname name of the cache directory
+    @param optional string backend 'files' (one file per entry, default) or
+           'sqlite' (all entries in a single database, see dbcache)
+    @return object cache instance
+    """
+    key = (os.getpid(), dirname, backend)
+    if key not in instances: instances[key] = backends[backend](dirname)
+    return instances[key]
@@ -7,6 +7,7 @@ Copyright 2010 Itzchak Rehberg & IzzySoft
 from cgi import escape # for htmlspecialchars
 from iz_tools.typecheck import is_numeric
 import re
+from hypercore import patterns
 
 def hypercode(line_list,keywords,types,cssclass='sql'):
     """
@@ -15,85 +16,200 @@ def hypercode(line_list,keywords,types,cssclass='sql'):
     As the lists of keywords and types are passed to this function, all kind
     of code could be highlighted passing the corresponding lists.
     @param list line_list List of code lines
-    @param list keywords keywords to highlight
-    @param list types types to highlight
+    @param list keywords keywords to highlight (preferably as set)
+    @param list types types to highlight (preferably as set)
     @param string cssclass prefix for the CSS-classes to use. Defaults to 'sql'.
             Used classes (taking the SQL as example) are: 'sqlcomment' for comments,
             'sqlbrace' for opening parenthesis, 'sqlkeyword' for keywords, and
             'sqltype' for types.
     Returns: html_string HTML formatted code
     """
+    if not isinstance(keywords,(set,frozenset)): keywords = set(keywords)
+    if not isinstance(types,(set,frozenset)): types = set(types)
 
     # we need leading zeroes for the line numbers
     line_number_width = len(`len(line_list)`) # number of chars in "number of lines of text"
 
-    html = ''
+    comment  = '<SPAN CLASS="'+cssclass+'comment">'
+    brace    = '<SPAN CLASS="'+cssclass+'brace">'
+    string   = brace + '\'</SPAN><SPAN CLASS="'+cssclass+'string">'
+    strend   = '</SPAN>' + brace + '\'</SPAN>'
+    braces   = frozenset([',', ':', '=', '(', ')', '[', ']', '{', '}'])
+    plain    = {} # HTML for tokens not changing the mode, once classified
+    def classify(elem):
+        """
+        Obtain the HTML for a token outside of comments and strings
+        @param string elem token
+        @return string html
+        """
+        if elem in braces: html = brace + elem + '</SPAN>'
+        elif elem in ['<','>']: html = brace + escape(elem) + '</SPAN>'
+        elif is_numeric(elem): html = '<SPAN CLASS="'+cssclass+'numeric">' + elem + '</SPAN>'
+        elif elem in keywords: html = '<SPAN CLASS="'+cssclass+'keyword">' + elem + '</SPAN>'
+        elif elem in types: html = '<SPAN CLASS="'+cssclass+'type">' + elem + '</SPAN>'
+        else: html = elem
+        plain[elem] = html
+        return html
+
+    html = []
     commentmode = 0 # 0 no comment, 1 '--', 2 '/*', 3 in_singlequote_string
     splitter = re.compile('([\'\s,\.;\:%\(\)\}\{\|\<\>])')
     for line_number in range(len(line_list)):
         line  = escape(line_list[line_number]).replace('&lt;','<').replace('&gt;','>')
         if line.strip()[0:2]=='--':
-           text = '<SPAN CLASS="'+cssclass+'comment">' + line + '</SPAN>'
+           text = comment + line + '</SPAN>'
         else:
-            text = ''
+            text = []
             if commentmode==2:
-                text += '<SPAN CLASS="'+cssclass+'comment">'
+                text.append(comment)
             oldelem = ''
             tokens = splitter.split(line)
             for idx in range(len(tokens)):
                 elem = tokens[idx]
                 if commentmode==0:
-                    if elem[0:2]=='--':
-                        text += '<SPAN CLASS="'+cssclass+'comment">' + elem
+                    if elem in plain:
+                        text.append(plain[elem])
+                    elif elem[0:2]=='--':
+                        text.append(comment + elem)
                         commentmode = 1
                     elif elem[0:2]=='/*':
-                        text += '<SPAN CLASS="'+cssclass+'comment">' + elem
+                        text.append(comment + elem)
                         commentmode = 2
                     elif elem=="'":
-                        text += '<SPAN CLASS="'+cssclass+'brace">\'</SPAN><SPAN CLASS="'+cssclass+'string">'
+                        text.append(string)
                         commentmode = 3
                     elif elem[0:1]=="'":
-                        text += '<SPAN CLASS="'+cssclass+'brace">\'</SPAN><SPAN CLASS="'+cssclass+'string">' + elem[1:len(elem)-1]
+                        text.append(string + elem[1:len(elem)-1])
                         if elem[len(elem)-1:]=="'":
-                            text += '</SPAN><SPAN CLASS="'+cssclass+'brace">\'</SPAN>'
+                            text.append(strend)
                         else:
-                            text += elem[len(elem)-1:]
+                            text.append(elem[len(elem)-1:])
                             commentmode = 3
-                    elif elem in [',', ':', '=', '(', ')', '[', ']', '{', '}'] \
-                      or (elem==';' and (len(oldelem)==0 or oldelem[0]!='&')): # skip html entities for ;
-                        text += '<SPAN CLASS="'+cssclass+'brace">' + elem + '</SPAN>'
-                    elif elem in ['<','>']:
-                        text += '<SPAN CLASS="'+cssclass+'brace">' + escape(elem) + '</SPAN>'
-                    elif is_numeric(elem):
-                        text += '<SPAN CLASS="'+cssclass+'numeric">' + elem + '</SPAN>'
-                    elif elem in keywords:
-                        text += '<SPAN CLASS="'+cssclass+'keyword">' + elem + '</SPAN>'
-                    elif elem in types:
-                        text += '<SPAN CLASS="'+cssclass+'type">' + elem + '</SPAN>'
-                    else: text += elem
+                    elif elem==';':
+                        if len(oldelem)==0 or oldelem[0]!='&': # skip html entities for ;
+                            text.append(brace + elem + '</SPAN>')
+                        elif elem in keywords: text.append('<SPAN CLASS="'+cssclass+'keyword">' + elem + '</SPAN>')
+                        elif elem in types: text.append('<SPAN CLASS="'+cssclass+'type">' + elem + '</SPAN>')
+                        else: text.append(elem)
+                    else: text.append(classify(elem))
                 elif commentmode==2:
                     if elem[len(elem)-2:]=='*/':
-                        text += escape(elem) + '</SPAN>'
+                        text.append(escape(elem) + '</SPAN>')
                         commentmode = 0 # clear at comment end
-                    else: text += escape(elem)
+                    else: text.append(escape(elem))
                 elif commentmode==3:
                     if elem=="'":
                         if not ( idx>0 and tokens[idx-1]=="'" ) or ( len(tokens)>idx and tokens[idx+1]=="'" ):
-                            text += '</SPAN><SPAN CLASS="'+cssclass+'brace">\'</SPAN>'
+                            text.append(strend)
                             commentmode = 0
-                    else: text += escape(elem)
+                    else: text.append(escape(elem))
                 else: # 1 for now
-                    text += escape(elem)
+                    text.append(escape(elem))
                 oldelem = elem # remember for back-check
             if commentmode==1:
-                text += '</SPAN>'
+                text.append('</SPAN>')
                 commentmode = 0 # clear at line end
             elif commentmode==2:
-                text += '</SPAN>'
-            #if text[len(text)-1:] != '\n':
-            #    text += "\n"
+                text.append('</SPAN>')
+            text = ''.join(text)
         text = text.replace('\n\n','\n')
         zeroes = (1 + line_number_width - len(`line_number+1`)) * "0" # leading zeroes for line numbers (+1 since we start with 0)
-        html += "<A NAME=\"L" + `line_number+1` + "\"></A>" # hyperlink target
-        html += zeroes + `line_number+1` + ": " + text #text
-    return html
+        html.append("<A NAME=\"L" + `line_number+1` + "\"></A>") # hyperlink target
+        html.append(zeroes + `line_number+1` + ": " + text) #text
+    return ''.join(html)
+
+def hyperlinkCallsByPattern(code,links):
+    """
+    Hyperlink calls in highlighted code, running one regular expression per
+    link target (see hyperlinkCalls for the parameters)
+    @param string code highlighted code
+    @param list links link targets
+    @return string code
+    """
+    for opname, oname, href, samefile in links:
+        patt = re.compile('\\b('+opname+')\\.('+oname+')\\b',re.I)
+        oricode = code
+        code = patt.sub('\\1.<A HREF="'+href+'">\\2</A>',code)
+        if code==oricode and samefile: # no match on full name
+            patt = re.compile('\\b('+oname+')(\\s*\\()')
+            code = patt.sub('<A HREF="'+href+'">\\1</A>\\2',code)
+    return code
+
+def hyperlinkCalls(code,links):
+    """
+    Hyperlink calls in highlighted code. Each target is linked where its
+    qualified name (package.name, or .name for stand-alone objects - case
+    insensitive) is found. If there's no such reference, and the target is
+    in the same file, calls by its bare name (followed by an opening
+    parenthesis) are linked instead. What was linked for one target is not
+    touched for the following ones.
+    All this is done with a single pass over the code: the words of the code
+    are indexed once, the places to link are looked up for all targets, and
+    the markup is inserted in one go. The result is the very same as
+    hyperlinkCallsByPattern produces - which is still used for names which
+    are no plain words.
+    @param string code highlighted code
+    @param list links link targets, tuples (string package name, string object
+           name, string href, boolean same file) in the order they are applied
+    @return string code
+    """
+    for opname, oname, href, samefile in links:
+        if not patterns.plainWord.match(oname) or (opname and not patterns.plainWord.match(opname)) \
+          or oname.lower()=='html' or '\\' in href: # names could match the inserted markup
+            return hyperlinkCallsByPattern(code,links)
+
+    words     = [(m.start(), m.end()) for m in patterns.word.finditer(code)]
+    qualified = {} # (lowercased package or '', lowercased name) -> indices of the package words
+    bare      = {} # name -> indices of its words
+    for i in range(len(words)):
+        start, end = words[i]
+        bare.setdefault(code[start:end], []).append(i)
+        if i+1 < len(words) and words[i+1][0] == end+1 and code[end] == '.':
+            name = code[end+1:words[i+1][1]].lower()
+            qualified.setdefault((code[start:end].lower(), name), []).append(i)
+            qualified.setdefault(('', name), []).append(i)
+
+    inserts = {}    # position -> markup to insert there
+    linked  = set() # positions of names already linked
+    closed  = set() # positions right behind those names (no word precedes a '.' there any longer)
+    done    = set() # patterns already applied (they won't find anything again)
+    for opname, oname, href, samefile in links:
+        found = False
+        key = (opname.lower(), oname.lower())
+        if key not in done:
+            done.add(key)
+            last = 0
+            ends = [] # all matches are taken from the code before this target is linked
+            for i in qualified.get(key, []):
+                dot, end = words[i][1], words[i+1][1]
+                if opname: start = words[i][0]
+                elif dot in closed: continue
+                else: start = dot
+                if start < last or linked.intersection(range(start,end)): continue
+                last  = end
+                found = True
+                linked.update(range(dot+1,end))
+                ends.append(end)
+                inserts[dot+1] = '<A HREF="'+href+'">'
+                inserts[end]   = '</A>'
+            closed.update(ends)
+        if found or not samefile or oname in done: continue
+        done.add(oname) # no match on full name
+        for i in bare.get(oname, []):
+            start, end = words[i]
+            pos = end
+            while pos < len(code) and code[pos] in patterns.spaceChars: pos += 1
+            if code[pos:pos+1] != '(' or linked.intersection(range(start,end)): continue
+            linked.update(range(start,end))
+            inserts[start] = '<A HREF="'+href+'">'
+            inserts[end]   = '</A>'
+
+    if not inserts: return code
+    html = []
+    last = 0
+    for pos in sorted(inserts.keys()):
+        html.append(code[last:pos])
+        html.append(inserts[pos])
+        last = pos
+    html.append(code[last:])
+    return ''.join(html)
@@ -158,7 +158,14 @@ class HyperConf(IniParser):
             export_unittests = '0',
             whereused_scan_shortrefs = '0',
             whereused_scan_instring = '0',
+            whereused_scan_engine = 'regex',
+            jobs = '1',
             cache = '1',
+            cache_backend = 'files',
+            cache_precheck = '1',
+            content_cache_size = '64',
+            mmap_size = '100',
+            incremental = '1',
             link_code_calls = '1'
         )
         # Section LOGGING
@@ -201,6 +208,12 @@ class HyperConf(IniParser):
             object2file = '1',
             object2object = '1',
             deltmp = '1',
+            timeout = '0',
+            subgraph_depth = '0',
+            subgraph_objects = 'pkg view',
+            cache_days = '30',
+            format = 'png',
+            layout = '',
         )
         # Section COLORS
         colors = dict (
@@ -9,6 +9,7 @@ __revision__ = '$Id$'
 
 from .javadoc import JavaDoc, PackageTaskList
 from iz_tools.typecheck import nullDict
+from array import array
 
 class ElemInfo(object):
     """ Object to hold information about a function, or procedure """
@@ -141,6 +142,16 @@ class FileInfo(object):
         self.bytes = 0
         self.xmlbytes = 0
         self.xmlcodebytes = 0
+        self.cached = False # objects have been taken from the cache (file unchanged since the last run)
+        self.source = None  # lexed source code (parsers.lexer.SourceText), shared by the scans
+        self.usingIndex = None # index of the objects by line (parsers.sqlfinder.UsingIndex)
+
+    def __getstate__(self):
+        """ The lexed source and the index are not stored along (e.g. with the cache) """
+        state = self.__dict__.copy()
+        state['source'] = None
+        state['usingIndex'] = None
+        return state
 
     def __repr__(self):
         ret  = self.fileType +' file "'+ self.fileName +'":\n  '
@@ -163,6 +174,217 @@ class FileInfo(object):
         return self.uniqueName + '.html'
 
 
+class DepGraphData(object):
+    """
+    Collects the dependency graphs (file2file, file2object, object2file and
+    object2object). Node names are stored once, and referred to by their index;
+    the rows of each graph are kept in integer columns: edges as (from, to), and
+    node properties as (node, -1 - index of the node kind). The DOT lines are
+    only generated when needed (see getLines) - for a complete graph, or just
+    for the neighbourhood of a node (see getNeighbourhood).
+    """
+    graphs = ['file2file','file2object','object2file','object2object']
+
+    def __init__(self):
+        """ Initialize the (empty) graphs """
+        self.names = []   # node names
+        self.ids   = {}   # node name -> index
+        self.kinds = []   # node kinds (object types, as used with metaInfo.colors)
+        self.labels = {}  # node index -> name as written in the code (node names are lowercase), see getLabel
+        self.src   = {}   # graph -> array of row sources (node index)
+        self.dst   = {}   # graph -> array of row targets (node index, or -1 - kind index for node properties)
+        self.seen  = set() # keys of the rows already added (see rowKey), dropped by compact()
+        self.incident = {} # graph -> {node index -> indices of its rows}, collected by getNeighbourhood
+        for gtyp in self.graphs:
+            self.src[gtyp] = array('l')
+            self.dst[gtyp] = array('l')
+
+    def nodeId(self,name):
+        """
+        Obtain the index of a node, adding it if it is not known yet
+        @param self
+        @param string name node name
+        @return int index
+        """
+        try:
+            return self.ids[name]
+        except KeyError:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+            return self.ids[name]
+
+    def rowKey(self,gidx,src,dst):
+        """
+        Obtain the (integer) key of a row, to check whether it is already there
+        @param self
+        @param int gidx index of the graph (in self.graphs)
+        @param int src source node index
+        @param int dst target node index, or -1 - kind index
+        @return int key
+        """
+        return (src << 35) + ((dst + 0x100000000) << 2) + gidx # dst may be negative
+
+    def addRow(self,gtyp,src,dst):
+        """
+        Add a row to a graph unless it is already there
+        @param self
+        @param string gtyp graph to add to (file2file, file2object...)
+        @param int src source node index
+        @param int dst target node index, or -1 - kind index
+        @return boolean added whether the row was new
+        """
+        if self.seen is None: # compacted: collect the keys again
+            self.seen = set()
+            for gidx in range(len(self.graphs)):
+                gsrc = self.src[self.graphs[gidx]]
+                gdst = self.dst[self.graphs[gidx]]
+                for idx in xrange(len(gsrc)): self.seen.add(self.rowKey(gidx,gsrc[idx],gdst[idx]))
+        key = self.rowKey(self.graphs.index(gtyp),src,dst)
+        if key in self.seen: return False
+        self.seen.add(key)
+        self.incident.pop(gtyp,None)
+        self.src[gtyp].append(src)
+        self.dst[gtyp].append(dst)
+        return True
+
+    def addEdge(self,gtyp,ofrom,oto):
+        """
+        Add an edge to a graph unless it is already there
+        @param self
+        @param string gtyp graph to add to (file2file, file2object...)
+        @param string ofrom name of the source node
+        @param string oto name of the target node
+        @return boolean added whether the edge was new
+        """
+        return self.addRow(gtyp,self.nodeId(ofrom),self.nodeId(oto))
+
+    def addNode(self,gtyp,name,kind,label=None):
+        """
+        Add the properties (i.e. the colors) of a node to a graph unless they
+        are already there
+        @param self
+        @param string gtyp graph to add to (file2file, file2object...)
+        @param string name node name
+        @param string kind node kind (object type, as used with metaInfo.colors)
+        @param optional string label name of the object as written in the code
+        @return boolean added whether the properties were new
+        """
+        if kind not in self.kinds: self.kinds.append(kind)
+        node = self.nodeId(name)
+        if label: self.labels.setdefault(node,label)
+        return self.addRow(gtyp,node,-1 - self.kinds.index(kind))
+
+    def compact(self):
+        """
+        Release the memory only needed while adding rows (i.e. the keys to
+        check for duplicates), once all graphs are complete
+        @param self
+        """
+        self.seen = None
+
+    def count(self,gtyp):
+        """
+        Obtain the number of rows (edges and node properties) of a graph
+        @param self
+        @param string gtyp graph (file2file, file2object...)
+        @return int rows
+        """
+        return len(self.src[gtyp])
+
+    def getNodes(self,gtyp,kinds):
+        """
+        Obtain the names of the nodes of the given kinds in a graph
+        @param self
+        @param string gtyp graph (file2file, file2object...)
+        @param list kinds node kinds (object types)
+        @return list names (sorted)
+        """
+        wanted = set([-1 - self.kinds.index(kind) for kind in kinds if kind in self.kinds])
+        dsts = self.dst[gtyp]
+        nodes = set([self.src[gtyp][idx] for idx in xrange(len(dsts)) if dsts[idx] in wanted])
+        return sorted([self.names[node] for node in nodes])
+
+    def getLabel(self,name):
+        """
+        Obtain the name of a node as written in the code (see addNode)
+        @param self
+        @param string name node name
+        @return string label (the node name if there is none)
+        """
+        return self.labels.get(self.ids.get(name),name)
+
+    def getNeighbourhood(self,gtyp,name,depth,colors):
+        """
+        Obtain the DOT text for the part of a graph around a node: the nodes up
+        to depth edges away from it (in either direction), with all rows between
+        them. The node itself is drawn with a double border.
+        @param self
+        @param string gtyp graph (file2file, file2object...)
+        @param string name name of the node
+        @param int depth max number of edges between the node and its neighbours
+        @param dict colors colors per node kind ([bg,fg], see metaInfo.colors)
+        @return string text
+        """
+        srcs = self.src[gtyp]
+        dsts = self.dst[gtyp]
+        if gtyp not in self.incident:
+            incident = {}
+            for idx in xrange(len(srcs)):
+                incident.setdefault(srcs[idx],[]).append(idx)
+                if dsts[idx] >= 0 and dsts[idx] != srcs[idx]: incident.setdefault(dsts[idx],[]).append(idx)
+            self.incident[gtyp] = incident
+        incident = self.incident[gtyp]
+        center = self.ids[name]
+        nodes = set([center])
+        border = [center]
+        for hop in range(depth):
+            reached = []
+            for node in border:
+                for idx in incident.get(node,[]):
+                    for other in (srcs[idx], dsts[idx]):
+                        if other >= 0 and other not in nodes:
+                            nodes.add(other)
+                            reached.append(other)
+            border = reached
+        rows = set()
+        for node in nodes:
+            for idx in incident.get(node,[]):
+                if dsts[idx] < 0 or (srcs[idx] in nodes and dsts[idx] in nodes): rows.add(idx)
+        lines = list(self.getLines(gtyp,colors,sorted(rows)))
+        lines.append('"' + name + '" [peripheries=2];')
+        return '\n'.join(lines)
+
+    def getLines(self,gtyp,colors,rows=None):
+        """
+        Generate the DOT lines of a graph, in the order their rows were added
+        @param self
+        @param string gtyp graph (file2file, file2object...)
+        @param dict colors colors per node kind ([bg,fg], see metaInfo.colors)
+        @param optional list rows indices of the rows to include (default: all)
+        @return generator lines
+        """
+        names = self.names
+        dsts = self.dst[gtyp]
+        if rows is None: rows = xrange(len(dsts))
+        for idx in rows:
+            dst = dsts[idx]
+            if dst >= 0:
+                yield '"' + names[self.src[gtyp][idx]] + '" -> "' + names[dst] + '";'
+            else:
+                color = colors[self.kinds[-1 - dst]]
+                yield '"' + names[self.src[gtyp][idx]] + '" [color="'+color[0]+'",fontcolor="'+color[1] + '"];'
+
+    def getDot(self,gtyp,colors):
+        """
+        Obtain the DOT text of a graph (without the surrounding digraph)
+        @param self
+        @param string gtyp graph (file2file, file2object...)
+        @param dict colors colors per node kind ([bg,fg], see metaInfo.colors)
+        @return string text
+        """
+        return '\n'.join(self.getLines(gtyp,colors))
+
+
 class MetaInfo:
     """ Object to hold global information (e.g. configuration options) """
     def __init__(self):
@@ -179,11 +401,7 @@ class MetaInfo:
         self.linesOfCode['empty'] = 0
         self.indexPage = nullDict() # filename
         self.indexPageName = nullDict()
-        self.depGraph = {}
-        self.depGraph['file2file'] = []
-        self.depGraph['file2object'] = []
-        self.depGraph['object2file'] = []
-        self.depGraph['object2object'] = []
+        self.depGraph = DepGraphData()
         self.colors = {}
 
     def NextIndex(self):
@@ -10,6 +10,7 @@ from locale import format as loc_format, setlocale, LC_NUMERIC
 from iz_tools.text import * # includes import re # for eatStrings, countEmptyLines, cleanSQL
 from iz_tools.system import getCallingModule # this module shall not be included in log entries ;)
 from hypercore.logger import logg
+from hypercore import patterns # precompiled regExp patterns for eatStrings, countEmptyLines, cleanSQL
 logger = logg.getLogger()
 
 # Setup gettext support
@@ -52,15 +53,16 @@ def size_format(size,decs=2):
             return num_format( round(size/float(lim/2**10),decs), decs )+suf
 
 
-def getWordLineNr(text,word):
+def getWordLineNr(text,word,lines=None):
     """
     Wrapper to getWordLineNr from iz_tools.text catching possible errors
     @param string text Text to search IN
     @param string word WORD to search FOR
+    @param optional object lines LineIndex of the text (see iz_tools.text.getWordLineNo)
     @return list res
     """
     try:
-        res = getWordLineNo(text,word)
+        res = getWordLineNo(text,word,lines)
     except:
         logger.error(_('RegExp error searching for "%s"'), word)
         res = []
@@ -78,8 +80,7 @@ def eatStrings(text):
     def repl(m):
         ret = '\n'*m.group(0).count('\n')
         return '\'%s\'' % ret
-    strpatt = re.compile("('[^']*')+")    # String-Regexp
-    text, matches = re.subn(strpatt,repl,text)
+    text, matches = patterns.string.subn(repl,text)
     return text, matches>0
 
 def countEmptyLines(text):
@@ -88,8 +89,7 @@ def countEmptyLines(text):
     @param string text Text to investigate
     @return int hits Number of empty lines (according to above specification)
     """
-    patt = re.compile("(^[ \t\f\v]*$)",re.M)
-    return len(patt.findall(text))
+    return len(patterns.emptyLine.findall(text))
 
 def cleanSQL(text,strings=False):
     """
@@ -100,11 +100,11 @@ def cleanSQL(text,strings=False):
     @return dict stat Some line stats: int (all,empty,comment,mixed,code), boolean matched_string
     @raise TypeError when text neither str nor list
     """
-    # define some regExp patterns:
-    pattIComm = re.compile('[ \t\f\v]*--.*',re.M)   # inline comment
-    pattMComm = re.compile(r'\S[ \t\f\v]*--.*',re.M)# inline comment with preceding code
-    pattBComm = re.compile('/\\*.*?\\*/',re.M|re.S) # block comment
-    pattEnd   = re.compile('\s*\n$')                # text ending with LF
+    # regExp patterns used:
+    pattIComm = patterns.commentInline # inline comment
+    pattMComm = patterns.commentMixed  # inline comment with preceding code
+    pattBComm = patterns.commentBlock  # block comment
+    pattEnd   = patterns.textEnd       # text ending with LF
 
     # check input, make sure we have 'str' to process
     inputType = type(text).__name__
@@ -122,7 +122,7 @@ def cleanSQL(text,strings=False):
     else: lf_end = False
 
     # Remove comments (and update corresponding stats)
-    text  = re.sub(pattIComm,'',text)   # inline comments
+    text  = pattIComm.sub('',text)      # inline comments
     for hit in pattBComm.findall(text): # Block comments
         nlc   = hit.count('\n')
         text  = text.replace(hit,'\n'*nlc)
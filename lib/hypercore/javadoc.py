@@ -8,8 +8,10 @@ from .gettext_init import langpath, langs
 from sys import maxint, argv as pargs
 from .unittest import testcase_split
 from iz_tools.typecheck import is_list, nullDict # for ScanJavaDoc, JavaDoc
+from iz_tools.text import LineIndex # for ScanJavaDoc
 import re, gettext, locale, os
 from hypercore.logger import logg
+from hypercore import patterns
 logger = logg.getLogger('JavaDoc')
 
 # Setup gettext support
@@ -64,21 +66,21 @@ def HyperScan(text):
     @param string text to scan
     """
     if not JavaDocVars['link_urls']: return text
-    refpatt = re.compile("[^'\"\w\=>](https?\:\/\/[^\s<>\(\)\{\}'\"]+)+")    # URL-Regexp
+    refpatt = patterns.url                                 # URL-Regexp
     result = refpatt.search(text)
     while result != None:
         for g in range(len(result.groups())):
             text = text.replace(result.group(g) , ' <A HREF="'+result.group(g).strip()+'">'+result.group(g).strip()+'</A>')
         result = refpatt.search(text)
     if JavaDocVars['wiki_url'] != '':
-        wikipat = re.compile("[^>](wiki:\S+)+")            # Wiki Page RegExp
+        wikipat = patterns.wikiPage                        # Wiki Page RegExp
         result = wikipat.search(text)
         while result != None:
             for g in range(len(result.groups())):
                 text = text.replace(result.group(g) , ' <A HREF="'+JavaDocVars['wiki_url'].replace('%{page}',result.group(g).split(':')[1])+'">'+result.group(g).strip()+'</A>')
             result = refpatt.search(text)
     if JavaDocVars['ticket_url'] != '':
-        tickpat = re.compile("[^>](ticket:\d+)+")              # Ticket RegExp
+        tickpat = patterns.ticket                          # Ticket RegExp
         result = tickpat.search(text)
         while result != None:
             for g in range(len(result.groups())):
@@ -437,9 +439,9 @@ class JavaDoc(object):
         if len(self.desc) < 1:
           return ''
         if JavaDocVars['javadoc_shortdesc_mode'] == 'line':
-          shorty = re.match(r"""(.+?(\n)|.+)""",self.desc[0])
+          shorty = patterns.jdShortLine.match(self.desc[0])
         else:
-          shorty = re.match(r"""(.+?([\.\!\?;]\s|\n)|.+)""",self.desc[0])
+          shorty = patterns.jdShortUnit.match(self.desc[0])
         return shorty.group(1).strip() or self.desc[0]
 
 
@@ -744,20 +746,16 @@ def ScanJavaDoc(text,fileName,lineNo=0):
     @return list of JavaDoc instances
     """
     if is_list(text): text = ''.join(text)
-    reTagEnd    = r'(\n\s*\**\s*@|\*\/)' # end of tag/desc definition
-    reLineStart = r'(\n\s*\**\s*)'       # start of a line, incl. optional '*'
-    reLineStartPre = r'(\n\s*\**)'       # start of a line for preformatted text (e.g. @verbatim), incl. optional '*'
-    pattLeading = re.compile(r'^\s*\**\s*')
-    pattTag     = re.compile(reLineStart+r'(@\w+)([ \t\f\v]*)([^\n]*.*?)\s*'+reTagEnd, re.M|re.S|re.I)
-    pattBreak   = re.compile(reLineStart) # line break inside a tag desc
-    pattBreakPre = re.compile(reLineStartPre) # line break inside a preformatted tag desc (e.g. @verbatim)
+    pattLeading = patterns.jdLeading
+    pattTag     = patterns.jdTag
+    pattBreak   = patterns.jdBreak    # line break inside a tag desc
+    pattBreakPre = patterns.jdBreakPre # line break inside a preformatted tag desc (e.g. @verbatim)
 
     blocks = []
     items  = []
-    for m in re.finditer(r'/\*\*(.*?)\*/', text, re.M|re.S): # Collect JavaDoc blocks w/ their position
-        start = m.start()
-        lineno = text.count('\n', 0, start) +1 # starts at line 0
-        offset = start - text.rfind('\n', 0, start)
+    lines  = LineIndex(text)
+    for m in patterns.jdBlock.finditer(text):                # Collect JavaDoc blocks w/ their position
+        lineno, offset = lines.position(m.start())
         block = m.group(0)
         blocks.append((lineno, offset, block))
 
@@ -769,7 +767,7 @@ def ScanJavaDoc(text,fileName,lineNo=0):
         item.file = fileName
         item.lineNumber = lineNumber
         item.file = fileName
-        tdesc = re.search(r'\*\*\s*(.*?)\s*'+reTagEnd,block,re.M|re.S).group(1).strip()
+        tdesc = patterns.jdDesc.search(block).group(1).strip()
         if tdesc != '':
             desc = tdesc.split('\n')
             for i in range(len(desc)): desc[i] = pattLeading.sub('',desc[i]).strip()
@@ -0,0 +1,38 @@
+"""
+$Id$
+HyperSQL Lexicon: vocabularies (SQL keywords and types) shared across the run
+Copyright 2010 Itzchak Rehberg & IzzySoft
+"""
+__revision__ = '$Id$'
+
+import os
+from sys import argv
+
+vocabularies = {} # name -> frozenset of words (see getWords)
+
+def loadWords(fname):
+    """
+    Read a vocabulary file (one word per line, lines starting with '#' being
+    comments), normalizing all words to upper case
+    @param string fname name of the file
+    @return frozenset words
+    """
+    words = set()
+    infile = open(fname)
+    for line in infile:
+        word = line.strip()
+        if word=='' or word[0]=='#': continue
+        words.add(word.upper())
+    infile.close()
+    return frozenset(words)
+
+def getWords(name):
+    """
+    Obtain a vocabulary. It is read from the sql.<name> file next to the
+    HyperSQL script on first request, and kept for the rest of the run
+    @param string name vocabulary to obtain ('keywords' or 'types')
+    @return frozenset words (upper case)
+    """
+    if name not in vocabularies:
+        vocabularies[name] = loadWords((os.path.split(argv[0])[0] or os.getcwd()) + os.sep + 'sql.' + name)
+    return vocabularies[name]
@@ -38,14 +38,18 @@ class hyperopts(object):
         cache.add_option('--cache',dest='cache',action='store_true',help=_('turn the cache on'))
         cache.add_option('--nocache',dest='cache',action='store_false',help=_('turn the cache off'))
         cache.add_option('--cache-dir',dest='cacheDir',help=_('override the cache dir location'))
-        cache.add_option('--purge-cache',dest='purge_cache',choices=['all','code','depdata'],action='append', \
-            help=_('purge the specified cache at the very start. Possible values are: all, code, depdata. Multiple definitions are possible.'))
+        cache.add_option('--cache-backend',dest='cacheBackend',choices=['files','sqlite'],help=_('where to keep the cache entries: one file each (files) or all in a single database (sqlite)'))
+        cache.add_option('--incremental',dest='incremental',action='store_true',help=_('only scan files changed since the last run (requires the cache)'))
+        cache.add_option('--noincremental',dest='incremental',action='store_false',help=_('scan all files, even if they did not change since the last run'))
+        cache.add_option('--purge-cache',dest='purge_cache',choices=['all','code','linkedcode','depdata','depgraph','objects','usage'],action='append', \
+            help=_('purge the specified cache at the very start. Possible values are: all, code, linkedcode, depdata, depgraph, objects, usage. Multiple definitions are possible.'))
         self.parser.add_option_group(cache)
         # Processing options
         proc = OptionGroup(self.parser,_('Processing Options'))
         proc.add_option('--blind-offset',type='int',dest='blind_offset',help=_('set the "blind offset" to this number of lines'))
         proc.add_option('--javadoc',dest='javadoc',action='store_true',help=_('process javadoc'))
         proc.add_option('--nojavadoc',dest='javadoc',action='store_false',help=_('do not process javadoc'))
+        proc.add_option('-j','--jobs',type='int',dest='jobs',help=_('number of parallel jobs to use for scanning the files for objects and usage, and for drawing the dependency graphs (0 = one per CPU)'))
         proc.add_option('--link-calls',dest='linkCalls',action='store_true',help=_('link to targets in code calls'))
         proc.add_option('--nolink-calls',dest='linkCalls',action='store_false',help=_('do not link to targets in code calls'))
         proc.add_option('-p','--page',dest='pages',action='append',help=_('process this page. Multiple definitions (for multiple pages) are possible.'))
@@ -56,6 +60,7 @@ class hyperopts(object):
         proc.add_option('--noscan-instring',dest='scanInString',action='store_false',help=_('do not scan in strings for where/what objects are used'))
         proc.add_option('--scan-shortrefs',dest='scanShortrefs',action='store_true',help=_('scan short references for where/what objects are used'))
         proc.add_option('--noscan-shortrefs',dest='scanShortrefs',action='store_false',help=_('do not scan short references for where/what objects are used'))
+        proc.add_option('--scan-engine',dest='scanEngine',choices=['regex','token'],help=_('engine to use for the where/what used scan. Possible values are: regex, token'))
         proc.add_option('--source',dest='source',action='store_true',help=_('include (and link to) highlighted source'))
         proc.add_option('--nosource',dest='source',action='store_false',help=_('do not include (and link to) highlighted source'))
         proc.add_option('--verify-javadoc',dest='verifyJavadoc',action='store_true',help=_('check for Javadoc errors and write the corresponding report'))
@@ -80,7 +85,10 @@ class hyperopts(object):
         dep.add_option('--graphviz-font',dest='graphvizFont',help=_('name of the font to use for the graphs (e.g. Arial)'))
         dep.add_option('--graphviz-fontsize',dest='graphvizFontSize',type='float',help=_('size of the font to use for the graphs (e.g. 10 or 8.5)'))
         dep.add_option('--depobjects',dest='depObjects',choices=['view','pkg','func','proc'],action='append',help=_('objects to include with the dependency graphs. Multiple specifications (one per required object) are possible.'))
-        dep.add_option('--graphviz-processor',dest='graphvizProc',choices=['dot','fdp','neato','circo'],help=_('which graphviz module to use'))
+        dep.add_option('--graph-format',dest='graphFormat',choices=['png','svg'],help=_('image format of the graphs. Possible values are: png, svg'))
+        dep.add_option('--subgraph-depth',dest='subgraphDepth',type='int',help=_('also draw the neighbourhood of each package and view up to this many edges away (0 = no neighbourhood graphs)'))
+        dep.add_option('--graphviz-timeout',dest='graphvizTimeout',type='int',help=_('max seconds graphviz may take to draw a graph (0 = no limit)'))
+        dep.add_option('--graphviz-processor',dest='graphvizProc',choices=['dot','fdp','neato','circo','builtin'],help=_('which graphviz module to use (builtin: the built-in layered layout)'))
         dep.add_option('--len-fdp',dest='len_fdp',type='float',help=_('len parameter for the fdp processor'))
         dep.add_option('--len-neato',dest='len_neato',type='float',help=_('len parameter for the neato processor'))
         dep.add_option('--mindist-circo',dest='mindist_circo',type='float',help=_('mindist parameter for the circo processor'))
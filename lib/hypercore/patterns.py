@@ -0,0 +1,55 @@
+"""
+$Id$
+HyperSQL regular expressions: the static patterns used by the parsers are
+compiled once when this module is imported. Patterns built at run time (e.g.
+from object names) are obtained via compiled(), which keeps them in a
+size-bounded cache.
+Copyright 2010 Itzchak Rehberg & IzzySoft
+"""
+__revision__ = '$Id$'
+
+import re
+from iz_tools.text import patternCache
+
+def compiled(pattern,flags=0):
+    """
+    Obtain a compiled pattern built at run time
+    @param string pattern RegExp pattern
+    @param optional int flags RegExp flags (as with re.compile)
+    @return object compiled pattern
+    """
+    return patternCache.get(pattern,flags)
+
+#------------------------------------------------------[ parsers.sqlfinder ]---
+blockComment     = re.compile("/\*.*?\*/",re.DOTALL)     # /* comments */
+fullLineComment  = re.compile("\n\s*--.*\n")             # full-line -- comments
+inlineCommentLF  = re.compile("--[^']*?\n")              # in-line -- comments (within text)
+inlineCommentEnd = re.compile("--[^']*?$")               # in-line -- comment (at the end of a line)
+paramDefault     = re.compile(":=\s*'.*?'\s*([,\)])",re.MULTILINE) # defaults of parameters
+word             = re.compile(r'\w+')                    # plain words
+plainWord        = re.compile(r'\w+\Z')                  # names which are plain words
+spaceChars       = ' \t\n\r\f\v'                     # what \s matches (no re.UNICODE)
+
+#-------------------------------------------------------[ hypercore.helpers ]---
+string           = re.compile("('[^']*')+")              # single-quoted strings
+emptyLine        = re.compile("(^[ \t\f\v]*$)",re.M)     # lines with white space only
+commentInline    = re.compile('[ \t\f\v]*--.*',re.M)     # inline comment
+commentMixed     = re.compile(r'\S[ \t\f\v]*--.*',re.M)  # inline comment with preceding code
+commentBlock     = re.compile('/\\*.*?\\*/',re.M|re.S)   # block comment
+textEnd          = re.compile('\s*\n$')                  # text ending with LF
+
+#-------------------------------------------------------[ hypercore.javadoc ]---
+jdTagEnd         = r'(\n\s*\**\s*@|\*\/)'                # end of tag/desc definition
+jdLineStart      = r'(\n\s*\**\s*)'                      # start of a line, incl. optional '*'
+jdLineStartPre   = r'(\n\s*\**)'                         # start of a line for preformatted text (e.g. @verbatim), incl. optional '*'
+jdBlock          = re.compile(r'/\*\*(.*?)\*/',re.M|re.S) # JavaDoc block
+jdDesc           = re.compile(r'\*\*\s*(.*?)\s*'+jdTagEnd,re.M|re.S) # description of a JavaDoc block
+jdLeading        = re.compile(r'^\s*\**\s*')             # leading white space and '*'
+jdTag            = re.compile(jdLineStart+r'(@\w+)([ \t\f\v]*)([^\n]*.*?)\s*'+jdTagEnd, re.M|re.S|re.I) # tag with its desc
+jdBreak          = re.compile(jdLineStart)               # line break inside a tag desc
+jdBreakPre       = re.compile(jdLineStartPre)            # line break inside a preformatted tag desc (e.g. @verbatim)
+jdShortLine      = re.compile(r"""(.+?(\n)|.+)""")       # short desc: first line
+jdShortUnit      = re.compile(r"""(.+?([\.\!\?;]\s|\n)|.+)""") # short desc: first sentence
+url              = re.compile("[^'\"\w\=>](https?\:\/\/[^\s<>\(\)\{\}'\"]+)+") # URLs
+wikiPage         = re.compile("[^>](wiki:\S+)+")         # Wiki pages
+ticket           = re.compile("[^>](ticket:\d+)+")       # Tickets
@@ -8,9 +8,13 @@ Some useful system functions which mostly mimic PHP (or Shell) equivalents
 #====================================================[ Imports and Presets ]===
 import os       # for which() and getCallingModule()
 import sys      # for which()
+import signal   # for popen()
 from subprocess import Popen,PIPE   # for popen()
 from .typecheck import is_string, is_list  # for file_put_contents (local module typecheck)
 from traceback import extract_stack # for getCaller()
+import mmap                         # for file_map_lines()
+from array import array             # for file_map_lines()
+from threading import Timer         # for popen()
 
 # prepare for fopen (encoding fallback)
 from locale import getdefaultlocale
@@ -21,6 +25,11 @@ try:
 except:
     codecs = None
 
+#=============================================================[ Exceptions ]===
+class ProcessTimeout(Exception):
+    """ A command run via popen() did not finish in time (and was killed) """
+    pass
+
 #==============================================================[ Functions ]===
 #------------------------------------------------------------------[ which ]---
 def which(executable, path=None):
@@ -62,18 +71,40 @@ def which(executable, path=None):
         return None
 
 #------------------------------------------------------------------[ popen ]---
-def popen(command):
+def popen(command,timeout=0):
     """
     Run a command and return its output as string. Mimics he PHP function
     "shell_exec" - with the difference of returning a touple, so stderr is
     also available to evaluation.
     Example call:  mylist, myerr = run('ls -l')
     @param string command
+    @param optional int timeout kill the command if it did not finish after
+           this many seconds (default: 0, i.e. wait until it finishes)
     @return string stdout, string stderr
+    @throws ProcessTimeout if the command was killed after the timeout
     """
-    p = Popen(command, shell=True,stdout=PIPE,stderr=PIPE)
-    out = ''.join(p.stdout.readlines() )
-    outerr = ''.join(p.stderr.readlines() )
+    # the shell may fork the command instead of exec-ing it, so on POSIX the
+    # whole process group must be stopped - or its child keeps our pipes open
+    if hasattr(os, 'setsid'):
+        p = Popen(command, shell=True,stdout=PIPE,stderr=PIPE,preexec_fn=os.setsid)
+    else:
+        p = Popen(command, shell=True,stdout=PIPE,stderr=PIPE)
+    killed = []
+    def kill():
+        try:
+            if hasattr(os, 'killpg'):
+                os.killpg(p.pid, signal.SIGKILL)
+            else:
+                p.kill()
+            killed.append(True)
+        except OSError: # finished meanwhile
+            pass
+    if timeout > 0:
+        timer = Timer(timeout,kill)
+        timer.start()
+    out, outerr = p.communicate()
+    if timeout > 0: timer.cancel()
+    if killed: raise ProcessTimeout(command)
     return out, outerr
 
 #-------------------------------------------------------------[ shell_exec ]---
@@ -145,6 +176,70 @@ def file_get_lines(filename,enc=None):
     infile.close()
     return list
 
+#---------------------------------------------------------[ file_map_lines ]---
+class MappedLines(object):
+    """
+    Read-only list of the lines of a memory-mapped file (see file_map_lines).
+    Only the offsets of the lines are kept in memory, each line is read (and
+    decoded) when it is accessed.
+    """
+    def __init__(self,filename,enc=None):
+        """
+        Map the file and find the start of each line
+        @param self
+        @param string filename name of the file to map
+        @param optional string enc encoding of the file (None for no decoding)
+        @raise ValueError if the file is empty, or lines cannot be told apart
+               without decoding the file first (as with UTF-16)
+        """
+        if codecs is None: enc = None
+        if enc is not None and u'\n'.encode(enc) != '\n':
+            raise ValueError('Cannot map lines of files encoded in %s' % enc)
+        self.enc = enc
+        infile = open(filename,'rb')
+        try:
+            self.map = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            infile.close()
+        self.offsets = array('L',[0])
+        size = self.map.size()
+        pos = self.map.find('\n')
+        while pos != -1 and pos+1 < size:
+            self.offsets.append(pos+1)
+            pos = self.map.find('\n',pos+1)
+        self.offsets.append(size)
+
+    def __len__(self):
+        return len(self.offsets) -1
+
+    def __getitem__(self,idx):
+        if idx < 0: idx += len(self)
+        if idx < 0 or idx >= len(self): raise IndexError('line index out of range')
+        line = self.map[self.offsets[idx]:self.offsets[idx+1]]
+        if self.enc is None: return line
+        return line.decode(self.enc)
+
+    def __iter__(self):
+        for idx in xrange(len(self)): yield self[idx]
+
+    def close(self):
+        """ Unmap the file """
+        self.map.close()
+
+def file_map_lines(filename,enc=None):
+    """
+    Get the lines of the specified file without reading it into memory: the
+    file is memory-mapped, and the lines are decoded on access. Other than with
+    file_get_lines, lines are only split at LF characters.
+    @param string filename name of the file to read
+    @param optional string enc encoding of the file (defaults to system standard
+           evaluated via locale settings)
+    @return object lines MappedLines instance, to be used like a (read-only) list
+    @raise ValueError if the file cannot be mapped (see MappedLines)
+    """
+    if enc is None: enc = encoding
+    return MappedLines(filename,enc)
+
 #------------------------------------------------------[ file_put_contents ]---
 def file_put_contents(filename,content,enc=None,append=False):
     """
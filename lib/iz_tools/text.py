@@ -7,10 +7,81 @@ Some useful functions for string / text processing
 
 #====================================================[ Imports and Presets ]===
 import re       # for getWordLineNo
+from collections import OrderedDict # for PatternCache
+from bisect import bisect_left      # for LineIndex
+
+#================================================================[ Classes ]===
+class PatternCache(object):
+    """
+    Size-bounded cache of compiled regular expressions, dropping the least
+    recently used ones when full (the re module's own cache is simply cleared
+    when it's full - which happens all the time if there are more than 100
+    different patterns in use, as e.g. one per object name)
+    """
+    def __init__(self,size=1000):
+        """
+        Setup the cache
+        @param self
+        @param optional int size how many patterns to keep (default: 1000)
+        """
+        self.size = size
+        self.patterns = OrderedDict() # (pattern, flags) -> compiled pattern
+
+    def get(self,pattern,flags=0):
+        """
+        Obtain the compiled pattern
+        @param self
+        @param string pattern RegExp pattern
+        @param optional int flags RegExp flags (as with re.compile)
+        @return object compiled pattern
+        """
+        key = (pattern, flags)
+        try:
+            patt = self.patterns.pop(key)
+        except KeyError:
+            patt = re.compile(pattern,flags)
+            if len(self.patterns) >= self.size: self.patterns.popitem(last=False)
+        self.patterns[key] = patt # (re-)insert as most recently used
+        return patt
+
+patternCache = PatternCache()
+
+class LineIndex(object):
+    """
+    Index of the line breaks of a text, to find the line (and the position in
+    it) for an offset in the text without counting the line breaks preceding
+    it again and again. The index is built on the first lookup.
+    """
+    def __init__(self,text):
+        """
+        Setup the index
+        @param self
+        @param string text text to index
+        """
+        self.text = text
+        self.breaks = None # sorted positions of all line breaks
+
+    def position(self,pos):
+        """
+        Find the line for an offset
+        @param self
+        @param int pos offset in the text
+        @return int lineno line number (starting with 1)
+        @return int offset position in the line (starting with 1)
+        """
+        if self.breaks is None:
+            self.breaks = []
+            brk = self.text.find('\n')
+            while brk != -1:
+                self.breaks.append(brk)
+                brk = self.text.find('\n',brk+1)
+        idx = bisect_left(self.breaks,pos) # number of line breaks before pos
+        if idx: return idx +1, pos - self.breaks[idx-1]
+        return 1, pos +1
 
 #==============================================================[ Functions ]===
 #--------------------------------------[ Finding lineNo with matching text ]---
-def getWordLineNo(text,pattern):
+def getWordLineNo(text,pattern,lines=None):
     """
     Finding lineNo with matching text
     example:
@@ -19,13 +90,14 @@ def getWordLineNo(text,pattern):
     By: Izzy
     @param string text to parse
     @param string pattern RegExp pattern to find
+    @param optional object lines LineIndex of the text (pass it when searching
+           the same text repeatedly)
     @return list of tuples (lineno, offset, word)
     """
     res = []
-    for m in re.finditer(pattern, text, re.I):
-        start = m.start()
-        lineno = text.count('\n', 0, start) + 1
-        offset = start - text.rfind('\n', 0, start)
+    for m in patternCache.get(pattern, re.I).finditer(text):
+        if lines is None: lines = LineIndex(text)
+        lineno, offset = lines.position(m.start())
         word = m.group(0)
         res.append((lineno, offset, word))
     return res
@@ -15,6 +15,56 @@ class nullDict(dict):
     def __missing__(self,key):
         return None
 
+class uniqueList(list):
+    """
+    A list with a set of its items alongside, so checking whether an item is
+    already contained does not need to walk the list. The items must be
+    hashable (the order is kept). Adding items is cheap; removing or replacing
+    them rebuilds the set.
+    """
+    def __init__(self,items=()):
+        list.__init__(self)
+        self._seen = set()
+        self.extend(items)
+    def __reduce__(self):
+        # pickle restores list items before the instance dict, so let it
+        # re-create us via __init__ instead
+        return (self.__class__, (list(self),))
+    def __contains__(self,item):
+        return item in self._seen
+    def append(self,item):
+        list.append(self,item)
+        self._seen.add(item)
+    def extend(self,items):
+        for item in items: self.append(item)
+    def insert(self,pos,item):
+        list.insert(self,pos,item)
+        self._seen.add(item)
+    def __iadd__(self,items):
+        self.extend(items)
+        return self
+    def _resync(self):
+        self._seen = set(self)
+    def __setitem__(self,pos,item):
+        list.__setitem__(self,pos,item)
+        self._resync()
+    def __delitem__(self,pos):
+        list.__delitem__(self,pos)
+        self._resync()
+    def __setslice__(self,i,j,items):
+        list.__setslice__(self,i,j,items)
+        self._resync()
+    def __delslice__(self,i,j):
+        list.__delslice__(self,i,j)
+        self._resync()
+    def remove(self,item):
+        list.remove(self,item)
+        self._resync()
+    def pop(self,*pos):
+        item = list.pop(self,*pos)
+        self._resync()
+        return item
+
 #==============================================================[ Functions ]===
 #----------------------------------------------------------[ Type checking ]---
 """
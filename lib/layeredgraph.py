@@ -0,0 +1,342 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Layered (Sugiyama style) graph layout, written as SVG
+$Id$
+
+A pure Python replacement for Graphviz to draw the dependency graphs with,
+where the latter is not available (or takes too long). It only understands
+the DOT subset HyperSQL generates:
+  "a" -> "b";                              (edges)
+  "a" [color="#fff",fontcolor="#000"];     (node attributes)
+
+Example usage:
+
+nodes, edges = parse_dot('"a" -> "b";\n"b" -> "c";')
+svg = make_svg(nodes, edges)
+"""
+
+#====================================================[ Imports and Presets ]===
+import re
+from heapq import heapify, heappush, heappop
+
+edgePatt = re.compile(r'^\s*"(.*?)"\s*->\s*"(.*?)"\s*;?\s*$')
+nodePatt = re.compile(r'^\s*"(.*?)"\s*\[(.*)\]\s*;?\s*$')
+attrPatt = re.compile(r'(\w+)\s*=\s*(?:"([^"]*)"|([^,\s\]]+))')
+
+SWEEPS = 4  # number of down/up sweeps for the crossing reduction
+MAXSPAN = 4 # edges spanning more layers are drawn as straight lines (see layout)
+
+
+#============================================================[ DOT parsing ]===
+def parse_dot(text):
+    """
+    Collect the nodes and edges from a (HyperSQL generated) DOT text
+    @param string text the graph definition (without the surrounding digraph)
+    @return list nodes tuples (name, dict attributes) in the order of appearance
+    @return list edges tuples (index source, index target), without duplicates
+    """
+    nodes = []
+    index = {}
+    edges = []
+    seen = set()
+    def node(name):
+        """ Obtain the index of a node, adding it when new """
+        if name not in index:
+            index[name] = len(nodes)
+            nodes.append((name, {}))
+        return index[name]
+    for line in text.split('\n'):
+        m = edgePatt.match(line)
+        if m:
+            edge = (node(m.group(1)), node(m.group(2)))
+            if edge not in seen:
+                seen.add(edge)
+                edges.append(edge)
+            continue
+        m = nodePatt.match(line)
+        if m:
+            attrs = nodes[node(m.group(1))][1]
+            for key, quoted, plain in attrPatt.findall(m.group(2)):
+                attrs[key] = quoted or plain
+    return nodes, edges
+
+
+#=================================================================[ Layout ]===
+def break_cycles(count, edges):
+    """
+    Find a set of edges to reverse for the graph to become acyclic, using the
+    greedy heuristic of Eades, Lin and Smyth: sinks are moved to the end of
+    the node sequence, sources to its front, and else the node with the most
+    outgoing minus incoming edges to the front. The edges pointing backwards
+    in the resulting sequence are reversed - usually far fewer than the back
+    edges of a depth first search, which also keeps the layering flatter.
+    @param int count number of nodes
+    @param list edges tuples (source, target); self loops must be excluded
+    @return set indices of the edges to reverse
+    """
+    succ = [set() for v in xrange(count)]
+    pred = [set() for v in xrange(count)]
+    for u, v in edges:
+        succ[u].add(v)
+        pred[v].add(u)
+    outdeg = [len(succ[v]) for v in xrange(count)]
+    indeg = [len(pred[v]) for v in xrange(count)]
+    alive = [True] * count
+    sinks = [v for v in xrange(count) if outdeg[v] == 0]
+    sources = [v for v in xrange(count) if indeg[v] == 0 and outdeg[v] > 0]
+    heap = [(indeg[v] - outdeg[v], v) for v in xrange(count)]
+    heapify(heap)
+    front = []
+    back = []
+    while len(front) + len(back) < count:
+        # the lists and the heap may hold outdated entries, which are skipped
+        if sinks:
+            v = sinks.pop()
+            if not alive[v]: continue
+            back.append(v)
+        elif sources:
+            v = sources.pop()
+            if not alive[v] or outdeg[v] == 0: continue
+            front.append(v)
+        else:
+            delta, v = heappop(heap)
+            if not alive[v] or delta != indeg[v] - outdeg[v]: continue
+            front.append(v)
+        alive[v] = False
+        for w in succ[v]:
+            if not alive[w]: continue
+            indeg[w] -= 1
+            if indeg[w] == 0 and outdeg[w] > 0: sources.append(w)
+            heappush(heap, (indeg[w] - outdeg[w], w))
+        for w in pred[v]:
+            if not alive[w]: continue
+            outdeg[w] -= 1
+            if outdeg[w] == 0: sinks.append(w)
+            heappush(heap, (indeg[w] - outdeg[w], w))
+    back.reverse()
+    rank = [0] * count
+    for i, v in enumerate(front + back): rank[v] = i
+    return set([idx for idx in xrange(len(edges)) if rank[edges[idx][0]] > rank[edges[idx][1]]])
+
+def assign_layers(count, edges):
+    """
+    Assign the nodes of an acyclic graph to layers (longest path from a source)
+    @param int count number of nodes
+    @param list edges tuples (source, target)
+    @return list layer per node
+    """
+    succ = [[] for v in xrange(count)]
+    indeg = [0] * count
+    for u, v in edges:
+        succ[u].append(v)
+        indeg[v] += 1
+    layer = [0] * count
+    queue = [v for v in xrange(count) if indeg[v] == 0]
+    for u in queue: # the queue grows while we walk it
+        for v in succ[u]:
+            if layer[u] + 1 > layer[v]: layer[v] = layer[u] + 1
+            indeg[v] -= 1
+            if indeg[v] == 0: queue.append(v)
+    return layer
+
+def order_layers(layers, upper, lower, sweeps=SWEEPS):
+    """
+    Reduce the edge crossings by sorting each layer by the barycenter of the
+    neighbours in the layer above (sweeping down) resp. below (sweeping up).
+    Nodes without neighbours there keep their position.
+    @param list layers list of node lists per layer (sorted in place)
+    @param list upper neighbours of each node in the layer above
+    @param list lower neighbours of each node in the layer below
+    @param optional int sweeps number of down/up sweeps
+    """
+    pos = {}
+    for nodes in layers:
+        for i in xrange(len(nodes)): pos[nodes[i]] = i
+    def sweep(rng, adj):
+        """ Sort the given layers by the barycenters of their neighbours in adj """
+        for l in rng:
+            nodes = layers[l]
+            bary = {}
+            for v in nodes:
+                if adj[v]: bary[v] = float(sum([pos[w] for w in adj[v]])) / len(adj[v])
+                else: bary[v] = pos[v]
+            nodes.sort(key=lambda v: (bary[v], pos[v]))
+            for i in xrange(len(nodes)): pos[nodes[i]] = i
+    for s in xrange(sweeps):
+        sweep(xrange(1, len(layers)), upper)
+        sweep(xrange(len(layers) - 2, -1, -1), lower)
+
+def place_layer(nodes, width, desired, gap):
+    """
+    Place the nodes of a layer horizontally as close to their desired positions
+    as their order and widths permit: the average of a left-to-right and a
+    right-to-left pass, both keeping the nodes apart
+    @param list nodes the nodes of the layer (in their order)
+    @param list width width per node
+    @param dict desired desired center per node
+    @param number gap min space between two nodes
+    @return list center per node of the layer (in their order)
+    """
+    n = len(nodes)
+    left = [0.0] * n
+    right = [0.0] * n
+    for i in xrange(n):
+        left[i] = desired[nodes[i]]
+        if i and left[i] < left[i-1] + (width[nodes[i-1]] + width[nodes[i]]) / 2.0 + gap:
+            left[i] = left[i-1] + (width[nodes[i-1]] + width[nodes[i]]) / 2.0 + gap
+    for i in xrange(n - 1, -1, -1):
+        right[i] = desired[nodes[i]]
+        if i < n - 1 and right[i] > right[i+1] - (width[nodes[i+1]] + width[nodes[i]]) / 2.0 - gap:
+            right[i] = right[i+1] - (width[nodes[i+1]] + width[nodes[i]]) / 2.0 - gap
+    return [(left[i] + right[i]) / 2.0 for i in xrange(n)]
+
+def layout(widths, edges, height=30, gap=20, ranksep=60):
+    """
+    Compute a layered layout, top to bottom: cycles are broken by reversing
+    some edges, the nodes are assigned to layers, edges spanning multiple
+    layers (up to MAXSPAN) are split by dummy nodes, the layers are ordered to
+    reduce crossings, and finally the coordinates are assigned.
+    @param list widths width per node
+    @param list edges tuples (source, target); self loops are ignored
+    @param optional number height height of the nodes
+    @param optional number gap min horizontal space between two nodes
+    @param optional number ranksep vertical space between two layers
+    @return list pos tuples (x, y) of the node centers
+    @return list routes for each edge the list of points (x, y) to draw it
+            through (from source to target), or None for self loops
+    """
+    count = len(widths)
+    loops = [u == v for u, v in edges]
+    dag = [e for e, loop in zip(edges, loops) if not loop]
+    reverse = break_cycles(count, dag)
+    dag = [(v, u) if idx in reverse else (u, v) for idx, (u, v) in enumerate(dag)]
+    layer = assign_layers(count, dag)
+
+    # split the edges spanning multiple layers, so each part only connects
+    # neighbouring layers. With many cycles, some edges span very many layers:
+    # those are left out of the ordering, and drawn straight
+    width = list(widths)
+    upper = [[] for v in xrange(count)]
+    lower = [[] for v in xrange(count)]
+    chains = []
+    for u, v in dag:
+        if layer[v] - layer[u] > MAXSPAN:
+            chains.append([u, v])
+            continue
+        chain = [u]
+        for l in xrange(layer[u] + 1, layer[v]):
+            layer.append(l)
+            width.append(0)
+            upper.append([])
+            lower.append([])
+            chain.append(len(layer) - 1)
+        chain.append(v)
+        for a, b in zip(chain, chain[1:]):
+            lower[a].append(b)
+            upper[b].append(a)
+        chains.append(chain)
+
+    layers = [[] for l in xrange(max(layer) + 1 if layer else 0)]
+    for v in xrange(len(layer)): layers[layer[v]].append(v)
+    order_layers(layers, upper, lower)
+
+    # coordinates: pack the layers, then pull the nodes towards their neighbours
+    x = [0.0] * len(layer)
+    for nodes in layers:
+        cursor = 0.0
+        for v in nodes:
+            x[v] = cursor + width[v] / 2.0
+            cursor += width[v] + gap
+    for adj, rng in [(upper, xrange(1, len(layers))), (lower, xrange(len(layers) - 2, -1, -1)),
+                     (upper, xrange(1, len(layers)))]:
+        for l in rng:
+            nodes = layers[l]
+            desired = {}
+            for v in nodes:
+                if adj[v]: desired[v] = sum([x[w] for w in adj[v]]) / len(adj[v])
+                else: desired[v] = x[v]
+            centers = place_layer(nodes, width, desired, gap)
+            for i in xrange(len(nodes)): x[nodes[i]] = centers[i]
+    left = min([x[v] - width[v] / 2.0 for v in xrange(len(x))] or [0])
+    pos = [(x[v] - left, layer[v] * (height + ranksep) + height / 2.0) for v in xrange(len(x))]
+
+    routes = []
+    didx = 0 # index into dag resp. chains
+    for loop in loops:
+        if loop:
+            routes.append(None)
+            continue
+        points = [pos[v] for v in chains[didx]]
+        if didx in reverse: points.reverse()
+        routes.append(points)
+        didx += 1
+    return pos[:count], routes
+
+
+#====================================================================[ SVG ]===
+def escape(text):
+    """
+    Escape a text for use in XML
+    @param string text
+    @return string escaped text
+    """
+    return text.replace('&','&amp;').replace('<','&lt;').replace('>','&gt;').replace('"','&quot;')
+
+def make_svg(nodes, edges, fontname='', fontsize='', ranksep=''):
+    """
+    Lay out a graph and draw it as SVG
+    @param list nodes tuples (name, dict attributes) as returned by parse_dot.
+           The attributes 'color', 'fontcolor' and 'peripheries' are respected.
+    @param list edges tuples (index source, index target)
+    @param optional string fontname font to use (default: Times)
+    @param optional mixed fontsize font size in points (default: 14)
+    @param optional mixed ranksep space between the layers in inches (default: 0.8)
+    @return string svg the SVG document (unicode if any of the names is)
+    """
+    fontname = fontname or 'Times'
+    fontsize = float(fontsize or 14)
+    height = fontsize * 2
+    widths = [len(name) * fontsize * 0.6 + fontsize * 1.5 for name, attrs in nodes]
+    pos, routes = layout(widths, edges, height, fontsize * 1.5, float(ranksep or 0.8) * 72)
+
+    margin = 10
+    gwidth = max([pos[v][0] + widths[v] / 2.0 for v in xrange(len(pos))] or [0]) + 2 * margin
+    gheight = max([p[1] for p in pos] or [0]) + height / 2.0 + 2 * margin
+    out = ['<?xml version="1.0" encoding="UTF-8" standalone="no"?>',
+           '<svg xmlns="http://www.w3.org/2000/svg" width="%dpt" height="%dpt" viewBox="0 0 %d %d">' % (gwidth, gheight, gwidth, gheight),
+           '<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="8" markerHeight="8" orient="auto">'
+           + '<path d="M0,0 L10,5 L0,10 z" fill="#000000"/></marker></defs>',
+           '<g transform="translate(%d,%d)" font-family="%s" font-size="%s">' % (margin, margin, escape(fontname), fontsize)]
+
+    # edges first, so the nodes are drawn on top of them
+    for idx in xrange(len(edges)):
+        points = routes[idx]
+        if points is None: # self loop: a small arc at the right side of the node
+            x, y = pos[edges[idx][0]]
+            x += widths[edges[idx][0]] / 2.0
+            out.append('<path d="M%.1f,%.1f C%.1f,%.1f %.1f,%.1f %.1f,%.1f" fill="none" stroke="#000000" marker-end="url(#arrow)"/>'
+                % (x, y - height / 4.0, x + height, y - height, x + height, y + height, x, y + height / 4.0))
+            continue
+        # start and end at the border of the node boxes, not their centers
+        sx, sy = points[0]
+        tx, ty = points[-1]
+        points = [(sx, sy + (height / 2.0 if ty > sy else -height / 2.0))] + points[1:-1] \
+               + [(tx, ty + (-height / 2.0 if ty > sy else height / 2.0))]
+        out.append('<path d="M' + ' L'.join(['%.1f,%.1f' % p for p in points])
+                   + '" fill="none" stroke="#000000" marker-end="url(#arrow)"/>')
+
+    for v in xrange(len(nodes)):
+        name, attrs = nodes[v]
+        x, y = pos[v]
+        stroke = ''
+        if attrs.get('peripheries', '1') != '1': stroke = ' stroke-width="3"'
+        out.append('<g><title>%s</title><rect x="%.1f" y="%.1f" width="%.1f" height="%.1f" rx="%.1f" fill="%s" stroke="#000000"%s/>'
+            % (escape(name), x - widths[v] / 2.0, y - height / 2.0, widths[v], height, height / 2.0,
+               escape(attrs.get('color', '#ffffff')), stroke)
+            + '<text x="%.1f" y="%.1f" text-anchor="middle" fill="%s">%s</text></g>'
+            % (x, y + fontsize * 0.35, escape(attrs.get('fontcolor', '#000000')), escape(name)))
+
+    out.append('</g>')
+    out.append('</svg>')
+    return '\n'.join(out) + '\n'
@@ -0,0 +1,269 @@
+"""
+Source code lexer: prepares the lines of a file for the object and usage scans
+"""
+__revision__ = '$Id$'
+
+from bisect import bisect_right
+from hypercore.helpers import eatStrings
+from hypercore import patterns
+
+commentStarts = ('--','//','##') # tokens starting with these start a comment up to the end of the line
+
+
+def dropBlockComment(tokens,in_block_comment):
+    """
+    Remove block comments from the tokens of a line
+    @param list tokens tokens of the line (must not be empty)
+    @param int in_block_comment whether the previous line ended inside a block comment
+    @return list tokens the remaining tokens
+    @return int in_block_comment whether this line ends inside a block comment
+    """
+    if tokens[0][:2] == "/*" and tokens[0][len(tokens[0])-2:len(tokens[0])] == "*/":
+        # block comments like  "/***....*****/"
+        tokens.pop(0)
+    elif tokens[0][:2] == "/*" or in_block_comment == 1:
+        # the remainder of a line starting (or continuing) a block comment is skipped
+        # completely - even if the comment ends on it
+        in_block_comment = 1
+        for token in tokens:
+            if token[:2] == "*/": in_block_comment = 0
+        tokens = []
+    return tokens, in_block_comment
+
+
+class SourceText(object):
+    """
+    Prepares the lines of a source file with a single pass for both the object
+    and the usage scan: comments and strings are removed, the remaining lines
+    are split into tokens, and the lines are classified for the lines-of-code
+    statistics. Both scans see their lines exactly as they used to when each
+    of them stripped the text on its own:
+    - for the object scan (getObjTokens, getObjCode), in-line comments are cut
+      off before the strings are removed
+    - for the usage scan (getUseLine, getUseTokens), the strings are removed
+      unless they shall be included in the scan
+    The first line never has its strings removed.
+    If the lines are no list (but e.g. those of a memory-mapped file, see
+    iz_tools.system.file_map_lines), the results are not kept: only the state
+    at the start of each line is, and the line is lexed again when accessed.
+    """
+
+    def __init__(self,lines,eatUsageStrings=True):
+        """
+        Lex the given lines
+        @param self
+        @param list lines lines of the file (including their line breaks)
+        @param optional boolean eatUsageStrings whether to remove strings for the
+               usage scan (default: True)
+        """
+        self.lines     = lines # the lines as read from the file
+        self.eatUsageStrings = eatUsageStrings
+        self.lean      = not isinstance(lines,list)
+        self.objTokens = []    # tokens of the lines for the object scan (the complete lines)
+        self.objCode   = []    # tokens remaining for the object scan after removing block comments, or None for lines to skip
+        self.useLines  = []    # lines for the usage scan
+        self.useTokens = []    # tokens remaining for the usage scan after removing comments, or None for lines to skip
+        self.classes   = []    # LOC class per line: 'code', 'comment', 'empty' or 'mixed'
+        self.states    = bytearray() # block comment states at the start of each line (lean mode only)
+        if self.lean: self.states = bytearray(len(lines))
+        self.recent    = {}    # the lines lexed last (lean mode only, as the scans access each line more than once)
+        self._paramText = None
+        obj_block = 0
+        use_block = 0
+        for lineNumber in xrange(len(lines)):
+            objLine, useLine, eaten = self.lexLine(lineNumber)
+            if self.lean: self.states[lineNumber] = obj_block + 2*use_block
+
+            # object scan
+            tokens = objLine.split()
+            code, cls, obj_block = self.objectCode(objLine,list(tokens),obj_block)
+            if eaten and cls == 'empty': cls = 'code'
+            self.classes.append(cls)
+
+            # usage scan
+            utokens, use_block = self.usageCode(useLine,use_block)
+            if not self.lean:
+                self.objTokens.append(tokens)
+                self.objCode.append(code)
+                self.useLines.append(useLine)
+                self.useTokens.append(utokens)
+
+    def lexLine(self,lineNumber):
+        """
+        Remove comments and strings from a line
+        @param self
+        @param int lineNumber index of the line
+        @return string objLine the line for the object scan
+        @return string useLine the line for the usage scan
+        @return boolean eaten whether the line consisted of strings only (and is
+                empty now)
+        """
+        line = self.lines[lineNumber]
+        stripped = patterns.inlineCommentEnd.sub("" ,line) # remove in-line -- comments for object parse (EXPERIMENTAL!)
+        if lineNumber == 0:
+            objLine = stripped
+            eaten = False
+        else:
+            objLine, matched_string = eatStrings(stripped)
+            eaten = matched_string and len(objLine.split()) < 1 # that line was completely eaten
+        if lineNumber == 0 or not self.eatUsageStrings:
+            useLine = line
+        elif len(stripped) == len(line): # no in-line comment, so no need to eat the strings again
+            useLine = objLine
+        else:
+            useLine, matched_string = eatStrings(line)
+        return objLine, useLine, eaten
+
+    def lexRecent(self,lineNumber):
+        """
+        Remove comments and strings from a line (see lexLine), re-using the
+        results for the lines lexed last
+        @param self
+        @param int lineNumber index of the line
+        @return tuple (objLine, useLine, eaten)
+        """
+        if lineNumber not in self.recent:
+            if len(self.recent) > 2: self.recent.clear()
+            self.recent[lineNumber] = self.lexLine(lineNumber)
+        return self.recent[lineNumber]
+
+    def getObjTokens(self,lineNumber):
+        """
+        Obtain the tokens of a line for the object scan
+        @param self
+        @param int lineNumber index of the line
+        @return list tokens (not to be modified)
+        """
+        if not self.lean: return self.objTokens[lineNumber]
+        return self.lexRecent(lineNumber)[0].split()
+
+    def getObjCode(self,lineNumber):
+        """
+        Obtain the tokens of a line remaining for the object scan
+        @param self
+        @param int lineNumber index of the line
+        @return list tokens (not to be modified), or None if the line is to be skipped
+        """
+        if not self.lean: return self.objCode[lineNumber]
+        objLine = self.lexRecent(lineNumber)[0]
+        return self.objectCode(objLine,objLine.split(),self.states[lineNumber] & 1)[0]
+
+    def getUseLine(self,lineNumber):
+        """
+        Obtain a line for the usage scan
+        @param self
+        @param int lineNumber index of the line
+        @return string line
+        """
+        if not self.lean: return self.useLines[lineNumber]
+        return self.lexRecent(lineNumber)[1]
+
+    def getUseTokens(self,lineNumber):
+        """
+        Obtain the tokens of a line remaining for the usage scan
+        @param self
+        @param int lineNumber index of the line
+        @return list tokens (not to be modified), or None if the line is to be skipped
+        """
+        if not self.lean: return self.useTokens[lineNumber]
+        return self.usageCode(self.lexRecent(lineNumber)[1],self.states[lineNumber] >> 1)[0]
+
+    def usageCode(self,line,in_block_comment):
+        """
+        Remove the comments from a line for the usage scan
+        @param self
+        @param string line the line (with strings removed)
+        @param int in_block_comment whether the previous line ended inside a block comment
+        @return mixed tokens remaining tokens, or None if the line is to be skipped
+        @return int in_block_comment whether this line ends inside a block comment
+        """
+        tokens = line.split()
+        if len(tokens) < 1 or tokens[0][:2] in commentStarts:
+            return None, in_block_comment # empty lines, or lines starting with comments
+        tokens, in_block_comment = dropBlockComment(tokens,in_block_comment)
+        if len(tokens) == 0: return None, in_block_comment # nothing more on line
+        return tokens, in_block_comment
+
+    def objectCode(self,line,tokens,in_block_comment):
+        """
+        Classify a line for the object scan
+        @param self
+        @param string line the line (with in-line comments and strings removed)
+        @param list tokens tokens of the line
+        @param int in_block_comment whether the previous line ended inside a block comment
+        @return mixed tokens remaining tokens, or None if the line is to be skipped
+        @return string class LOC class of the line
+        @return int in_block_comment whether this line ends inside a block comment
+        """
+        cls = 'mixed'
+        if in_block_comment == 0 and line.strip() != '' \
+          and line.find('--') == -1 and line.find('//') == -1 \
+          and line.find('##') == -1 and line.find('/*') == -1:
+            cls = 'code'
+
+        # ignore lines that begin with comments
+        if len(tokens) > 0 and tokens[0][:2] in commentStarts:
+            return None, 'comment', in_block_comment
+
+        # ignore very short lines
+        if len(tokens) < 2:
+            if len(tokens) == 0:
+                return None, 'empty', in_block_comment
+            if tokens[0][:2] != "/*" and tokens[0][:2] != "*/":
+                return None, cls, in_block_comment
+
+        # ignore block comments
+        tokens, in_block_comment = dropBlockComment(tokens,in_block_comment)
+        if len(tokens) == 0:
+            # nothing more on line
+            return None, 'comment', in_block_comment # we had just comments in this line (???)
+        return tokens, cls, in_block_comment
+
+    def getLoc(self):
+        """
+        Obtain the lines-of-code statistics of the file
+        @param self
+        @return dict loc count of lines per LOC class ('totals','code','comment','empty')
+        """
+        loc = dict.fromkeys(['code','comment','empty'],0)
+        for cls in self.classes:
+            if cls in loc: loc[cls] += 1
+        loc['totals'] = len(self.lines)
+        return loc
+
+    def getJavaDocText(self):
+        """
+        Obtain the text to scan for JavaDoc. For memory-mapped files, this only
+        holds the JavaDoc blocks (at their original lines), so the complete
+        file does not need to be decoded at once.
+        @param self
+        @return mixed text (list of lines or string)
+        """
+        if not self.lean or not hasattr(self.lines,'map'): return self.lines
+        text = []
+        lineNumber = 0
+        for m in patterns.jdBlock.finditer(self.lines.map):
+            start = bisect_right(self.lines.offsets, m.start()) -1
+            block = m.group(0)
+            if self.lines.enc: block = block.decode(self.lines.enc)
+            text.append('\n' * (start - lineNumber))
+            text.append(block)
+            lineNumber = start + block.count('\n')
+        return ''.join(text)
+
+    def getParamText(self):
+        """
+        Obtain the text of the file without comments and parameter defaults,
+        as used for parsing the parameters of functions and procedures. It is
+        only prepared on the first call, as files without those don't need it.
+        @param self
+        @return string text
+        """
+        if self._paramText is None:
+            text = '\n'.join(self.lines)
+            text = patterns.blockComment.sub("" ,text)        # remove /* comments */
+            text = patterns.fullLineComment.sub("" ,text)     # remove full-line -- comments
+            text = patterns.inlineCommentLF.sub("" ,text)     # remove in-line -- comments
+            text = patterns.paramDefault.sub(r"\1" ,text)     # filter out defaults from parameters (catches more, we don't care here)
+            self._paramText = text
+        return self._paramText
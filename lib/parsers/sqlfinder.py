@@ -3,12 +3,16 @@ Scan for (PL/)SQL objects
 """
 __revision__ = '$Id$'
 
-from iz_tools.system import fopen
-from hypercore.helpers  import eatStrings, getWordLineNr
+from hypercore.helpers  import eatStrings
+from hypercore import patterns
+from parsers.usagematcher import UsageMatcher, UsageTokenIndex
+from parsers.lexer import SourceText
+from iz_tools.typecheck import uniqueList
 from hypercore.elements import *
 from hypercore.javadoc  import *
 import hypercore.cache
-import re, gettext, locale, os
+import re, gettext, locale, os, multiprocessing
+from bisect import bisect_left
 from hypercore.logger import logg
 logname = 'ParseSQL'
 logger = logg.getLogger(logname)
@@ -25,6 +29,8 @@ try:
 except:
     pass
 
+usageJob = {} # matcher and cache for ScanUsageJob, inherited by the worker processes
+
 
 #============================================================[ Object Scan ]===
 #------------------------------------------------------------------------------
@@ -148,7 +154,7 @@ def parseForm(file_info):
     pck_mark  = metaInfo.config.get('Forms','pck_mark','Package Body').upper()
     formcode = ''
 
-    if metaInfo.useCache: cache = hypercore.cache.cache(metaInfo.cacheDirectory)
+    if metaInfo.useCache: cache = hypercore.cache.getCache(metaInfo.cacheDirectory,metaInfo.cacheBackend)
 
     form = OraForm(file_info.fileName)
     modinfo = form.getModuleInfo()
@@ -224,6 +230,7 @@ def parseForm(file_info):
     #file_info.lines = formcode.count('\n')
     if metaInfo.useCache and not cache.check(file_info.fileName,'formcode'):
         cache.put(file_info.fileName, 'formcode', formcode)
+    hypercore.cache.contents.put((file_info.fileName,'formcode'), formcode, len(formcode))
     if metaInfo.useJavaDoc:
         jdoc = ScanJavaDoc(formcode, file_info.fileName)
         FormInfoAppendJavadoc(form_info,'form',jdoc)
@@ -249,6 +256,391 @@ def parseForm(file_info):
             appendGlobalTasks('func',form_info,proc.javadoc,proc.uniqueNumber)
 
 
+#------------------------------------------------------------------------------
+def getSource(file_info):
+    """
+    Obtain the lexed source of a file. It is kept with the FileInfo, so the
+    file is read and lexed only once for both the object and the usage scan
+    @param object file_info FileInfo of the file
+    @return object source SourceText of the file
+    """
+    if getattr(file_info,'source',None) is None: # FileInfo may come from the cache
+        lines = hypercore.cache.contents.readLines(file_info.fileName, metaInfo.encoding)
+        file_info.source = SourceText(lines, not metaInfo.scanInString)
+    return file_info.source
+
+
+#------------------------------------------------------------------------------
+def ScanFileForObjects(file_info):
+    """
+    Scans a single file for views, packages etc. (see ScanFilesForObjects),
+    storing the objects found with the passed FileInfo object and updating
+    the lines-of-code counters in metaInfo
+    @param object file_info FileInfo of the file to scan
+    """
+    # skip all non-sql files
+    if file_info.fileType not in ['sql','xml']:
+        return
+
+    # Oracle Forms XML files have special processing:
+    if file_info.fileType in ['xml'] and metaInfo.indexPage['form'] !='':
+        parseForm(file_info)
+        return
+
+    #### All other files (except for Oracle Forms XML) are processed here:
+    source = getSource(file_info)
+    file_info.lines = len(source.lines)
+    file_info.bytes  = os.path.getsize(file_info.fileName)
+    if file_info.lines < 1:
+        return              # skip empty files
+
+    # scan this file for possible JavaDoc style comments
+    if metaInfo.useJavaDoc:
+        jdoc = ScanJavaDoc(source.getJavaDocText(), file_info.fileName)
+    else:
+        jdoc = []
+
+    # if we find a package definition, this flag tells us to also look for
+    # functions and procedures.  If we don't find a package definition, there
+    # is no reason to look for them
+    package_count = -1
+    pks_count = -1
+
+    loc = source.getLoc()
+    for what in ['totals','code','comment','empty']: metaInfo.incLoc(what,loc[what])
+    for lineNumber in range(file_info.lines):
+        token_list = source.getObjCode(lineNumber)
+        if token_list is None: continue # empty lines, comments
+        token_list = list(token_list)
+        # len()-1 because we start with index 0
+        if len(source.lines)-1 > lineNumber:
+            token_list1 = source.getObjTokens(lineNumber+1)
+        else:
+            token_list1 = []
+
+        for token_index in range(len(token_list)):
+            # find types
+            if metaInfo.indexPage['type']:
+                # look for CREATE [OR REPLACE] TYPE [schema.]trigger (...), making sure enough tokens exist
+                if len(token_list) > token_index+1 \
+                and token_list[token_index+1].upper() == "TYPE" \
+                and token_list[token_index].upper() in ['CREATE','REPLACE']:
+                    tab_info = StandAloneElemInfo()
+                    tab_info.parent = file_info
+                    if len(token_list) > token_index+2:
+                      tab_info.name = token_list[token_index+2]
+                    else:
+                      tab_info.name = token_list1[0]
+                    tab_info.name = fixQuotedName(tab_info.name)
+                    ElemInfoAppendJdoc(tab_info,'type',lineNumber+1,jdoc)
+                    file_info.typeInfoList.append(tab_info)
+                    continue
+
+            # find trigger.
+            if metaInfo.indexPage['trigger']:
+                # look for CREATE [OR REPLACE] TRIGGER [schema.]trigger (...), making sure enough tokens exist
+                if len(token_list) > token_index+1 \
+                and token_list[token_index+1].upper() == "TRIGGER" \
+                and token_list[token_index].upper() in ['CREATE','REPLACE']:
+                    tab_info = StandAloneElemInfo()
+                    tab_info.parent = file_info
+                    if len(token_list) > token_index+2:
+                      tab_info.name = token_list[token_index+2]
+                    else:
+                      tab_info.name = token_list1[0]
+                    tab_info.name = fixQuotedName(tab_info.name)
+                    ElemInfoAppendJdoc(tab_info,'trigger',lineNumber+1,jdoc)
+                    file_info.triggerInfoList.append(tab_info)
+                    continue
+
+            # find tables.
+            if metaInfo.indexPage['tab']:
+                # look for CREATE [GLOBAL TEMPORARY] TABLE [schema.]table (...), making sure enough tokens exist
+                if len(token_list) > token_index+1 \
+                and token_list[token_index+1].upper() == "TABLE" \
+                and token_list[token_index].upper() in ['CREATE','TEMPORARY']:
+                    tab_info = StandAloneElemInfo()
+                    tab_info.parent = file_info
+                    if len(token_list) > token_index+2:
+                      tab_info.name = token_list[token_index+2]
+                    else:
+                      tab_info.name = token_list1[0]
+                    tab_info.name = fixQuotedName(tab_info.name)
+                    ElemInfoAppendJdoc(tab_info,'table',lineNumber+1,jdoc)
+                    file_info.tabInfoList.append(tab_info)
+                    continue
+
+            # find views
+            if metaInfo.indexPage['view']:
+                # look for CREATE VIEW, REPLACE VIEW, FORCE VIEW, making sure enough tokens exist
+                if len(token_list) > token_index+1 \
+                and token_list[token_index+1].upper() == "VIEW" \
+                and token_list[token_index].upper() in ['CREATE','REPLACE','FORCE','EDITIONABLE']:
+                    view_info = StandAloneElemInfo()
+                    view_info.parent = file_info
+                    if len(token_list) > token_index+2:
+                      view_info.name = token_list[token_index+2]
+                    else:
+                      view_info.name = token_list1[0]
+                    view_info.name = fixQuotedName(view_info.name)
+                    ElemInfoAppendJdoc(view_info,'view',lineNumber+1,jdoc)
+                    file_info.viewInfoList.append(view_info)
+                    continue
+
+            # find mviews.
+            if metaInfo.indexPage['mview']:
+                # CREATE MATERIALIZED VIEW [schema.]mview ...
+                if len(token_list) > token_index+2 \
+                and token_list[token_index+2].upper() == "VIEW" \
+                and token_list[token_index+1].upper() == "MATERIALIZED" \
+                and token_list[token_index].upper() == "CREATE":
+                    view_info = StandAloneElemInfo()
+                    view_info.parent = file_info
+                    if len(token_list) > token_index+3:
+                      view_info.name = token_list[token_index+3]
+                    else:
+                      view_info.name = token_list1[0]
+                    view_info.name = fixQuotedName(view_info.name)
+                    ElemInfoAppendJdoc(view_info,'mview',lineNumber+1,jdoc)
+                    file_info.mviewInfoList.append(view_info)
+                    continue
+
+            # find synonym definitions
+            if metaInfo.indexPage['synonym']:
+                # CREATE [OR REPLACE] [PUBLIC] SYNONYM [schema.]synonym FOR [schema.]object [@dblink]
+                if len(token_list) > token_index+1 \
+                and token_list[token_index+1].upper() == "SYNONYM" \
+                and token_list[token_index].upper() in ['CREATE','REPLACE','PUBLIC'] \
+                and not (token_list[token_index-1].upper()=="DROP" or (token_index>1 and token_list[token_index-2].upper()=="DROP")):
+                    syn_info = StandAloneElemInfo()
+                    syn_info.parent = file_info
+                    if len(token_list) > token_index+2:
+                        syn_info.name = token_list[token_index+2]
+                    else:
+                        syn_info.name = token_list1[0]
+                    syn_info.name = fixQuotedName(syn_info.name)
+                    ElemInfoAppendJdoc(syn_info,'synonym',lineNumber+1,jdoc)
+                    file_info.synInfoList.append(syn_info)
+                    continue
+
+            # find sequence definitions
+            if metaInfo.indexPage['sequence']:
+                # CREATE SEQUENCE [schema.]sequence_name option(s)
+                if len(token_list) > token_index+1 \
+                and token_list[token_index+1].upper() == "SEQUENCE" \
+                and (token_list[token_index].upper() == "CREATE"):
+                    seq_info = StandAloneElemInfo()
+                    seq_info.parent = file_info
+                    if len(token_list) > token_index+2:
+                        seq_info.name = token_list[token_index+2]
+                    else:
+                        seq_info.name = token_list1[0]
+                    seq_info.name = fixQuotedName(seq_info.name)
+                    ElemInfoAppendJdoc(seq_info,'sequence',lineNumber+1,jdoc)
+                    file_info.seqInfoList.append(seq_info)
+                    continue
+
+        # find package definitions - set flag if found
+        # look for CREATE [OR REPLACE] PACKAGE BODY x, making sure enough tokens exist
+        for token_index in range(len(token_list)):
+            if len(token_list) > token_index+2 \
+               and token_list[token_index].upper() in ['CREATE','REPLACE','FORCE'] \
+                   and token_list[token_index+1].upper() == "PACKAGE":
+                if token_list[token_index+2].upper() == "BODY":
+                  package_info = PackageInfo()
+                  package_info.uniqueNumber = metaInfo.NextIndex()
+                  package_info.parent = file_info
+                  package_info.name = fixQuotedName(token_list[token_index+3])
+                  package_info.lineNumber = lineNumber+1
+                  for j in range(len(jdoc)):
+                    ln = jdoc[j].lineNumber - lineNumber
+                    if (package_info.name.lower()==jdoc[j].name.lower() and jdoc[j].objectType=='pkg') or (ln>0 and ln<metaInfo.blindOffset) or (ln<0 and ln>-1*metaInfo.blindOffset):
+                      package_info.javadoc = jdoc[j]
+                  if not package_info.javadoc.ignore: # ignore items with @ignore tag
+                      pi = package_info
+                      jd = pi.javadoc
+                      appendGlobalTasks('pkg',pi,jd,pi.uniqueNumber)
+                      mname = jd.name or pi.name
+                      mands = jd.verify_mandatory()
+                      for mand in mands:
+                        pi.verification.addItem(mname,mand)
+                      if JavaDocVars['javadoc_mandatory'] and package_info.javadoc.isDefault() and 'pkg' in JavaDocVars['javadoc_mandatory_objects']:
+                        logger.warn(_('Package %s has no JavaDoc information attached'), mname)
+                        pi.verification.addItem(mname,'No JavaDoc information available')
+                      file_info.packageInfoList.append(pi) # permanent storage
+                      package_count += 1 # use this flag below
+                else:
+                    package_info = PackageInfo()
+                    package_info.uniqueNumber = metaInfo.NextIndex()
+                    package_info.parent = file_info
+                    package_info.name = fixQuotedName(token_list[token_index+2])
+                    package_info.lineNumber = lineNumber+1
+                    for j in range(len(jdoc)):
+                      ln = jdoc[j].lineNumber - lineNumber
+                      if (package_info.name.lower()==jdoc[j].name.lower() and jdoc[j].objectType=='pkg') or (ln>0 and ln<metaInfo.blindOffset) or (ln<0 and ln>-1*metaInfo.blindOffset):
+                        package_info.javadoc = jdoc[j]
+                    if not package_info.javadoc.ignore: # ignore items with @ignore tag
+                        pi = package_info
+                        jd = pi.javadoc
+                        appendGlobalTasks('pkg',pi,jd,pi.uniqueNumber)
+                        mname = jd.name or pi.name
+                        mands = jd.verify_mandatory()
+                        for mand in mands:
+                          pi.verification.addItem(mname,mand)
+                        if JavaDocVars['javadoc_mandatory'] and package_info.javadoc.isDefault() and 'pkg' in JavaDocVars['javadoc_mandatory_objects']:
+                          logger.warn(_('Package %s has no JavaDoc information attached'), mname)
+                          pi.verification.addItem(mname,'No JavaDoc information available')
+                        file_info.packageInfoList.append(pi) # permanent storage
+                        package_count += 1 # use this flag below
+
+        if pks_count == -1:
+          # find functions
+          for token_index in range(len(token_list)):
+            if token_list[token_index].upper() == 'FUNCTION' \
+            and (package_count != -1 or (token_index>0 and token_list[token_index-1].upper() in ['CREATE','REPLACE'])):
+              if len(token_list)>token_index+1: function_name = token_list[token_index+1]
+              else: function_name = token_list1[0]
+              function_name = function_name.split('(')[0] # some are "name(" and some are "name ("
+              if package_count != -1: function_info = ElemInfo()
+              else: function_info = StandAloneElemInfo()
+              function_info.uniqueNumber = metaInfo.NextIndex()
+              if package_count != -1:
+                function_info.parent = file_info.packageInfoList[package_count]
+              else:
+                function_info.parent = file_info
+              function_info.name = fixQuotedName(function_name)
+              function_info.lineNumber = lineNumber+1
+              for j in range(len(jdoc)):
+                ln = jdoc[j].lineNumber - lineNumber
+                if (function_name.lower()==jdoc[j].name.lower() and jdoc[j].objectType=='function') or (ln>0 and ln<metaInfo.blindOffset) or (ln<0 and ln>-1*metaInfo.blindOffset):
+                  if function_info.javadoc.isDefault():
+                    function_info.javadoc = jdoc[j]
+                    function_info.javadoc.lndiff = abs(ln)
+                  else:
+                    if abs(ln) < function_info.javadoc.lndiff: # this desc is closer to the object
+                      function_info.javadoc = jdoc[j]
+                      function_info.javadoc.lndiff = abs(ln)
+              fi = function_info
+              jd = fi.javadoc
+              mname = jd.name or fi.name
+              mands = jd.verify_mandatory()
+              if JavaDocVars['verification']:
+                fupatt = patterns.compiled('(?ims)function\s+'+mname+'\s*\((.*?)\)\s*return')
+                cparms = fupatt.findall(source.getParamText())
+              if not function_info.javadoc.ignore and package_count != -1: # Package.Function
+                appendGlobalTasks('func',file_info.packageInfoList[package_count],jd,fi.uniqueNumber)
+                for mand in mands:
+                    file_info.packageInfoList[package_count].verification.addFunc(mname,mand,jd.author,fi.uniqueNumber)
+                if JavaDocVars['javadoc_mandatory'] and jd.isDefault() and 'func' in JavaDocVars['javadoc_mandatory_objects']:
+                    if JavaDocVars['verification_log']: logger.warn(_('Function %(function)s in package %(package)s has no JavaDoc information attached'), {'function': mname, 'package': file_info.packageInfoList[package_count].name})
+                    file_info.packageInfoList[package_count].verification.addFunc(mname,_('No JavaDoc information available'),jd.author,fi.uniqueNumber)
+                if JavaDocVars['verification']:
+                    if len(cparms)==0:
+                        mands = jd.verify_params([])
+                    elif len(cparms)==1:
+                        cparms = cparms[0].split(',')
+                        mands = jd.verify_params(cparms)
+                    else:
+                        if JavaDocVars['verification_log']: logger.debug(_('Multiple definitions for function %(package)s.%(function)s, parameters not verified'), {'package': file_info.packageInfoList[package_count].name, 'function': mname})
+                    if len(cparms)<200: # 2016-07-18: With its initial commit (1e0ecb5 on 2010-03-15), this was limited to "<2" parameters. Why is this relevant here?
+                        for mand in mands:
+                            file_info.packageInfoList[package_count].verification.addFunc(mname,mand,jd.author,fi.uniqueNumber)
+              else: # StandAlone function
+                for mand in mands:
+                    function_info.verification.addItem(mname,mand,jd.author,fi.uniqueNumber)
+                if JavaDocVars['javadoc_mandatory'] and jd.isDefault() and 'func' in JavaDocVars['javadoc_mandatory_objects']:
+                    if JavaDocVars['verification_log']: logger.warn(_('StandAlone Function %(function)s has no JavaDoc information attached'), {'function': mname})
+                    function_info.verification.addItem(mname,_('No JavaDoc information available'),jd.author,fi.uniqueNumber)
+                if JavaDocVars['verification']:
+                    if len(cparms)==0:
+                        mands = jd.verify_params([])
+                    elif len(cparms)==1:
+                        cparms = cparms[0].split(',')
+                        mands = jd.verify_params(cparms)
+                    else:
+                        if JavaDocVars['verification_log']: logger.debug(_('Multiple definitions for stand-alone function %(function)s, parameters not verified'), {'function': mname})
+                    if len(cparms)<200: # 2016-07-18: With its initial commit (1e0ecb5 on 2010-03-15), this was limited to "<2" parameters. Why is this relevant here?
+                        for mand in mands:
+                            function_info.verification.addItem(mname,mand,jd.author,fi.uniqueNumber)
+              if package_count != -1:
+                if not function_info.javadoc.ignore: file_info.packageInfoList[package_count].functionInfoList.append(function_info)
+              else:
+                if not function_info.javadoc.ignore: file_info.functionInfoList.append(function_info)
+
+          # find procedures
+          for token_index in range(len(token_list)):
+            if token_list[token_index].upper() == 'PROCEDURE' \
+            and (package_count != -1 or (token_index>0 and token_list[token_index-1].upper() in ['CREATE','REPLACE'])):
+              if len(token_list)>token_index+1: procedure_name = token_list[token_index+1]
+              else: procedure_name = token_list1[0]
+              procedure_name = procedure_name.split('(')[0] # some are "name(" and some are "name ("
+              if package_count == -1: procedure_info = StandAloneElemInfo()
+              else: procedure_info = ElemInfo()
+              procedure_info.uniqueNumber = metaInfo.NextIndex()
+              if package_count != -1:
+                procedure_info.parent = file_info.packageInfoList[package_count]
+              else:
+                procedure_info.parent = file_info
+              procedure_info.name = fixQuotedName(procedure_name)
+              procedure_info.lineNumber = lineNumber+1
+              for j in range(len(jdoc)):
+                ln = jdoc[j].lineNumber - lineNumber
+                if (procedure_name.lower()==jdoc[j].name.lower() and jdoc[j].objectType=='procedure') or (ln>0 and ln<metaInfo.blindOffset) or (ln<0 and ln>-1*metaInfo.blindOffset):
+                  if procedure_info.javadoc.isDefault():
+                    procedure_info.javadoc = jdoc[j]
+                    procedure_info.javadoc.lndiff = abs(ln)
+                  else:
+                    if abs(ln) < procedure_info.javadoc.lndiff: # this desc is closer to the object
+                      procedure_info.javadoc = jdoc[j]
+                      procedure_info.javadoc.lndiff = abs(ln)
+              pi = procedure_info
+              jd = pi.javadoc
+              mname = jd.name or pi.name
+              mands = jd.verify_mandatory()
+              if JavaDocVars['verification']:
+                fupatt = patterns.compiled('(?ims)procedure\s+'+mname+'\s*\((.*?)\)\s*[ia]s')
+                cparms = fupatt.findall(source.getParamText())
+              if not procedure_info.javadoc.ignore and package_count != -1: # Package.Procedure
+                appendGlobalTasks('proc',file_info.packageInfoList[package_count],jd,pi.uniqueNumber)
+                for mand in mands:
+                    file_info.packageInfoList[package_count].verification.addProc(mname,mand,jd.author,pi.uniqueNumber)
+                if JavaDocVars['javadoc_mandatory'] and jd.isDefault() and 'proc' in JavaDocVars['javadoc_mandatory_objects']:
+                    if JavaDocVars['verification_log']: logger.warn(_('Procedure %(procedure)s in package %(package)s has no JavaDoc information attached'), {'procedure': mname, 'package': file_info.packageInfoList[package_count].name})
+                    file_info.packageInfoList[package_count].verification.addProc(mname,_('No JavaDoc information available'),jd.author,pi.uniqueNumber)
+                if JavaDocVars['verification']:
+                    if len(cparms)==0:
+                        mands = jd.verify_params([])
+                    elif len(cparms)==1:
+                        cparms = cparms[0].split(',')
+                        mands = jd.verify_params(cparms)
+                    else:
+                        if JavaDocVars['verification_log']: logger.debug(_('Multiple definitions for procedure %(package)s.%(function)s, parameters not verified'), {'function': mname, 'package': file_info.packageInfoList[package_count].name})
+                    if len(cparms)<200: # 2016-03-16: With its initial commit (1e0ecb5 on 2010-03-15), this was limited to "<2" parameters. Why is this relevant here?
+                        for mand in mands:
+                            file_info.packageInfoList[package_count].verification.addProc(mname,mand,jd.author,pi.uniqueNumber)
+              else: # StandAlone procedure
+                for mand in mands:
+                    procedure_info.verification.addItem(mname,mand,jd.author,pi.uniqueNumber)
+                if JavaDocVars['javadoc_mandatory'] and jd.isDefault() and 'proc' in JavaDocVars['javadoc_mandatory_objects']:
+                    if JavaDocVars['verification_log']: logger.warn(_('StandAlone Procedure %(procedure)s has no JavaDoc information attached'), {'procedure': mname})
+                    procedure_info.verification.addItem(mname,_('No JavaDoc information available'),jd.author,pi.uniqueNumber)
+                if JavaDocVars['verification']:
+                    if len(cparms)==0:
+                        mands = jd.verify_params([])
+                    elif len(cparms)==1:
+                        cparms = cparms[0].split(',')
+                        mands = jd.verify_params(cparms)
+                    else:
+                        if JavaDocVars['verification_log']: logger.debug(_('Multiple definitions for stand-alone procedure %(function)s, parameters not verified'), {'function': mname})
+                    if len(cparms)<200: # 2016-03-16: With its initial commit (1e0ecb5 on 2010-03-15), this was limited to "<2" parameters. Why is this relevant here?
+                        for mand in mands:
+                            procedure_info.verification.addItem(mname,mand,jd.author,pi.uniqueNumber)
+              if package_count != -1:
+                if not procedure_info.javadoc.ignore: file_info.packageInfoList[package_count].procedureInfoList.append(procedure_info)
+              else:
+                if not procedure_info.javadoc.ignore: file_info.procedureInfoList.append(procedure_info)
+
+
 #------------------------------------------------------------------------------
 def ScanFilesForObjects():
     """
@@ -265,450 +657,299 @@ def ScanFilesForObjects():
     if metaInfo.indexPage['form'] and not OraForm:
         logger.error(_('Cannot process Oracle Forms XML files - SAX API (pyxml) seems to be unavailable.'))
 
-    i = 0
-
-    # first, find views in files
-    dot_count = 1
-    for file_info in metaInfo.fileInfoList:
+    if metaInfo.useCache and metaInfo.incremental: cache = hypercore.cache.getCache(metaInfo.cacheDirectory,metaInfo.cacheBackend)
+    else: cache = None
+
+    # files unchanged since the last run can be taken from the cache
+    results = {}
+    if cache:
+        fprint = scanFingerprint()
+        for idx in range(len(metaInfo.fileInfoList)):
+            res = loadScanResult(cache, idx, fprint)
+            if res: results[idx] = res
+        logger.info(_('%(cached)d of %(files)d files unchanged since the last run'), {'cached':len(results), 'files':len(metaInfo.fileInfoList)})
+    todo = [idx for idx in range(len(metaInfo.fileInfoList)) if idx not in results]
+
+    jobs = None
+    if metaInfo.jobs > 1 and len(todo) > 1:
+        if hasattr(os,'fork'):
+            logger.info(_('Scanning files for objects with %s parallel jobs'), metaInfo.jobs)
+            pool = multiprocessing.Pool(metaInfo.jobs)
+            jobs = pool.imap(countedJob, [(ScanFileJob, idx) for idx in todo])
+        else:
+            logger.warn(_('Parallel jobs are not supported on this platform, scanning files sequentially'))
 
+    # merge the results in file order, so unique numbers and anchor names are
+    # the same as with a sequential scan of all files
+    i = 0
+    for idx in range(len(metaInfo.fileInfoList)):
         # print progress
         i += 1
         pbarUpdate(i)
+        if idx in results: res = results[idx]
+        elif jobs:
+            res, stats = jobs.next()
+            hypercore.cache.addStats(stats)
+        else: res = ScanFileJob(idx)
+        idx, file_info, loc, uids = res
+        shiftUniqueNumbers(file_info, metaInfo.indexForWhereUsedFiles)
+        metaInfo.indexForWhereUsedFiles += uids
+        for what in loc.keys(): metaInfo.incLoc(what,loc[what])
+        metaInfo.fileInfoList[idx] = file_info
+
+    if jobs:
+        pool.close()
+        pool.join()
+
+    # index the objects by line, to identify the objects using others with the where_used scan
+    for file_info in metaInfo.fileInfoList: file_info.usingIndex = UsingIndex(file_info)
 
-        # skip all non-sql files
-        if file_info.fileType not in ['sql','xml']:
-            continue
+    # complete line on task completion
+    pbarClose()
 
-        # Oracle Forms XML files have special processing:
-        if file_info.fileType in ['xml'] and metaInfo.indexPage['form'] !='':
-            parseForm(file_info)
-            continue
 
-        #### All other files (except for Oracle Forms XML) are processed here:
-        infile = fopen(file_info.fileName, "r", metaInfo.encoding)
-        fileLines = infile.readlines()
-        infile.close()
-        file_info.lines = len(fileLines)
-        file_info.bytes  = os.path.getsize(file_info.fileName)
-        if file_info.lines < 1:
-            continue            # skip empty files
-
-        # scan this file for possible JavaDoc style comments
-        if metaInfo.useJavaDoc:
-            jdoc = ScanJavaDoc(fileLines, file_info.fileName)
-        else:
-            jdoc = []
-
-        # if we find a package definition, this flag tells us to also look for
-        # functions and procedures.  If we don't find a package definition, there
-        # is no reason to look for them
-        package_count = -1
-        pks_count = -1
-        in_block_comment = 0
-        new_file = 1
-
-        metaInfo.incLoc('totals',len(fileLines))
-        filetext = '\n'.join(fileLines) # filetext: complete file in one string; filetextnoc: without comments etc (just used for parameter parsing)
-        filetextnoc  = re.sub(re.compile("/\*.*?\*/",re.DOTALL ) ,"" ,filetext) # remove /* comments */
-        filetextnoc  = re.sub(re.compile("\n\s*--.*\n" ) ,"" ,filetextnoc)   # remove full-line -- comments
-        filetextnoc  = re.sub(re.compile("--[^']*?\n" )  ,"" ,filetextnoc)   # remove in-line -- comments
-        filetextnoc  = re.sub(re.compile(":=\s*'.*?'\s*([,\)])",re.MULTILINE),r"\1" ,filetextnoc) # filter out defaults from parameters (catches more, we don't care here)
-        fileLines[0] = re.sub(re.compile("--[^']*?$" )  ,"" ,fileLines[0])   # remove in-line -- comments for object parse (EXPERIMENTAL!)
-        for lineNumber in range(file_info.lines):
-            if len(fileLines[lineNumber].strip()) < 0:
-                metaInfo.incLoc('empty')
-                continue
-            if new_file == 1:
-                token_list = fileLines[lineNumber].split()
-            else:
-                token_list = token_list1
-
-            new_file = 0
-            # len()-1 because we start with index 0
-            if len(fileLines)-1 > lineNumber:
-                fileLines[lineNumber+1] = re.sub(re.compile("--[^']*?$" )  ,"" ,fileLines[lineNumber+1])   # remove in-line -- comments for object parse (EXPERIMENTAL!)
-                fileLines[lineNumber+1], matched_string = eatStrings(fileLines[lineNumber+1])
-                token_list1 = fileLines[lineNumber+1].split()
-                if matched_string and len(token_list1) < 1: # that line was completely eaten
-                    metaInfo.incLoc('code')
-                    metaInfo.incLoc('empty',-1)
-            else:
-                token_list1 = []
+#------------------------------------------------------------------------------
+def countedJob(job):
+    """
+    Run a job in a worker process, and return the cache hits and misses it
+    recorded along with its result - the worker's stats are not seen by the
+    parent, which adds them to its own (see hypercore.cache.addStats)
+    @param tuple job (function, argument), e.g. (ScanFileJob, idx)
+    @return tuple (mixed result, dict stats)
+    """
+    func, arg = job
+    before = hypercore.cache.statsCopy()
+    res = func(arg)
+    return res, hypercore.cache.statsSince(before)
 
-            if in_block_comment == 0 and fileLines[lineNumber].strip() != '' \
-              and fileLines[lineNumber].find('--') == -1 and fileLines[lineNumber].find('//') == -1 \
-              and fileLines[lineNumber].find('##') == -1 and fileLines[lineNumber].find('/*') == -1:
-                metaInfo.incLoc('code')
 
-            # ignore lines that begin with comments
-            if len(token_list) > 0 and len(token_list[0]) > 1:
-                if token_list[0][:2] == "--" or token_list[0][:2] == "//" or token_list[0][:2] == "##":
-                    metaInfo.incLoc('comment')
-                    continue
+#------------------------------------------------------------------------------
+def ScanFileJob(idx):
+    """
+    Scan a single file, either directly or in a worker process of
+    ScanFilesForObjects. Each file starts with fresh unique numbers and LOC
+    counters, so the results can be merged in file order (and be cached to
+    be used again with the next run, if the file did not change)
+    @param int idx index of the file in metaInfo.fileInfoList
+    @return tuple (int idx, object file_info, dict linesOfCode, int uids) with
+            uids being the count of unique numbers used for this file
+    """
+    file_info = metaInfo.fileInfoList[idx]
+    saved = (metaInfo.indexForWhereUsedFiles, metaInfo.linesOfCode)
+    metaInfo.indexForWhereUsedFiles = 0
+    metaInfo.linesOfCode = dict.fromkeys(saved[1].keys(),0)
+    ScanFileForObjects(file_info)
+    res = (idx, file_info, metaInfo.linesOfCode, metaInfo.indexForWhereUsedFiles)
+    metaInfo.indexForWhereUsedFiles, metaInfo.linesOfCode = saved
+    if metaInfo.useCache and metaInfo.incremental and file_info.fileType != 'xml':
+        cache = hypercore.cache.getCache(metaInfo.cacheDirectory,metaInfo.cacheBackend)
+        cache.putObj(file_info.fileName, 'objects', (scanFingerprint(), file_info, res[2], res[3]))
+    return res
 
-            # ignore very short lines
-            if len(token_list)<2:
-                if len(token_list) > 0:
-                    if token_list[0][:2] != "/*" and token_list[0][:2] != "*/":
-                        continue
-                else:
-                    metaInfo.incLoc('empty')
-                    continue
 
-            # ignore block comments
-            if token_list[0][:2] == "/*" and token_list[0][len(token_list[0])-2:len(token_list[0])] == "*/":
-                # block comments like  "/***....*****/": re."/(\*)+/"
-                token_list.pop(0)
-            elif token_list[0][:2] == "/*" or in_block_comment == 1:
-                # 
-                in_block_comment = 1
-                clean_list = []
-                for token_index in range(len(token_list)):
-                    if token_list[token_index][:2] == "*/":
-                        clean_list.append(token_index)
-                        in_block_comment = 0
-                    else:
-                        clean_list.append(token_index)
-                if len(clean_list) > 0:
-                    if len(clean_list) == 1:
-                        # pop only index 0
-                        token_list.pop(clean_list[0])
-                    else:
-                        for clean_index in range(len(clean_list)-1,-1,-1):
-                            # work reverse from back
-                            token_list.pop(clean_list[clean_index])
-            if  len(token_list) == 0:
-                # nothing more on line
-                metaInfo.incLoc('comment') # we had just comments in this line (???)
-                continue
-
-            for token_index in range(len(token_list)):
-                # find types
-                if metaInfo.indexPage['type']:
-                    # look for CREATE [OR REPLACE] TYPE [schema.]trigger (...), making sure enough tokens exist
-                    if len(token_list) > token_index+1 \
-                    and token_list[token_index+1].upper() == "TYPE" \
-                    and token_list[token_index].upper() in ['CREATE','REPLACE']:
-                        tab_info = StandAloneElemInfo()
-                        tab_info.parent = file_info
-                        if len(token_list) > token_index+2:
-                          tab_info.name = token_list[token_index+2]
-                        else:
-                          tab_info.name = token_list1[0]
-                        tab_info.name = fixQuotedName(tab_info.name)
-                        ElemInfoAppendJdoc(tab_info,'type',lineNumber+1,jdoc)
-                        file_info.typeInfoList.append(tab_info)
-                        continue
-
-                # find trigger.
-                if metaInfo.indexPage['trigger']:
-                    # look for CREATE [OR REPLACE] TRIGGER [schema.]trigger (...), making sure enough tokens exist
-                    if len(token_list) > token_index+1 \
-                    and token_list[token_index+1].upper() == "TRIGGER" \
-                    and token_list[token_index].upper() in ['CREATE','REPLACE']:
-                        tab_info = StandAloneElemInfo()
-                        tab_info.parent = file_info
-                        if len(token_list) > token_index+2:
-                          tab_info.name = token_list[token_index+2]
-                        else:
-                          tab_info.name = token_list1[0]
-                        tab_info.name = fixQuotedName(tab_info.name)
-                        ElemInfoAppendJdoc(tab_info,'trigger',lineNumber+1,jdoc)
-                        file_info.triggerInfoList.append(tab_info)
-                        continue
-
-                # find tables.
-                if metaInfo.indexPage['tab']:
-                    # look for CREATE [GLOBAL TEMPORARY] TABLE [schema.]table (...), making sure enough tokens exist
-                    if len(token_list) > token_index+1 \
-                    and token_list[token_index+1].upper() == "TABLE" \
-                    and token_list[token_index].upper() in ['CREATE','TEMPORARY']:
-                        tab_info = StandAloneElemInfo()
-                        tab_info.parent = file_info
-                        if len(token_list) > token_index+2:
-                          tab_info.name = token_list[token_index+2]
-                        else:
-                          tab_info.name = token_list1[0]
-                        tab_info.name = fixQuotedName(tab_info.name)
-                        ElemInfoAppendJdoc(tab_info,'table',lineNumber+1,jdoc)
-                        file_info.tabInfoList.append(tab_info)
-                        continue
-
-                # find views
-                if metaInfo.indexPage['view']:
-                    # look for CREATE VIEW, REPLACE VIEW, FORCE VIEW, making sure enough tokens exist
-                    if len(token_list) > token_index+1 \
-                    and token_list[token_index+1].upper() == "VIEW" \
-                    and token_list[token_index].upper() in ['CREATE','REPLACE','FORCE','EDITIONABLE']:
-                        view_info = StandAloneElemInfo()
-                        view_info.parent = file_info
-                        if len(token_list) > token_index+2:
-                          view_info.name = token_list[token_index+2]
-                        else:
-                          view_info.name = token_list1[0]
-                        view_info.name = fixQuotedName(view_info.name)
-                        ElemInfoAppendJdoc(view_info,'view',lineNumber+1,jdoc)
-                        file_info.viewInfoList.append(view_info)
-                        continue
-
-                # find mviews.
-                if metaInfo.indexPage['mview']:
-                    # CREATE MATERIALIZED VIEW [schema.]mview ...
-                    if len(token_list) > token_index+2 \
-                    and token_list[token_index+2].upper() == "VIEW" \
-                    and token_list[token_index+1].upper() == "MATERIALIZED" \
-                    and token_list[token_index].upper() == "CREATE":
-                        view_info = StandAloneElemInfo()
-                        view_info.parent = file_info
-                        if len(token_list) > token_index+3:
-                          view_info.name = token_list[token_index+3]
-                        else:
-                          view_info.name = token_list1[0]
-                        view_info.name = fixQuotedName(view_info.name)
-                        ElemInfoAppendJdoc(view_info,'mview',lineNumber+1,jdoc)
-                        file_info.mviewInfoList.append(view_info)
-                        continue
-
-                # find synonym definitions
-                if metaInfo.indexPage['synonym']:
-                    # CREATE [OR REPLACE] [PUBLIC] SYNONYM [schema.]synonym FOR [schema.]object [@dblink]
-                    if len(token_list) > token_index+1 \
-                    and token_list[token_index+1].upper() == "SYNONYM" \
-                    and token_list[token_index].upper() in ['CREATE','REPLACE','PUBLIC'] \
-                    and not (token_list[token_index-1].upper()=="DROP" or (token_index>1 and token_list[token_index-2].upper()=="DROP")):
-                        syn_info = StandAloneElemInfo()
-                        syn_info.parent = file_info
-                        if len(token_list) > token_index+2:
-                            syn_info.name = token_list[token_index+2]
-                        else:
-                            syn_info.name = token_list1[0]
-                        syn_info.name = fixQuotedName(syn_info.name)
-                        ElemInfoAppendJdoc(syn_info,'synonym',lineNumber+1,jdoc)
-                        file_info.synInfoList.append(syn_info)
-                        continue
-
-                # find sequence definitions
-                if metaInfo.indexPage['sequence']:
-                    # CREATE SEQUENCE [schema.]sequence_name option(s)
-                    if len(token_list) > token_index+1 \
-                    and token_list[token_index+1].upper() == "SEQUENCE" \
-                    and (token_list[token_index].upper() == "CREATE"):
-                        seq_info = StandAloneElemInfo()
-                        seq_info.parent = file_info
-                        if len(token_list) > token_index+2:
-                            seq_info.name = token_list[token_index+2]
-                        else:
-                            seq_info.name = token_list1[0]
-                        seq_info.name = fixQuotedName(seq_info.name)
-                        ElemInfoAppendJdoc(seq_info,'sequence',lineNumber+1,jdoc)
-                        file_info.seqInfoList.append(seq_info)
-                        continue
-
-            # find package definitions - set flag if found
-            # look for CREATE [OR REPLACE] PACKAGE BODY x, making sure enough tokens exist
-            for token_index in range(len(token_list)):
-                if len(token_list) > token_index+2 \
-                   and token_list[token_index].upper() in ['CREATE','REPLACE','FORCE'] \
-                       and token_list[token_index+1].upper() == "PACKAGE":
-                    if token_list[token_index+2].upper() == "BODY":
-                      package_info = PackageInfo()
-                      package_info.uniqueNumber = metaInfo.NextIndex()
-                      package_info.parent = file_info
-                      package_info.name = fixQuotedName(token_list[token_index+3])
-                      package_info.lineNumber = lineNumber+1
-                      for j in range(len(jdoc)):
-                        ln = jdoc[j].lineNumber - lineNumber
-                        if (package_info.name.lower()==jdoc[j].name.lower() and jdoc[j].objectType=='pkg') or (ln>0 and ln<metaInfo.blindOffset) or (ln<0 and ln>-1*metaInfo.blindOffset):
-                          package_info.javadoc = jdoc[j]
-                      if not package_info.javadoc.ignore: # ignore items with @ignore tag
-                          pi = package_info
-                          jd = pi.javadoc
-                          appendGlobalTasks('pkg',pi,jd,pi.uniqueNumber)
-                          mname = jd.name or pi.name
-                          mands = jd.verify_mandatory()
-                          for mand in mands:
-                            pi.verification.addItem(mname,mand)
-                          if JavaDocVars['javadoc_mandatory'] and package_info.javadoc.isDefault() and 'pkg' in JavaDocVars['javadoc_mandatory_objects']:
-                            logger.warn(_('Package %s has no JavaDoc information attached'), mname)
-                            pi.verification.addItem(mname,'No JavaDoc information available')
-                          file_info.packageInfoList.append(pi) # permanent storage
-                          package_count += 1 # use this flag below
-                    else:
-                        package_info = PackageInfo()
-                        package_info.uniqueNumber = metaInfo.NextIndex()
-                        package_info.parent = file_info
-                        package_info.name = fixQuotedName(token_list[token_index+2])
-                        package_info.lineNumber = lineNumber+1
-                        for j in range(len(jdoc)):
-                          ln = jdoc[j].lineNumber - lineNumber
-                          if (package_info.name.lower()==jdoc[j].name.lower() and jdoc[j].objectType=='pkg') or (ln>0 and ln<metaInfo.blindOffset) or (ln<0 and ln>-1*metaInfo.blindOffset):
-                            package_info.javadoc = jdoc[j]
-                        if not package_info.javadoc.ignore: # ignore items with @ignore tag
-                            pi = package_info
-                            jd = pi.javadoc
-                            appendGlobalTasks('pkg',pi,jd,pi.uniqueNumber)
-                            mname = jd.name or pi.name
-                            mands = jd.verify_mandatory()
-                            for mand in mands:
-                              pi.verification.addItem(mname,mand)
-                            if JavaDocVars['javadoc_mandatory'] and package_info.javadoc.isDefault() and 'pkg' in JavaDocVars['javadoc_mandatory_objects']:
-                              logger.warn(_('Package %s has no JavaDoc information attached'), mname)
-                              pi.verification.addItem(mname,'No JavaDoc information available')
-                            file_info.packageInfoList.append(pi) # permanent storage
-                            package_count += 1 # use this flag below
-
-            if pks_count == -1:
-              # find functions
-              for token_index in range(len(token_list)):
-                if token_list[token_index].upper() == 'FUNCTION' \
-                and (package_count != -1 or (token_index>0 and token_list[token_index-1].upper() in ['CREATE','REPLACE'])):
-                  if len(token_list)>token_index+1: function_name = token_list[token_index+1]
-                  else: function_name = token_list1[0]
-                  function_name = function_name.split('(')[0] # some are "name(" and some are "name ("
-                  if package_count != -1: function_info = ElemInfo()
-                  else: function_info = StandAloneElemInfo()
-                  function_info.uniqueNumber = metaInfo.NextIndex()
-                  if package_count != -1:
-                    function_info.parent = file_info.packageInfoList[package_count]
-                  else:
-                    function_info.parent = file_info
-                  function_info.name = fixQuotedName(function_name)
-                  function_info.lineNumber = lineNumber+1
-                  for j in range(len(jdoc)):
-                    ln = jdoc[j].lineNumber - lineNumber
-                    if (function_name.lower()==jdoc[j].name.lower() and jdoc[j].objectType=='function') or (ln>0 and ln<metaInfo.blindOffset) or (ln<0 and ln>-1*metaInfo.blindOffset):
-                      if function_info.javadoc.isDefault():
-                        function_info.javadoc = jdoc[j]
-                        function_info.javadoc.lndiff = abs(ln)
-                      else:
-                        if abs(ln) < function_info.javadoc.lndiff: # this desc is closer to the object
-                          function_info.javadoc = jdoc[j]
-                          function_info.javadoc.lndiff = abs(ln)
-                  fi = function_info
-                  jd = fi.javadoc
-                  mname = jd.name or fi.name
-                  mands = jd.verify_mandatory()
-                  if JavaDocVars['verification']:
-                    fupatt = re.compile('(?ims)function\s+'+mname+'\s*\((.*?)\)\s*return')
-                    cparms = re.findall(fupatt,filetextnoc)
-                  if not function_info.javadoc.ignore and package_count != -1: # Package.Function
-                    appendGlobalTasks('func',file_info.packageInfoList[package_count],jd,fi.uniqueNumber)
-                    for mand in mands:
-                        file_info.packageInfoList[package_count].verification.addFunc(mname,mand,jd.author,fi.uniqueNumber)
-                    if JavaDocVars['javadoc_mandatory'] and jd.isDefault() and 'func' in JavaDocVars['javadoc_mandatory_objects']:
-                        if JavaDocVars['verification_log']: logger.warn(_('Function %(function)s in package %(package)s has no JavaDoc information attached'), {'function': mname, 'package': file_info.packageInfoList[package_count].name})
-                        file_info.packageInfoList[package_count].verification.addFunc(mname,_('No JavaDoc information available'),jd.author,fi.uniqueNumber)
-                    if JavaDocVars['verification']:
-                        if len(cparms)==0:
-                            mands = jd.verify_params([])
-                        elif len(cparms)==1:
-                            cparms = cparms[0].split(',')
-                            mands = jd.verify_params(cparms)
-                        else:
-                            if JavaDocVars['verification_log']: logger.debug(_('Multiple definitions for function %(package)s.%(function)s, parameters not verified'), {'package': file_info.packageInfoList[package_count].name, 'function': mname})
-                        if len(cparms)<200: # 2016-07-18: With its initial commit (1e0ecb5 on 2010-03-15), this was limited to "<2" parameters. Why is this relevant here?
-                            for mand in mands:
-                                file_info.packageInfoList[package_count].verification.addFunc(mname,mand,jd.author,fi.uniqueNumber)
-                  else: # StandAlone function
-                    for mand in mands:
-                        function_info.verification.addItem(mname,mand,jd.author,fi.uniqueNumber)
-                    if JavaDocVars['javadoc_mandatory'] and jd.isDefault() and 'func' in JavaDocVars['javadoc_mandatory_objects']:
-                        if JavaDocVars['verification_log']: logger.warn(_('StandAlone Function %(function)s has no JavaDoc information attached'), {'function': mname})
-                        function_info.verification.addItem(mname,_('No JavaDoc information available'),jd.author,fi.uniqueNumber)
-                    if JavaDocVars['verification']:
-                        if len(cparms)==0:
-                            mands = jd.verify_params([])
-                        elif len(cparms)==1:
-                            cparms = cparms[0].split(',')
-                            mands = jd.verify_params(cparms)
-                        else:
-                            if JavaDocVars['verification_log']: logger.debug(_('Multiple definitions for stand-alone function %(function)s, parameters not verified'), {'function': mname})
-                        if len(cparms)<200: # 2016-07-18: With its initial commit (1e0ecb5 on 2010-03-15), this was limited to "<2" parameters. Why is this relevant here?
-                            for mand in mands:
-                                function_info.verification.addItem(mname,mand,jd.author,fi.uniqueNumber)
-                  if package_count != -1:
-                    if not function_info.javadoc.ignore: file_info.packageInfoList[package_count].functionInfoList.append(function_info)
-                  else:
-                    if not function_info.javadoc.ignore: file_info.functionInfoList.append(function_info)
-
-              # find procedures
-              for token_index in range(len(token_list)):
-                if token_list[token_index].upper() == 'PROCEDURE' \
-                and (package_count != -1 or (token_index>0 and token_list[token_index-1].upper() in ['CREATE','REPLACE'])):
-                  if len(token_list)>token_index+1: procedure_name = token_list[token_index+1]
-                  else: procedure_name = token_list1[0]
-                  procedure_name = procedure_name.split('(')[0] # some are "name(" and some are "name ("
-                  if package_count == -1: procedure_info = StandAloneElemInfo()
-                  else: procedure_info = ElemInfo()
-                  procedure_info.uniqueNumber = metaInfo.NextIndex()
-                  if package_count != -1:
-                    procedure_info.parent = file_info.packageInfoList[package_count]
-                  else:
-                    procedure_info.parent = file_info
-                  procedure_info.name = fixQuotedName(procedure_name)
-                  procedure_info.lineNumber = lineNumber+1
-                  for j in range(len(jdoc)):
-                    ln = jdoc[j].lineNumber - lineNumber
-                    if (procedure_name.lower()==jdoc[j].name.lower() and jdoc[j].objectType=='procedure') or (ln>0 and ln<metaInfo.blindOffset) or (ln<0 and ln>-1*metaInfo.blindOffset):
-                      if procedure_info.javadoc.isDefault():
-                        procedure_info.javadoc = jdoc[j]
-                        procedure_info.javadoc.lndiff = abs(ln)
-                      else:
-                        if abs(ln) < procedure_info.javadoc.lndiff: # this desc is closer to the object
-                          procedure_info.javadoc = jdoc[j]
-                          procedure_info.javadoc.lndiff = abs(ln)
-                  pi = procedure_info
-                  jd = pi.javadoc
-                  mname = jd.name or pi.name
-                  mands = jd.verify_mandatory()
-                  if JavaDocVars['verification']:
-                    fupatt = re.compile('(?ims)procedure\s+'+mname+'\s*\((.*?)\)\s*[ia]s')
-                    cparms = re.findall(fupatt,filetextnoc)
-                  if not procedure_info.javadoc.ignore and package_count != -1: # Package.Procedure
-                    appendGlobalTasks('proc',file_info.packageInfoList[package_count],jd,pi.uniqueNumber)
-                    for mand in mands:
-                        file_info.packageInfoList[package_count].verification.addProc(mname,mand,jd.author,pi.uniqueNumber)
-                    if JavaDocVars['javadoc_mandatory'] and jd.isDefault() and 'proc' in JavaDocVars['javadoc_mandatory_objects']:
-                        if JavaDocVars['verification_log']: logger.warn(_('Procedure %(procedure)s in package %(package)s has no JavaDoc information attached'), {'procedure': mname, 'package': file_info.packageInfoList[package_count].name})
-                        file_info.packageInfoList[package_count].verification.addProc(mname,_('No JavaDoc information available'),jd.author,pi.uniqueNumber)
-                    if JavaDocVars['verification']:
-                        if len(cparms)==0:
-                            mands = jd.verify_params([])
-                        elif len(cparms)==1:
-                            cparms = cparms[0].split(',')
-                            mands = jd.verify_params(cparms)
-                        else:
-                            if JavaDocVars['verification_log']: logger.debug(_('Multiple definitions for procedure %(package)s.%(function)s, parameters not verified'), {'function': mname, 'package': file_info.packageInfoList[package_count].name})
-                        if len(cparms)<200: # 2016-03-16: With its initial commit (1e0ecb5 on 2010-03-15), this was limited to "<2" parameters. Why is this relevant here?
-                            for mand in mands:
-                                file_info.packageInfoList[package_count].verification.addProc(mname,mand,jd.author,pi.uniqueNumber)
-                  else: # StandAlone procedure
-                    for mand in mands:
-                        procedure_info.verification.addItem(mname,mand,jd.author,pi.uniqueNumber)
-                    if JavaDocVars['javadoc_mandatory'] and jd.isDefault() and 'proc' in JavaDocVars['javadoc_mandatory_objects']:
-                        if JavaDocVars['verification_log']: logger.warn(_('StandAlone Procedure %(procedure)s has no JavaDoc information attached'), {'procedure': mname})
-                        procedure_info.verification.addItem(mname,_('No JavaDoc information available'),jd.author,pi.uniqueNumber)
-                    if JavaDocVars['verification']:
-                        if len(cparms)==0:
-                            mands = jd.verify_params([])
-                        elif len(cparms)==1:
-                            cparms = cparms[0].split(',')
-                            mands = jd.verify_params(cparms)
-                        else:
-                            if JavaDocVars['verification_log']: logger.debug(_('Multiple definitions for stand-alone procedure %(function)s, parameters not verified'), {'function': mname})
-                        if len(cparms)<200: # 2016-03-16: With its initial commit (1e0ecb5 on 2010-03-15), this was limited to "<2" parameters. Why is this relevant here?
-                            for mand in mands:
-                                procedure_info.verification.addItem(mname,mand,jd.author,pi.uniqueNumber)
-                  if package_count != -1:
-                    if not procedure_info.javadoc.ignore: file_info.packageInfoList[package_count].procedureInfoList.append(procedure_info)
-                  else:
-                    if not procedure_info.javadoc.ignore: file_info.procedureInfoList.append(procedure_info)
+#------------------------------------------------------------------------------
+def scanFingerprint():
+    """
+    Collect the settings the scan results depend on, so results cached with
+    different settings are not used
+    @return string fingerprint
+    """
+    return repr(( metaInfo.versionString, metaInfo.encoding, sorted(metaInfo.indexPage.items()),
+                  metaInfo.useJavaDoc, metaInfo.blindOffset, sorted(JavaDocVars.items()),
+                  metaInfo.scanEngine, metaInfo.scanShortRefs, metaInfo.scanInString ))
 
-    # complete line on task completion
-    pbarClose()
+
+#------------------------------------------------------------------------------
+def loadScanResult(cache, idx, fprint):
+    """
+    Obtain the results of ScanFileJob for an unchanged file from the cache
+    @param object cache cache instance to use
+    @param int idx index of the file in metaInfo.fileInfoList
+    @param string fprint fingerprint of the current settings (see scanFingerprint)
+    @return mixed tuple as returned by ScanFileJob, or None if there's no
+            up-to-date copy in the cache
+    """
+    file_info = metaInfo.fileInfoList[idx]
+    if file_info.fileType == 'xml' or not cache.check(file_info.fileName,'objects'):
+        return None
+    try:
+        cprint, cached, loc, uids = cache.getObj(file_info.fileName,'objects',0)
+    except:
+        logger.warn(_('Could not read cached objects for %s'), file_info.fileName)
+        return None
+    if cprint != fprint: return None
+    # take over what was set up by FindFilesAndBuildFileList
+    cached.uniqueNumber = file_info.uniqueNumber
+    cached.uniqueName   = file_info.uniqueName
+    cached.cached = True
+    return (idx, cached, loc, uids)
+
+
+#------------------------------------------------------------------------------
+def getFileObjects(file_info,anchors=True):
+    """
+    Collect all objects found in a file, including package members and the
+    elements of Oracle Forms
+    @param object file_info FileInfo to collect the objects from
+    @param optional boolean anchors whether to include objects only found in
+           the anchor list (e.g. ignored ones). Without them, the list always
+           has the same order for the same file contents. Default: True
+    @return list objects list of ElemInfo objects
+    """
+    def collect(elems):
+        for elem in elems:
+            if id(elem) in seen: continue
+            seen[id(elem)] = elem
+            objects.append(elem)
+            for attr in ['packageInfoList','functionInfoList','procedureInfoList','triggerInfoList']:
+                if hasattr(elem,attr): collect(getattr(elem,attr))
+
+    seen = {}
+    objects = []
+    collect(file_info.typeInfoList + file_info.triggerInfoList + file_info.tabInfoList
+          + file_info.viewInfoList + file_info.mviewInfoList + file_info.synInfoList
+          + file_info.seqInfoList + file_info.packageInfoList + file_info.functionInfoList
+          + file_info.procedureInfoList + file_info.formInfoList)
+    if anchors: collect([elem for (aname,elem) in file_info.anchorNames.values()])
+    return objects
+
+
+#------------------------------------------------------------------------------
+def shiftUniqueNumbers(file_info, offset):
+    """
+    Shift the unique numbers of all objects found in a file (as well as the
+    references to them in anchor names and task lists) by a given offset.
+    Used to merge the results of ScanFileJob.
+    @param object file_info FileInfo returned by ScanFileJob
+    @param int offset value to add to the unique numbers
+    """
+    def shiftTasks(tlist):
+        for task in tlist.items + getattr(tlist,'funcs',[]) + getattr(tlist,'procs',[]):
+            if task.uid > 0: task.uid += offset
+        for sub in getattr(tlist,'pkgs',[]):
+            shiftTasks(sub)
+
+    for elem in getFileObjects(file_info):
+        if elem.uniqueNumber > 0: elem.__dict__['uniqueNumber'] += offset
+        for attr in ['bugs','todo','verification']:
+            if hasattr(elem,attr): shiftTasks(getattr(elem,attr))
+    anchors = {}
+    for uid in file_info.anchorNames.keys():
+        anchors[uid + offset] = file_info.anchorNames[uid]
+    file_info.anchorNames = anchors
 
 
 #=============================================================[ Usage Scan ]===
+#------------------------------------------------------------------------------
+class UsingIndex(object):
+    """
+    Index of the objects of a file by the lines they start at, to identify the
+    object a line belongs to (see findUsingObject) with a binary search per
+    object list. Each list is searched exactly the way it used to be walked,
+    so the results are the same even if a list is not ordered by line.
+    """
+
+    def __init__(self,fInfo):
+        """
+        Build the index
+        @param self
+        @param object fInfo FileInfo object to index
+        """
+        self.walked = {} # otype -> (list of objects, prefix maximum of their lines) for lists walked up to the first object starting at or after the line
+        for otype, elems in [('sequence',fInfo.seqInfoList), ('synonym',fInfo.synInfoList), ('tab',fInfo.tabInfoList),
+                             ('view',fInfo.viewInfoList), ('mview',fInfo.mviewInfoList), ('trigger',fInfo.triggerInfoList),
+                             ('type',fInfo.typeInfoList), ('func',fInfo.functionInfoList), ('proc',fInfo.procedureInfoList)]:
+            self.walked[otype] = (elems, self.prefixMax(elems))
+        # packages and forms: the last one starting before the line
+        self.packages = (fInfo.packageInfoList, self.suffixMin([pInfo.lineNumber for pInfo in fInfo.packageInfoList]))
+        self.forms    = (fInfo.formInfoList, self.suffixMin([sInfo.lineNumber for sInfo in fInfo.formInfoList]))
+        # package members: walked for each package, the last package having any member before the line wins
+        self.members = {}
+        for otype, attr in [('func','functionInfoList'), ('proc','procedureInfoList')]:
+            walked = [] # (members, prefix maximum of their lines) of each package having members
+            for pInfo in fInfo.packageInfoList:
+                elems = getattr(pInfo,attr)
+                if elems: walked.append((elems, self.prefixMax(elems)))
+            self.members[otype] = (walked, self.suffixMin([elems[0].lineNumber for elems, lines in walked]))
+
+    def prefixMax(self,elems):
+        """
+        Collect the maximum line number of all objects up to each position
+        @param self
+        @param list elems list of objects
+        @return list lines
+        """
+        lines = []
+        for elem in elems:
+            if lines: lines.append(max(lines[-1],elem.lineNumber))
+            else: lines.append(elem.lineNumber)
+        return lines
+
+    def suffixMin(self,lines):
+        """
+        Collect the minimum line number of all objects from each position on
+        @param self
+        @param list lines line numbers of the objects
+        @return list lines
+        """
+        mins = lines[:]
+        for i in range(len(mins)-2,-1,-1):
+            mins[i] = min(mins[i],mins[i+1])
+        return mins
+
+    def lookup(self,elems,lines,lineNumber):
+        """
+        Find the object of a list the given line belongs to: with the prefix
+        maximum of their lines (see prefixMax), the last one before the first
+        object starting at or after the line - with the suffix minimum (see
+        suffixMin), the last one starting before the line
+        @param self
+        @param list elems list of objects
+        @param list lines prefix maximum or suffix minimum of their lines
+        @param int lineNumber line number
+        @return object elem or None
+        """
+        idx = bisect_left(lines,lineNumber)
+        if idx: return elems[idx-1]
+        return None
+
+    def find(self,lineNumber):
+        """
+        Identify the object starting closest before the given line
+        @param self
+        @param int lineNumber line number
+        @return tuple (str objectType, object objectInfo) - with objectType 'file'
+                and a new ElemInfo if there's no such object
+        """
+        member = {}
+        for otype in ['func','proc']:
+            walked, lines = self.members[otype]
+            pkg = self.lookup(walked,lines,lineNumber)
+            if pkg: member[otype] = self.lookup(pkg[0],pkg[1],lineNumber)
+            else: member[otype] = None
+        candidates = [ # in order of precedence for objects starting at the same line
+            ('sequence', self.lookup(self.walked['sequence'][0],self.walked['sequence'][1],lineNumber)),
+            ('synonym', self.lookup(self.walked['synonym'][0],self.walked['synonym'][1],lineNumber)),
+            ('tab', self.lookup(self.walked['tab'][0],self.walked['tab'][1],lineNumber)),
+            ('view', self.lookup(self.walked['view'][0],self.walked['view'][1],lineNumber)),
+            ('mview', self.lookup(self.walked['mview'][0],self.walked['mview'][1],lineNumber)),
+            ('pkg', self.lookup(self.packages[0],self.packages[1],lineNumber)),
+            ('func', member['func']),
+            ('trigger', self.lookup(self.walked['trigger'][0],self.walked['trigger'][1],lineNumber)),
+            ('type', self.lookup(self.walked['type'][0],self.walked['type'][1],lineNumber)),
+            ('proc', member['proc']),
+            ('func', self.lookup(self.walked['func'][0],self.walked['func'][1],lineNumber)),
+            ('proc', self.lookup(self.walked['proc'][0],self.walked['proc'][1],lineNumber)),
+            ('form', self.lookup(self.forms[0],self.forms[1],lineNumber))
+        ]
+        rtype, robj, rline = 'file', None, -1
+        for otype, elem in candidates:
+            if elem is not None and elem.lineNumber > rline:
+                rtype, robj, rline = otype, elem, elem.lineNumber
+        if robj is None: return 'file', ElemInfo() # No object found
+        return rtype, robj
+
+
 #------------------------------------------------------------------------------
 def findUsingObject(fInfo,lineNumber):
     """
@@ -717,95 +958,46 @@ def findUsingObject(fInfo,lineNumber):
     @param  integer lineNumber line number of the actual call
     @return tuple   otuple     (str objectType, object objectInfo)
     """
-    vObj = ElemInfo()
-    mObj = ElemInfo()
-    tObj = ElemInfo()
-    pObj = ElemInfo()
-    fObj = ElemInfo()
-    prObj = ElemInfo() # stand-alone
-    fuObj = ElemInfo() # stand-alone
-    sqObj = ElemInfo()
-    syObj = ElemInfo()
-    trObj = ElemInfo()
-    tyObj = ElemInfo()
-    PObj = PackageInfo()
-    foObj = FormInfo()
-    for sInfo in fInfo.triggerInfoList:
-        if sInfo.lineNumber < lineNumber: trObj = sInfo
-        else: break;
-    for sInfo in fInfo.typeInfoList:
-        if sInfo.lineNumber < lineNumber: tyObj = sInfo
-        else: break;
-    for sInfo in fInfo.seqInfoList:
-        if sInfo.lineNumber < lineNumber: sqObj = sInfo
-        else: break;
-    for sInfo in fInfo.synInfoList:
-        if sInfo.lineNumber < lineNumber: syObj = sInfo
-        else: break;
-    for sInfo in fInfo.tabInfoList:
-        if sInfo.lineNumber < lineNumber: tObj = sInfo
-        else: break
-    for sInfo in fInfo.viewInfoList:
-        if sInfo.lineNumber < lineNumber: vObj = sInfo
-        else: break
-    for sInfo in fInfo.mviewInfoList:
-        if sInfo.lineNumber < lineNumber: mObj = sInfo
-        else: break
-    for sInfo in fInfo.functionInfoList:
-        if sInfo.lineNumber < lineNumber: fuObj = sInfo
-        else: break
-    for sInfo in fInfo.procedureInfoList:
-        if sInfo.lineNumber < lineNumber: prObj = sInfo
-        else: break
-    for pInfo in fInfo.packageInfoList:
-        if pInfo.lineNumber < lineNumber: PObj = pInfo
-        for vInfo in pInfo.functionInfoList:
-            if vInfo.lineNumber < lineNumber: fObj = vInfo
-            else: break
-        for vInfo in pInfo.procedureInfoList:
-            if vInfo.lineNumber < lineNumber: pObj = vInfo
-            else: break
-    for sInfo in fInfo.formInfoList:
-        if sInfo.lineNumber < lineNumber: foObj = sInfo
-    sobj = [
-            ['sequence',sqObj.lineNumber,sqObj],
-            ['synonym',syObj.lineNumber,syObj],
-            ['tab',tObj.lineNumber,tObj],
-            ['view',vObj.lineNumber,vObj],
-            ['mview',mObj.lineNumber,mObj],
-            ['pkg',PObj.lineNumber,PObj],
-            ['func',fObj.lineNumber,fObj],
-            ['trigger',trObj.lineNumber,trObj],
-            ['type',tyObj.lineNumber,tyObj],
-            ['proc',pObj.lineNumber,pObj],
-            ['func',fuObj.lineNumber,fuObj],
-            ['proc',prObj.lineNumber,prObj],
-            ['form',foObj.lineNumber,foObj]
-           ]
-    sobj.sort(key=lambda obj: obj[1], reverse=True)
-    if sobj[0][1] < 0: rtype = 'file' # No object found
-    else: rtype = sobj[0][0]
-    return rtype,sobj[0][2]
+    if getattr(fInfo,'usingIndex',None) is None: # built by ScanFilesForObjects, unless the FileInfo came from elsewhere
+        fInfo.usingIndex = UsingIndex(fInfo)
+    return fInfo.usingIndex.find(lineNumber)
 
 
 #------------------------------------------------------------------------------
-def addWhereUsed(objectInfo,fileInfo,lineNumber,otype):
+def addDepGraphNode(gtyp,name,kind,label=None):
+    """
+    Add the properties of a node to a dependency graph
+    @param string gtyp graph to add to (file2file, file2object...)
+    @param string name node name
+    @param string kind node kind (object type)
+    @param optional string label name of the object as written in the code
+    @throws KeyError if there are no colors configured for this kind
+    """
+    metaInfo.colors[kind] # no properties without colors
+    metaInfo.depGraph.addNode(gtyp,name,kind,label)
+
+
+#------------------------------------------------------------------------------
+def addWhereUsed(objectInfo,fileInfo,lineNumber,otype,using=None):
     """
     Add where_used and what_used info to an object (view, procedure, function, ...)
     @param object objectInfo the view_info/function_info/... object used there
     @param object fileInfo object of the file where the usage was found
     @param int lineNumber file line number where the usage was found
     @param string otype object type of the used object
+    @param optional tuple using (uType, uObj) of the using object if already
+           known (as returned by findUsingObject)
     """
     # skip self-reference (should only happen with scanShortRefs==true)
     if lineNumber == objectInfo.lineNumber:
         return
 
-    uType,uObj = findUsingObject(fileInfo,lineNumber)
+    if using: uType,uObj = using
+    else: uType,uObj = findUsingObject(fileInfo,lineNumber)
 
     # check for what_used
     if uType != 'trigger': # triggers are not "used", they are "fired"
-        if fileInfo.fileName not in objectInfo.whereUsed.keys():
+        if fileInfo.fileName not in objectInfo.whereUsed:
             objectInfo.whereUsed[fileInfo.fileName] = []
         objectInfo.whereUsed[fileInfo.fileName].append((fileInfo, lineNumber, uType, uObj))
     # generate a unique number for use in making where used file if needed
@@ -834,14 +1026,14 @@ def addWhereUsed(objectInfo,fileInfo,lineNumber,otype):
       else:
         fname = fileInfo.fileName
         finfo = fileInfo
-      if fname not in uObj.whatUsed.keys():
-        uObj.whatUsed[fname] = []
+      if fname not in uObj.whatUsed:
+        uObj.whatUsed[fname] = uniqueList()
       if not (finfo, objectInfo.lineNumber, otype, objectInfo) in uObj.whatUsed[fname]:
         uObj.whatUsed[fname].append((finfo, objectInfo.lineNumber, otype, objectInfo))
       if uObj.uniqueNumber == 0: uObj.uniqueNumber = metaInfo.NextIndex()
       if uType in ['func','proc'] and hasattr(uObj.parent,'whatUsed'): # add the info to pkg as well
-        if finfo.fileName not in uObj.parent.whatUsed.keys():
-            uObj.parent.whatUsed[finfo.fileName] = []
+        if finfo.fileName not in uObj.parent.whatUsed:
+            uObj.parent.whatUsed[finfo.fileName] = uniqueList()
         if not (finfo, objectInfo.lineNumber, otype, objectInfo) in uObj.parent.whatUsed[finfo.fileName]:
           uObj.parent.whatUsed[finfo.fileName].append((finfo, objectInfo.lineNumber, otype, objectInfo))
         if uObj.parent.uniqueNumber == 0: uObj.parent.uniqueNumber = metaInfo.NextIndex()
@@ -855,57 +1047,187 @@ def addWhereUsed(objectInfo,fileInfo,lineNumber,otype):
         else: oto = objectInfo.parent.fileName
         oto = os.path.split(oto)[1]
         ofrom = os.path.split(fileInfo.fileName)[1]
-        dep = '"' + ofrom + '" -> "' + oto + '";'
-        if not dep in metaInfo.depGraph['file2file']:
-            metaInfo.depGraph['file2file'].append(dep)
+        metaInfo.depGraph.addEdge('file2file',ofrom,oto)
         # medium: object -> file
-        if uType in ['proc','func'] and type(uObj.parent).__name__=='PackageInfo': uname = uObj.parent.name.lower() + '.' + uObj.name.lower()
-        else: uname = uObj.name.lower()
-        dep = '"' + uname + '" -> "' + oto + '";'
-        if not dep in metaInfo.depGraph['object2file']:
-            metaInfo.depGraph['object2file'].append(dep)
+        if uType in ['proc','func'] and type(uObj.parent).__name__=='PackageInfo': ulabel = uObj.parent.name + '.' + uObj.name
+        else: ulabel = uObj.name
+        uname = ulabel.lower()
+        if metaInfo.depGraph.addEdge('object2file',uname,oto):
             try: # might fail due to inline-comments
-                props = '"' + uname + '" [color="'+metaInfo.colors[uType][0]+'",fontcolor="'+metaInfo.colors[uType][1] + '"];'
-                if not props in metaInfo.depGraph['object2file']:
-                    metaInfo.depGraph['object2file'].append(props)
+                addDepGraphNode('object2file',uname,uType)
             except:
                 logger.debug(_('DepGraph: could not set properties from element %(object)s to file %(file)s line %(line)d'),{'object':uObj.name or '<unknown>', 'file':oto, 'line':lineNumber})
         # medium: file -> object
         if otype in ['proc','func'] and type(objectInfo.parent).__name__=='PackageInfo': oto = objectInfo.parent.name.lower() + '.' + objectInfo.name.lower()
         else: oto = objectInfo.name.lower()
-        dep = '"' + ofrom + '" -> "' + oto + '";'
-        if not dep in metaInfo.depGraph['file2object']:
-            metaInfo.depGraph['file2object'].append(dep)
+        if metaInfo.depGraph.addEdge('file2object',ofrom,oto):
             try:
-                props = '"' + uname + '" [color="'+metaInfo.colors[uType][0]+'",fontcolor="'+metaInfo.colors[uType][1] + '"];'
-                if not props in metaInfo.depGraph['file2object']:
-                    metaInfo.depGraph['file2object'].append(props)
-                props = '"' + oto + '" [color="'+metaInfo.colors[otype][0]+'",fontcolor="'+metaInfo.colors[otype][1] + '"];'
-                if not props in metaInfo.depGraph['file2object']:
-                    metaInfo.depGraph['file2object'].append(props)
+                addDepGraphNode('file2object',uname,uType)
+                addDepGraphNode('file2object',oto,otype)
             except:
                 logger.debug(_('DepGraph: could not set properties for element %(object)s (to file %(file)s)'),{'object':uObj.name or '<unknown>', 'file':oto})
         # full: object -> object
-        if otype in ['proc','func'] and type(objectInfo.parent).__name__=='PackageInfo': oname = objectInfo.parent.name.lower() + '.' + objectInfo.name.lower()
-        else: oname = objectInfo.name.lower()
-        dep = '"' + uname + '" -> "' + oname + '";'
-        if not dep in metaInfo.depGraph['object2object']:
-            metaInfo.depGraph['object2object'].append(dep)
+        if otype in ['proc','func'] and type(objectInfo.parent).__name__=='PackageInfo': olabel = objectInfo.parent.name + '.' + objectInfo.name
+        else: olabel = objectInfo.name
+        oname = olabel.lower()
+        if metaInfo.depGraph.addEdge('object2object',uname,oname):
             try:
-                props = '"' + uname + '" [color="'+metaInfo.colors[uType][0]+'",fontcolor="'+metaInfo.colors[uType][1] + '"];'
-                if not props in metaInfo.depGraph['object2object']:
-                    metaInfo.depGraph['object2object'].append(props)
-                props = '"' + oname + '" [color="'+metaInfo.colors[otype][0]+'",fontcolor="'+metaInfo.colors[otype][1] + '"];'
-                if not props in metaInfo.depGraph['object2object']:
-                    metaInfo.depGraph['object2object'].append(props)
-                props = '"' + oto + '" [color="'+metaInfo.colors[otype][0]+'",fontcolor="'+metaInfo.colors[otype][1] + '"];'
-                if not props in metaInfo.depGraph['file2object']:
-                    metaInfo.depGraph['file2object'].append(props)
+                addDepGraphNode('object2object',uname,uType,ulabel)
+                addDepGraphNode('object2object',oname,otype,olabel)
+                addDepGraphNode('file2object',oto,otype)
             except:
                 logger.debug(_('DepGraph: could not set properties for objects %(object)s/%(info)s'),{'object':uObj.name or '<unknown>', 'info':objectInfo.name or '<unknown>'})
 
 
 
+#------------------------------------------------------------------------------
+def ScanFileForUsage(file_info, matcher, cache=None):
+    """
+    Scans a single file for usages of the objects known to the matcher (see
+    ScanFilesForUsage)
+    @param object file_info FileInfo of the file to scan
+    @param object matcher UsageMatcher or UsageTokenIndex to find the usages with
+    @param optional object cache cache instance to read Oracle Forms code from
+    @return list usages tuples (objectInfo, otype, lineNumber) to be passed
+            on to addWhereUsed, in the order they were found
+    """
+    usages = []
+    if file_info.fileType == 'xml':
+        if metaInfo.useCache:
+            formcode = hypercore.cache.contents.readFormCode(file_info.fileName,cache)
+        else:
+            formcode = '' ### need to re-create in case caching is turned off
+        source = SourceText(formcode.split('\n'), not metaInfo.scanInString)
+    else:
+        source = getSource(file_info)
+    lineCount = len(source.lines)
+
+    new_text = [] # lines to scan, collected in a list (joining a long text line by line is slow)
+    line_tokens = [] # (lineno, tokens) of the lines to scan, for the token engine
+
+    for lineNumber in xrange(lineCount):
+        token_list = source.getUseTokens(lineNumber)
+        if token_list is None: # empty lines, comments
+            new_text.append('\n')
+            continue
+        if token_list[0].upper() in ['PROMPT','GRANT']:
+            # that's no usage
+            new_text.append('\n')
+            continue
+
+        # usage only, no creates, replace, force views packages functions or procedures
+        # we are scanning a LINE for USAGE - so if we find a CREATE on the line, having
+        # a usage on the very same line is out of the question
+        usage_flag = 1
+        for token_index in range(len(token_list)):
+
+            # CREATE [OR REPLACE] TYPE
+            if metaInfo.indexPage['type'] and len(token_list) > token_index+1 \
+            and token_list[token_index+1].upper() == "TYPE" \
+            and token_list[token_index].upper() in ['CREATE','REPLACE','DROP','ALTER']:
+                # we are creating, dropping, altering, or commenting - not using.  Set flag to 0
+                usage_flag = 0
+
+            # CREATE [OR REPLACE] TRIGGER
+            if metaInfo.indexPage['trigger'] and len(token_list) > token_index+1 \
+            and token_list[token_index+1].upper() == "TRIGGER" \
+            and token_list[token_index].upper() in ['CREATE','REPLACE','DROP','ALTER']:
+                # we are creating, dropping, altering, or commenting - not using.  Set flag to 0
+                usage_flag = 0
+
+            # CREATE [GLOBAL TEMPORARY] TABLE
+            if metaInfo.indexPage['tab'] and len(token_list) > token_index+1 \
+            and token_list[token_index+1].upper() == "TABLE" \
+            and token_list[token_index].upper() in ['CREATE','TEMPORARY','DROP','ALTER']:
+                # we are creating, dropping, or altering - not using.  Set flag to 0
+                usage_flag = 0
+
+            # check for COMMENT ON (COLUMN | TABLE | MATERIALIZED VIEW | INDEXTYPE | OPERATOR | MINING MODEL)
+            if metaInfo.indexPage['tab'] != '' and len(token_list) > token_index+1 and token_index > 0 \
+            and token_list[token_index+1].upper() in ['COLUMN','TABLE','INDEXTYPE','OPERATOR','MINING','MATERIALIZED'] \
+            and token_list[token_index].upper() == "ON" \
+            and token_list[token_index-1].upper() == "COMMENT":
+                # we are just commenting on a table column
+                usage_flag = 0
+
+            # look for CREATE INDEX
+            if metaInfo.indexPage['tab'] != '' and len(token_list) > token_index+1 \
+            and token_list[token_index+1].upper() == "INDEX" \
+            and token_list[token_index].upper() == "CREATE":
+                # we don't consider index creation as usage for tables
+                usage_flag = 0
+
+            # look for CREATE VIEW, REPLACE VIEW, FORCE VIEW
+            if metaInfo.indexPage['view'] != '' and len(token_list) > token_index+1 \
+            and token_list[token_index+1].upper() == "VIEW" \
+            and token_list[token_index].upper() in ['CREATE','REPLACE','FORCE','EDITIONABLE']:
+                # we are creating, forcing, or replacing - not using.  Set flag to 0
+                usage_flag = 0
+
+            # look for CREATE MATERIALIZED VIEW
+            if metaInfo.indexPage['mview'] != '' and len(token_list) > token_index+1 \
+            and token_list[token_index+1].upper() == "VIEW" \
+            and token_list[token_index].upper() == "MATERIALIZED":
+                # we are creating (or possibly dropping) - not using.  Set flag to 0
+                usage_flag = 0
+
+            # look for sequences
+            if metaInfo.indexPage['sequence'] != '' and len(token_list) > token_index+1 \
+            and token_list[token_index+1].upper() == "SEQUENCE" \
+            and token_list[token_index].upper() in ['CREATE','DROP','ALTER']:
+                # we are creating, altering, or dropping - not using.  Set flag to 0
+                usage_flag = 0
+
+            # CREATE SYNONYMs
+            if metaInfo.indexPage['synonym'] != '' and len(token_list) > token_index+1 \
+            and token_list[token_index+1].upper() == "SYNONYM" \
+            and token_list[token_index].upper() in ['CREATE','REPLACE','DROP','PUBLIC']:
+                # we are creating, or dropping - not using.  Set flag to 0
+                usage_flag = 0
+
+            # PACKAGE (CREATE|ALTER|DROP)
+            if token_list[token_index].upper() == "PACKAGE" \
+            and len(token_list) > token_index+2:
+                #and token_list[token_index+1].upper() == "BODY": # commented out - creates trouble if package spec is in the same file
+                usage_flag = 0
+
+            # look for stand-alone functions and procedures (those of the packages are
+            # already excluded in the previous step)
+            if token_index>0 and token_list[token_index].upper() == "FUNCTION" and token_list[token_index-1] in ['CREATE','REPLACE']:
+                usage_flag = 0
+            # look for procedures
+            if token_index>0 and token_list[token_index].upper() == "PROCEDURE" and token_list[token_index-1] in ['CREATE','REPLACE']:
+                usage_flag = 0
+
+            # look for END x
+            if token_list[token_index].upper() == "END" \
+            and len(token_list) > token_index+1:
+                usage_flag = 0
+
+
+        if usage_flag == 0: # this line holds some CREATE statement, no USAGE
+            new_text.append('\n')
+        else:
+            new_text.append(source.getUseLine(lineNumber))
+            line_tokens.append((lineNumber+1, token_list))
+
+    if metaInfo.scanEngine == 'token':
+        return matcher.scan(line_tokens, file_info)
+
+    # Find all usages of previously found objects in this text with a single pass
+    for kind, elem, otype, pkg, res in matcher.scan(''.join(new_text), file_info):
+        for ires in res:
+            if kind == 'short': # file internal references - possible calls without a package_name
+                # sometimes crashes with "list index out of range" when ires[0]<len(fileLines) is omitted (somehow new_text has an additional newline)
+                if not (ires[0] > lineCount and source.getUseLine(ires[0]).find('--') > -1 and source.getUseLine(ires[0]).find('--') < ires[1]): # check for inline comments to be excluded
+                    usages.append((pkg, 'pkg', ires[0]))
+                    usages.append((elem, otype, ires[0]))
+            else:
+                usages.append((elem, otype, ires[0]))
+
+    return usages
+
+
 #------------------------------------------------------------------------------
 def ScanFilesForUsage():
     """
@@ -915,301 +1237,153 @@ def ScanFilesForUsage():
     """
     pbarInit(_("Scanning source files for where views and packages are used"),0,len(metaInfo.fileInfoList), logname)
 
-    if metaInfo.indexPage['form'] != '' and metaInfo.useCache: cache = hypercore.cache.cache(metaInfo.cacheDirectory)
+    if metaInfo.indexPage['form'] != '' and metaInfo.useCache: cache = hypercore.cache.getCache(metaInfo.cacheDirectory,metaInfo.cacheBackend)
+    else: cache = None
 
     if metaInfo.scanInString: logger.info(_('Including strings in where_used scan'))
     else:                     logger.info(_('Excluding strings from where_used scan'))
 
-    outerfileInfoList = []
-    for file_info in metaInfo.fileInfoList:
-        outerfileInfoList.append(file_info)
+    # collect the names of all objects once, so each file needs to be scanned only once
+    if metaInfo.scanEngine == 'token':
+        logger.info(_('Using the token index for the where_used scan'))
+        matcher = UsageTokenIndex(metaInfo.fileInfoList, metaInfo.scanShortRefs)
+    else:
+        matcher = UsageMatcher(metaInfo.fileInfoList, metaInfo.scanShortRefs)
 
+    # stable keys (file name, position) for all objects, to refer to them from workers and cache
+    objects = {}
+    usageJob['keys'] = {}
+    for file_info in metaInfo.fileInfoList:
+        pos = 0
+        for elem in getFileObjects(file_info,False):
+            objects[(file_info.fileName,pos)] = elem
+            usageJob['keys'][elem.uniqueNumber] = (file_info.fileName,pos)
+            pos += 1
+    usageJob['matcher'] = matcher
+    usageJob['cache']   = cache
+    usageJob['fprint']  = scanFingerprint()
+    if metaInfo.useCache and metaInfo.incremental: usageJob['incremental'] = hypercore.cache.getCache(metaInfo.cacheDirectory,metaInfo.cacheBackend)
+    else: usageJob['incremental'] = None
+
+    # usages in unchanged files can be taken from the cache, as long as they
+    # neither refer to changed objects nor mention any of them
+    results = {}
+    if usageJob['incremental']:
+        unchanged = set()
+        names = set()
+        for file_info in metaInfo.fileInfoList:
+            if file_info.cached: unchanged.add(file_info.fileName)
+            else:
+                for elem in getFileObjects(file_info):
+                    if elem.name: names.add(elem.name)
+        for idx in range(len(metaInfo.fileInfoList)):
+            records = loadUsageResult(usageJob['incremental'], idx, usageJob['fprint'], unchanged, names)
+            if records is not None: results[idx] = records
+        logger.info(_('Usage of %(cached)d of %(files)d files taken from cache'), {'cached':len(results), 'files':len(metaInfo.fileInfoList)})
+    todo = [idx for idx in range(len(metaInfo.fileInfoList)) if idx not in results]
+
+    jobs = None
+    if metaInfo.jobs > 1 and len(todo) > 1 and hasattr(os,'fork'):
+        logger.info(_('Scanning files for usage with %s parallel jobs'), metaInfo.jobs)
+        pool = multiprocessing.Pool(metaInfo.jobs)
+        jobs = pool.imap(countedJob, [(ScanUsageJob, idx) for idx in todo])
+
+    # records are applied in file order (and within a file in the order they
+    # were found), so we get the same results as with a sequential scan
     i = 0
-    for outer_file_info in outerfileInfoList:
+    for idx in range(len(metaInfo.fileInfoList)):
         # update progressbar
         i += 1
         pbarUpdate(i)
+        if idx in results: records = results[idx]
+        elif jobs:
+            records, stats = jobs.next()
+            hypercore.cache.addStats(stats)
+        else: records = ScanUsageJob(idx)
+        file_info = metaInfo.fileInfoList[idx]
+        for usedFile, usedPos, lineNumber, usingPos, otype, uType in records:
+            if usingPos < 0: uObj = ElemInfo() # no using object found, just the file
+            else: uObj = objects[(file_info.fileName,usingPos)]
+            addWhereUsed(objects[(usedFile,usedPos)], file_info, lineNumber, otype, (uType,uObj))
+
+    if jobs:
+        pool.close()
+        pool.join()
+    usageJob.clear()
+    for file_info in metaInfo.fileInfoList: file_info.source = None # not needed anymore
+    metaInfo.depGraph.compact() # the graphs are complete now
 
-        if outer_file_info.fileType == 'xml':
-            formcode = ''
-            if metaInfo.useCache:
-                try:
-                    formcode = cache.get(outer_file_info.fileName,'formcode')
-                except:
-                    formcode = ''
-            else:
-                formcode = '' ### need to re-create in case caching is turned off
-            fileLines = formcode.split('\n')
-        else:
-            infile = fopen(outer_file_info.fileName, "r", metaInfo.encoding)
-            fileLines = infile.readlines()
-            infile.close()
-
-        # if we find a package definition, this flag tells us to also look for
-        # functions and procedures.  If we don't find a package definition, there
-        # is no reason to look for them
-        package_count = -1
-        in_block_comment = 0
-        new_file = 1
-        new_text = ''
-
-        for lineNumber in range(len(fileLines)):
-
-            if new_file == 1:
-                token_list = fileLines[lineNumber].split()
-            else:
-                token_list = token_list1
-
-            # len()-1 because we start with index 0
-            if len(fileLines)-1 > lineNumber and not metaInfo.scanInString:
-                fileLines[lineNumber+1], matched_string = eatStrings(fileLines[lineNumber+1])
-                token_list1 = fileLines[lineNumber+1].split()
-            else:
-                token_list1 = []
-            new_file = 0
-
-            # Skip empty lines
-            if len(token_list) < 1:
-                new_text += '\n'
-                continue
-
-            # ignore lines that begin with comments
-            if token_list[0][:2] == "--" or token_list[0][:2] == "//" or token_list[0][:2] == "##":
-                new_text += '\n'
-                continue
-            # ignore block comments
-            if token_list[0][:2] == "/*" and token_list[0][len(token_list[0])-2:len(token_list[0])] == "*/":
-                # block comments like  "/***....*****/"
-                token_list.pop(0)
-            elif token_list[0][:2] == "/*" or in_block_comment == 1:
-                # 
-                in_block_comment = 1
-                clean_list = []
-                for token_index in range(len(token_list)):
-                    if token_list[token_index][:2] == "*/":
-                        clean_list.append(token_index)
-                        in_block_comment = 0
-                    else:
-                        clean_list.append(token_index)
-                if len(clean_list) > 0:
-                    if len(clean_list) == 1:
-                        # pop only index 0
-                        token_list.pop(clean_list[0])
-                    else:
-                        for clean_index in range(len(clean_list)-1,-1,-1):
-                            # work reverse from back
-                            token_list.pop(clean_list[clean_index])
-            if  len(token_list) == 0:
-                # nothing more on line
-                new_text += '\n'
-                continue
-            if token_list[0].upper() in ['PROMPT','GRANT']:
-                # that's no usage
-                new_text += '\n'
-                continue
-
-            # usage only, no creates, replace, force views packages functions or procedures
-            # we are scanning a LINE for USAGE - so if we find a CREATE on the line, having
-            # a usage on the very same line is out of the question
-            usage_flag = 1
-            for token_index in range(len(token_list)):
-
-                # CREATE [OR REPLACE] TYPE
-                if metaInfo.indexPage['type'] and len(token_list) > token_index+1 \
-                and token_list[token_index+1].upper() == "TYPE" \
-                and token_list[token_index].upper() in ['CREATE','REPLACE','DROP','ALTER']:
-                    # we are creating, dropping, altering, or commenting - not using.  Set flag to 0
-                    usage_flag = 0
-
-                # CREATE [OR REPLACE] TRIGGER
-                if metaInfo.indexPage['trigger'] and len(token_list) > token_index+1 \
-                and token_list[token_index+1].upper() == "TRIGGER" \
-                and token_list[token_index].upper() in ['CREATE','REPLACE','DROP','ALTER']:
-                    # we are creating, dropping, altering, or commenting - not using.  Set flag to 0
-                    usage_flag = 0
-
-                # CREATE [GLOBAL TEMPORARY] TABLE
-                if metaInfo.indexPage['tab'] and len(token_list) > token_index+1 \
-                and token_list[token_index+1].upper() == "TABLE" \
-                and token_list[token_index].upper() in ['CREATE','TEMPORARY','DROP','ALTER']:
-                    # we are creating, dropping, or altering - not using.  Set flag to 0
-                    usage_flag = 0
-
-                # check for COMMENT ON (COLUMN | TABLE | MATERIALIZED VIEW | INDEXTYPE | OPERATOR | MINING MODEL)
-                if metaInfo.indexPage['tab'] != '' and len(token_list) > token_index+1 and token_index > 0 \
-                and token_list[token_index+1].upper() in ['COLUMN','TABLE','INDEXTYPE','OPERATOR','MINING','MATERIALIZED'] \
-                and token_list[token_index].upper() == "ON" \
-                and token_list[token_index-1].upper() == "COMMENT":
-                    # we are just commenting on a table column
-                    usage_flag = 0
-
-                # look for CREATE INDEX
-                if metaInfo.indexPage['tab'] != '' and len(token_list) > token_index+1 \
-                and token_list[token_index+1].upper() == "INDEX" \
-                and token_list[token_index].upper() == "CREATE":
-                    # we don't consider index creation as usage for tables
-                    usage_flag = 0
+    # complete line on task completion
+    pbarClose()
 
-                # look for CREATE VIEW, REPLACE VIEW, FORCE VIEW
-                if metaInfo.indexPage['view'] != '' and len(token_list) > token_index+1 \
-                and token_list[token_index+1].upper() == "VIEW" \
-                and token_list[token_index].upper() in ['CREATE','REPLACE','FORCE','EDITIONABLE']:
-                    # we are creating, forcing, or replacing - not using.  Set flag to 0
-                    usage_flag = 0
 
-                # look for CREATE MATERIALIZED VIEW
-                if metaInfo.indexPage['mview'] != '' and len(token_list) > token_index+1 \
-                and token_list[token_index+1].upper() == "VIEW" \
-                and token_list[token_index].upper() == "MATERIALIZED":
-                    # we are creating (or possibly dropping) - not using.  Set flag to 0
-                    usage_flag = 0
+#------------------------------------------------------------------------------
+def ScanUsageJob(idx):
+    """
+    Scan a single file for usages, either directly or in a worker process of
+    ScanFilesForUsage. The objects are referred to by stable keys (name of the
+    file they are defined in, and their position in getFileObjects), as the
+    workers only have copies of them, and records may be cached for the next run
+    @param int idx index of the file in metaInfo.fileInfoList
+    @return list records tuples (string usedFile, int usedPos, int lineNumber,
+            int usingPos, string otype, string uType) with usingPos being the
+            position of the using object in this file, or -1 if the usage is
+            not inside any known object
+    """
+    file_info = metaInfo.fileInfoList[idx]
+    keys = usageJob['keys']
+    records = []
+    cache = None
+    if usageJob['cache'] or usageJob['incremental']: # worker processes need their own instance
+        cache = hypercore.cache.getCache(metaInfo.cacheDirectory,metaInfo.cacheBackend)
+    if usageJob['cache']: formcache = cache
+    else: formcache = None
+    for objectInfo, otype, lineNumber in ScanFileForUsage(file_info, usageJob['matcher'], formcache):
+        if lineNumber == objectInfo.lineNumber: continue # self-reference, skipped by addWhereUsed anyway
+        uType,uObj = findUsingObject(file_info,lineNumber)
+        used = keys[objectInfo.uniqueNumber]
+        if uObj.uniqueNumber in keys: using = keys[uObj.uniqueNumber][1]
+        else: using = -1
+        records.append((used[0], used[1], lineNumber, using, otype, uType))
+    if usageJob['incremental'] and file_info.fileType != 'xml':
+        cache.putObj(file_info.fileName, 'usage', (usageJob['fprint'], records))
+    return records
 
-                # look for sequences
-                if metaInfo.indexPage['sequence'] != '' and len(token_list) > token_index+1 \
-                and token_list[token_index+1].upper() == "SEQUENCE" \
-                and token_list[token_index].upper() in ['CREATE','DROP','ALTER']:
-                    # we are creating, altering, or dropping - not using.  Set flag to 0
-                    usage_flag = 0
 
-                # CREATE SYNONYMs
-                if metaInfo.indexPage['synonym'] != '' and len(token_list) > token_index+1 \
-                and token_list[token_index+1].upper() == "SYNONYM" \
-                and token_list[token_index].upper() in ['CREATE','REPLACE','DROP','PUBLIC']:
-                    # we are creating, or dropping - not using.  Set flag to 0
-                    usage_flag = 0
-
-                # PACKAGE (CREATE|ALTER|DROP)
-                if token_list[token_index].upper() == "PACKAGE" \
-                and len(token_list) > token_index+2:
-                    #and token_list[token_index+1].upper() == "BODY": # commented out - creates trouble if package spec is in the same file
-                    usage_flag = 0
-
-                # look for stand-alone functions and procedures (those of the packages are
-                # already excluded in the previous step)
-                if token_index>0 and token_list[token_index].upper() == "FUNCTION" and token_list[token_index-1] in ['CREATE','REPLACE']:
-                    usage_flag = 0
-                # look for procedures
-                if token_index>0 and token_list[token_index].upper() == "PROCEDURE" and token_list[token_index-1] in ['CREATE','REPLACE']:
-                    usage_flag = 0
-
-                # look for END x
-                if token_list[token_index].upper() == "END" \
-                and len(token_list) > token_index+1:
-                    usage_flag = 0
-
-
-            if usage_flag == 0: # this line holds some CREATE statement, no USAGE
-                new_text += '\n'
+#------------------------------------------------------------------------------
+def loadUsageResult(cache, idx, fprint, unchanged, names):
+    """
+    Obtain the results of ScanUsageJob for an unchanged file from the cache
+    @param object cache cache instance to use
+    @param int idx index of the file in metaInfo.fileInfoList
+    @param string fprint fingerprint of the current settings (see scanFingerprint)
+    @param set unchanged names of all files whose objects did not change
+    @param set names names of all objects from changed files
+    @return mixed list of records as returned by ScanUsageJob, or None if the
+            file needs to be scanned again
+    """
+    file_info = metaInfo.fileInfoList[idx]
+    if not file_info.cached or not cache.check(file_info.fileName,'usage'):
+        return None
+    try:
+        cprint, records = cache.getObj(file_info.fileName,'usage',0)
+    except:
+        logger.warn(_('Could not read cached usage for %s'), file_info.fileName)
+        return None
+    if cprint != fprint: return None
+    for rec in records:
+        if rec[0] not in unchanged: return None
+    if names:
+        text = ''.join(hypercore.cache.contents.readLines(file_info.fileName, metaInfo.encoding))
+        words = set(patterns.word.findall(text.lower()))
+        for name in names:
+            if patterns.plainWord.match(name):
+                if name.lower() in words: return None
             else:
-                new_text += fileLines[lineNumber]
-
-        # Loop through all previously found views and packages to see if they are used in this line of text
-        for inner_file_info in metaInfo.fileInfoList:
-
-            # if this FileInfo instance has types
-            for elem in inner_file_info.typeInfoList:
-                # perform case insensitive find
-                res = getWordLineNr(new_text,'\\b'+elem.name+'\\b')
-                for ires in res:
-                    addWhereUsed(elem, outer_file_info, ires[0], 'type')
-
-            # if this FileInfo instance has triggers
-            for elem in inner_file_info.triggerInfoList:
-                # perform case insensitive find
-                res = getWordLineNr(new_text,'\\b'+elem.name+'\\b')
-                for ires in res:
-                    addWhereUsed(elem, outer_file_info, ires[0], 'trigger')
-
-            # if this FileInfo instance has tables
-            for elem in inner_file_info.tabInfoList:
-                # perform case insensitive find
                 try:
-                    res = getWordLineNr(new_text,'\\b'+elem.name+'\\b')
-                except:
-                    logger.error('RegExp error searching for "'+tab_info.name+'"')
-                for ires in res:
-                    addWhereUsed(elem, outer_file_info, ires[0], 'tab')
-
-            # if this FileInfo instance has views
-            for elem in inner_file_info.viewInfoList:
-                # perform case insensitive find
-                res = getWordLineNr(new_text,'\\b'+elem.name+'\\b')
-                for ires in res:
-                    addWhereUsed(elem, outer_file_info, ires[0], 'view')
-
-            # if this FileInfo instance has materialized views
-            for elem in inner_file_info.mviewInfoList:
-                # perform case insensitive find
-                res = getWordLineNr(new_text,'\\b'+elem.name+'\\b')
-                for ires in res:
-                    addWhereUsed(elem, outer_file_info, ires[0], 'mview')
-
-            # if this FileInfo instance has synonyms
-            for elem in inner_file_info.synInfoList:
-                # perform case insensitive find
-                res = getWordLineNr(new_text,'\\b'+elem.name+'\\b')
-                for ires in res:
-                    addWhereUsed(elem, outer_file_info, ires[0], 'synonym')
-
-            # if this FileInfo instance has sequences
-            for elem in inner_file_info.seqInfoList:
-                # perform case insensitive find
-                res = getWordLineNr(new_text,'\\b'+elem.name+'\\b')
-                for ires in res:
-                    addWhereUsed(elem, outer_file_info, ires[0], 'sequence')
-
-            # if this FileInfo instance has stand-alone functions
-            for elem in inner_file_info.functionInfoList:
-                res = getWordLineNr(new_text,'\\b'+elem.name+'\\b')
-                for ires in res:
-                    addWhereUsed(elem, outer_file_info, ires[0], 'function')
-
-            # if this FileInfo instance has stand-alone procedures
-            for elem in inner_file_info.procedureInfoList:
-                res = getWordLineNr(new_text,'\\b'+elem.name+'\\b')
-                for ires in res:
-                    addWhereUsed(elem, outer_file_info, ires[0], 'procedure')
-
-            # if this FileInfo instance has packages
-            for package_info in inner_file_info.packageInfoList:
-
-                # perform case insensitive find, this is "package name"."function or procedure name"
-                res = getWordLineNr(new_text,'\\b'+package_info.name+'\\.\S')
-                if len(res):
-                    for ires in res:
-                        addWhereUsed(package_info, outer_file_info, ires[0], 'pkg')
-
-                    #look for any of this packages' functions
-                    for function_info in package_info.functionInfoList:
-                        res = getWordLineNr(new_text,'\\b'+package_info.name+'\.'+function_info.name+'\\b')
-                        for ires in res:
-                            addWhereUsed(function_info, outer_file_info, ires[0], 'func')
-
-                    #look for any of this packages procedures
-                    for procedure_info in package_info.procedureInfoList:
-                        res = getWordLineNr(new_text,'\\b'+package_info.name+'\.'+procedure_info.name+'\\b')
-                        for ires in res:
-                            addWhereUsed(procedure_info, outer_file_info, ires[0], 'proc')
-
-                ### File internal references - possible calls without a package_name
-                if outer_file_info.uniqueNumber == inner_file_info.uniqueNumber and metaInfo.scanShortRefs:
-
-                    #look for any of this packages' functions
-                    for function_info in package_info.functionInfoList:
-                        res = getWordLineNr(new_text,'(^|\\s|[(;,])'+function_info.name+'([ (;,)]|$)')
-                        for ires in res:
-                            # sometimes crashes with "list index out of range" when ires[0]<len(fileLines) is omitted (somehow new_text has an additional newline)
-                            if not (ires[0] > len(fileLines) and fileLines[ires[0]].find('--') > -1 and fileLines[ires[0]].find('--') < ires[1]): # check for inline comments to be excluded
-                                addWhereUsed(package_info, outer_file_info, ires[0], 'pkg')
-                                addWhereUsed(function_info, outer_file_info, ires[0], 'func')
-
-                    #look for any of this packages procedures
-                    for procedure_info in package_info.procedureInfoList:
-                        res = getWordLineNr(new_text,'(^|\\s|[(;,])'+procedure_info.name+'([ (;,)]|$)')
-                        for ires in res:
-                            if not (ires[0] > len(fileLines) and fileLines[ires[0]].find('--') > -1 and fileLines[ires[0]].find('--') < ires[1]): # check for inline comments to be excluded
-                                addWhereUsed(package_info, outer_file_info, ires[0], 'pkg')
-                                addWhereUsed(procedure_info, outer_file_info, ires[0], 'proc')
+                    if patterns.compiled(name,re.I).search(text): return None # names are used as regular expressions
+                except re.error:
+                    return None
+    return records
+
 
-    # complete line on task completion
-    pbarClose()
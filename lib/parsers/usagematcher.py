@@ -0,0 +1,235 @@
+"""
+Single-pass matcher for the where_used scan
+"""
+__revision__ = '$Id$'
+
+import re
+from hypercore.helpers import getWordLineNr
+from iz_tools.text import LineIndex
+from hypercore.lexicon import getWords
+from hypercore import patterns
+
+
+class UsageMatcher(object):
+    """
+    Collects the where_used patterns of all known objects once, and finds the
+    hits for all of them with a single pass over a text. Hits are reported in
+    the very order (and with the very line numbers/offsets) the per-object
+    regular expressions used to produce them - so the resulting addWhereUsed()
+    calls stay the same. Names which are no plain words (e.g. containing '$'
+    or '#') cannot be resolved via the word index, so their pattern is still
+    run separately.
+    """
+
+    def __init__(self,fileInfoList,shortRefs=False):
+        """
+        Build the pattern index for all objects found by ScanFilesForObjects
+        @param self
+        @param list fileInfoList list of FileInfo objects to collect the object names from
+        @param optional boolean shortRefs whether to include references to package
+               functions/procedures not prefixed by the package name (file internal only)
+        """
+        self.patterns = []  # tuples (kind, elem, otype, parent index, owner FileInfo, fallback regexp)
+        self.words    = {}  # lowercased name -> list of pattern indices
+        self.members  = {}  # (lowercased package, lowercased member) -> list of pattern indices
+        self.fallback = []  # indices of patterns we cannot resolve via the word index
+        for fInfo in fileInfoList:
+            for otype, elems in [('type',fInfo.typeInfoList), ('trigger',fInfo.triggerInfoList),
+                                 ('tab',fInfo.tabInfoList), ('view',fInfo.viewInfoList),
+                                 ('mview',fInfo.mviewInfoList), ('synonym',fInfo.synInfoList),
+                                 ('sequence',fInfo.seqInfoList), ('function',fInfo.functionInfoList),
+                                 ('procedure',fInfo.procedureInfoList)]:
+                for elem in elems:
+                    self.addPattern('word', elem, otype, elem.name, '\\b'+elem.name+'\\b')
+            for pInfo in fInfo.packageInfoList:
+                pidx = self.addPattern('pkg', pInfo, 'pkg', pInfo.name, '\\b'+pInfo.name+'\\.\S')
+                for otype, elems in [('func',pInfo.functionInfoList), ('proc',pInfo.procedureInfoList)]:
+                    for elem in elems:
+                        self.addPattern('member', elem, otype, (pInfo.name,elem.name), '\\b'+pInfo.name+'\.'+elem.name+'\\b', pidx)
+                if shortRefs:
+                    for otype, elems in [('func',pInfo.functionInfoList), ('proc',pInfo.procedureInfoList)]:
+                        for elem in elems:
+                            self.addPattern('short', elem, otype, elem.name, '(^|\\s|[(;,])'+elem.name+'([ (;,)]|$)', pidx, fInfo)
+
+    def addPattern(self,kind,elem,otype,name,regexp,parent=-1,owner=None):
+        """
+        Register the pattern for one object
+        @param self
+        @param string kind 'word' (\\bname\\b), 'pkg' (\\bpkg\\.\\S), 'member' (\\bpkg\\.name\\b)
+               or 'short' (name delimited by blanks, parenthesis, colons or semicolons)
+        @param object elem the ElemInfo the pattern belongs to
+        @param string otype object type to pass on to addWhereUsed
+        @param mixed name name to index (tuple (package, member) for kind 'member')
+        @param string regexp the equivalent regular expression (used if name is no plain word)
+        @param optional int parent index of the package pattern (for 'member' and 'short')
+        @param optional object owner FileInfo the pattern is restricted to (for 'short')
+        @return int index of the new pattern
+        """
+        idx = len(self.patterns)
+        self.patterns.append((kind, elem, otype, parent, owner, regexp))
+        if kind == 'member':
+            if patterns.plainWord.match(name[0]) and patterns.plainWord.match(name[1]):
+                self.members.setdefault((name[0].lower(),name[1].lower()), []).append(idx)
+                return idx
+        elif patterns.plainWord.match(name):
+            self.words.setdefault(name.lower(), []).append(idx)
+            return idx
+        self.fallback.append(idx)
+        return idx
+
+    def candidate(self,kind,text,start,end):
+        """
+        Check whether the pattern kind matches at a given word
+        @param self
+        @param string kind kind of the pattern (see addPattern)
+        @param string text the text scanned
+        @param int start start position of the word
+        @param int end end position of the word
+        @return tuple (start,end) of the match, or None
+        """
+        if kind == 'word':
+            return (start, end)
+        if kind == 'pkg':
+            if text[end:end+1] == '.' and end+1 < len(text) and text[end+1] not in patterns.spaceChars:
+                return (start, end+2)
+            return None
+        # kind == 'short'
+        if start == 0: mstart = 0
+        elif text[start-1] in patterns.spaceChars or text[start-1] in '(;,': mstart = start-1
+        else: return None
+        if text[end:end+1] and text[end] in ' (;,)': return (mstart, end+1)
+        if end == len(text) or (end == len(text)-1 and text[end] == '\n'): return (mstart, end)
+        return None
+
+    def scan(self,text,fInfo):
+        """
+        Find the usages of all known objects in the given text
+        @param self
+        @param string text the text to scan (comments and CREATE statements already removed)
+        @param object fInfo FileInfo the text belongs to
+        @return list of tuples (kind, elem, otype, pkg, res) in the order the
+                single patterns were checked before, with res being the list
+                of (lineno, offset, word) tuples as returned by getWordLineNr,
+                and pkg the PackageInfo for 'short' patterns
+        """
+        spans = {}
+        prev = None
+        for m in patterns.word.finditer(text):
+            start, end = m.span()
+            word = m.group(0).lower()
+            if prev is not None and prev[1] == start-1 and text[start-1] == '.':
+                for idx in self.members.get((prev[2],word),[]):
+                    spans.setdefault(idx,[]).append((prev[0],end))
+            for idx in self.words.get(word,[]):
+                pattern = self.patterns[idx]
+                if pattern[4] is not None and pattern[4] is not fInfo: continue
+                span = self.candidate(pattern[0],text,start,end)
+                if span: spans.setdefault(idx,[]).append(span)
+            prev = (start, end, word)
+
+        active = set(spans.keys())
+        for idx in self.fallback:
+            if self.patterns[idx][4] is None or self.patterns[idx][4] is fInfo: active.add(idx)
+
+        result = []
+        pkgHits = set()
+        lines = LineIndex(text)
+        for idx in sorted(active):
+            kind, elem, otype, parent, owner, regexp = self.patterns[idx]
+            if kind == 'member' and parent not in pkgHits: continue
+            if idx in spans:
+                res = []
+                last = 0
+                for mstart, mend in spans[idx]:
+                    if mstart < last: continue # finditer does not report overlapping matches
+                    last = mend
+                    lineno, offset = lines.position(mstart)
+                    res.append((lineno, offset, text[mstart:mend]))
+            else:
+                res = getWordLineNr(text,regexp,lines)
+            if not res: continue
+            if kind == 'pkg': pkgHits.add(idx)
+            if parent < 0: pkg = None
+            else: pkg = self.patterns[parent][1]
+            result.append((kind, elem, otype, pkg, res))
+        return result
+
+
+identPatt = re.compile(r'[\w$#]+(?:\.[\w$#]+)*', re.U) # identifiers, including qualified ones (pkg.func)
+
+
+class UsageTokenIndex(object):
+    """
+    Alternative engine for the where_used scan: instead of matching the object
+    names against the text, the (already split) tokens of each line are broken
+    into identifiers which are then looked up in a case-insensitive index of
+    all known objects. Qualified names (package.member) are resolved directly
+    via the package's function and procedure lists.
+    """
+
+    def __init__(self,fileInfoList,shortRefs=False):
+        """
+        Build the name index for all objects found by ScanFilesForObjects
+        @param self
+        @param list fileInfoList list of FileInfo objects to collect the object names from
+        @param optional boolean shortRefs whether to include references to package
+               functions/procedures not prefixed by the package name (file internal only)
+        """
+        self.shortRefs = shortRefs
+        self.names    = {}  # lowercased name -> list of (elem, otype)
+        self.packages = {}  # lowercased package name -> list of PackageInfo
+        self.members  = {}  # (lowercased package, lowercased member) -> list of (elem, otype)
+        self.short    = {}  # FileInfo -> {lowercased member -> list of (pkg, elem, otype)}
+        for fInfo in fileInfoList:
+            for otype, elems in [('type',fInfo.typeInfoList), ('trigger',fInfo.triggerInfoList),
+                                 ('tab',fInfo.tabInfoList), ('view',fInfo.viewInfoList),
+                                 ('mview',fInfo.mviewInfoList), ('synonym',fInfo.synInfoList),
+                                 ('sequence',fInfo.seqInfoList), ('function',fInfo.functionInfoList),
+                                 ('procedure',fInfo.procedureInfoList)]:
+                for elem in elems:
+                    self.names.setdefault(elem.name.lower(), []).append((elem, otype))
+            for pInfo in fInfo.packageInfoList:
+                pname = pInfo.name.lower()
+                self.packages.setdefault(pname, []).append(pInfo)
+                for otype, elems in [('func',pInfo.functionInfoList), ('proc',pInfo.procedureInfoList)]:
+                    for elem in elems:
+                        self.members.setdefault((pname,elem.name.lower()), []).append((elem, otype))
+                        if shortRefs:
+                            self.short.setdefault(fInfo, {}).setdefault(elem.name.lower(), []).append((pInfo, elem, otype))
+        # SQL keywords which are no object names can be skipped right away
+        known = set(self.names.keys()) | set(self.packages.keys())
+        for members in self.short.values(): known.update(members.keys())
+        self.skip = frozenset([word.lower() for word in getWords('keywords')]) - known
+
+    def scan(self,lines,fInfo):
+        """
+        Find the usages of all known objects in the given lines
+        @param self
+        @param list lines list of tuples (lineno, tokens) holding the tokens of
+               all lines to scan (comments and CREATE statements already removed)
+        @param object fInfo FileInfo the lines belong to
+        @return list of tuples (elem, otype, lineno) in the order the usages
+                appear in the text
+        """
+        result = []
+        short = self.short.get(fInfo, {})
+        for lineno, tokens in lines:
+            for token in tokens:
+                for ident in identPatt.findall(token):
+                    parts = ident.lower().split('.')
+                    for i in range(len(parts)):
+                        part = parts[i]
+                        if part in self.skip: continue
+                        for elem, otype in self.names.get(part, []):
+                            result.append((elem, otype, lineno))
+                        if part in self.packages:
+                            if i+1 < len(parts):
+                                for pInfo in self.packages[part]:
+                                    result.append((pInfo, 'pkg', lineno))
+                                for elem, otype in self.members.get((part,parts[i+1]), []):
+                                    result.append((elem, otype, lineno))
+                        elif len(parts) == 1 and part in short:
+                            for pInfo, elem, otype in short[part]:
+                                result.append((pInfo, 'pkg', lineno))
+                                result.append((elem, otype, lineno))
+        return result
@@ -0,0 +1,152 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Benchmark for the code formatter (hypercode): formats the given SQL files
+(or, if none are given, a generated package body of 10,000 lines) with the
+current formatter and with the previous one (string concatenation, list
+lookups), makes sure both produce the same HTML, and reports the time taken.
+Usage: python tools/bench_hypercode.py [file.sql ...]
+"""
+
+import os, sys, time, re
+basedir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0,os.path.join(basedir,'lib'))
+from hypercore.codeformatter import hypercode
+from cgi import escape
+from iz_tools.typecheck import is_numeric
+
+#------------------------------------------------------------------------------
+def hypercode_previous(line_list,keywords,types,cssclass='sql'):
+    """ The list based formatter as it was before (for comparison) """
+
+    # we need leading zeroes for the line numbers
+    line_number_width = len(`len(line_list)`) # number of chars in "number of lines of text"
+
+    html = ''
+    commentmode = 0 # 0 no comment, 1 '--', 2 '/*', 3 in_singlequote_string
+    splitter = re.compile('([\'\s,\.;\:%\(\)\}\{\|\<\>])')
+    for line_number in range(len(line_list)):
+        line  = escape(line_list[line_number]).replace('&lt;','<').replace('&gt;','>')
+        if line.strip()[0:2]=='--':
+           text = '<SPAN CLASS="'+cssclass+'comment">' + line + '</SPAN>'
+        else:
+            text = ''
+            if commentmode==2:
+                text += '<SPAN CLASS="'+cssclass+'comment">'
+            oldelem = ''
+            tokens = splitter.split(line)
+            for idx in range(len(tokens)):
+                elem = tokens[idx]
+                if commentmode==0:
+                    if elem[0:2]=='--':
+                        text += '<SPAN CLASS="'+cssclass+'comment">' + elem
+                        commentmode = 1
+                    elif elem[0:2]=='/*':
+                        text += '<SPAN CLASS="'+cssclass+'comment">' + elem
+                        commentmode = 2
+                    elif elem=="'":
+                        text += '<SPAN CLASS="'+cssclass+'brace">\'</SPAN><SPAN CLASS="'+cssclass+'string">'
+                        commentmode = 3
+                    elif elem[0:1]=="'":
+                        text += '<SPAN CLASS="'+cssclass+'brace">\'</SPAN><SPAN CLASS="'+cssclass+'string">' + elem[1:len(elem)-1]
+                        if elem[len(elem)-1:]=="'":
+                            text += '</SPAN><SPAN CLASS="'+cssclass+'brace">\'</SPAN>'
+                        else:
+                            text += elem[len(elem)-1:]
+                            commentmode = 3
+                    elif elem in [',', ':', '=', '(', ')', '[', ']', '{', '}'] \
+                      or (elem==';' and (len(oldelem)==0 or oldelem[0]!='&')): # skip html entities for ;
+                        text += '<SPAN CLASS="'+cssclass+'brace">' + elem + '</SPAN>'
+                    elif elem in ['<','>']:
+                        text += '<SPAN CLASS="'+cssclass+'brace">' + escape(elem) + '</SPAN>'
+                    elif is_numeric(elem):
+                        text += '<SPAN CLASS="'+cssclass+'numeric">' + elem + '</SPAN>'
+                    elif elem in keywords:
+                        text += '<SPAN CLASS="'+cssclass+'keyword">' + elem + '</SPAN>'
+                    elif elem in types:
+                        text += '<SPAN CLASS="'+cssclass+'type">' + elem + '</SPAN>'
+                    else: text += elem
+                elif commentmode==2:
+                    if elem[len(elem)-2:]=='*/':
+                        text += escape(elem) + '</SPAN>'
+                        commentmode = 0 # clear at comment end
+                    else: text += escape(elem)
+                elif commentmode==3:
+                    if elem=="'":
+                        if not ( idx>0 and tokens[idx-1]=="'" ) or ( len(tokens)>idx and tokens[idx+1]=="'" ):
+                            text += '</SPAN><SPAN CLASS="'+cssclass+'brace">\'</SPAN>'
+                            commentmode = 0
+                    else: text += escape(elem)
+                else: # 1 for now
+                    text += escape(elem)
+                oldelem = elem # remember for back-check
+            if commentmode==1:
+                text += '</SPAN>'
+                commentmode = 0 # clear at line end
+            elif commentmode==2:
+                text += '</SPAN>'
+            #if text[len(text)-1:] != '\n':
+            #    text += "\n"
+        text = text.replace('\n\n','\n')
+        zeroes = (1 + line_number_width - len(`line_number+1`)) * "0" # leading zeroes for line numbers (+1 since we start with 0)
+        html += "<A NAME=\"L" + `line_number+1` + "\"></A>" # hyperlink target
+        html += zeroes + `line_number+1` + ": " + text #text
+    return html
+
+
+#------------------------------------------------------------------------------
+def readList(fname):
+    """
+    Read a list of keywords/types
+    @param string fname name of the file
+    @return list items
+    """
+    items = []
+    for line in open(os.path.join(basedir,fname)):
+        if line.strip()[0:1] in ['#','']: continue
+        items.append(line.strip())
+    return items
+
+#------------------------------------------------------------------------------
+def sampleCode(lines=10000):
+    """
+    Generate a package body to format
+    @param optional int lines approximate number of lines
+    @return list code lines
+    """
+    code = [u'CREATE OR REPLACE PACKAGE BODY bench_pkg AS\n']
+    i = 0
+    while len(code) < lines:
+        i += 1
+        code += [ u'  /** Procedure number %d\n' % i,
+                  u'   * @param in number p_id the id\n',
+                  u'   */\n',
+                  u'  PROCEDURE proc_%d(p_id IN NUMBER, p_name IN VARCHAR2) IS\n' % i,
+                  u'    v_count NUMBER := 0; -- counter\n',
+                  u"    v_text  VARCHAR2(200) := 'Text with ''quotes'' and <tags> & stuff';\n",
+                  u'  BEGIN\n',
+                  u'    SELECT COUNT(*) INTO v_count FROM some_table WHERE id = p_id AND name <> p_name;\n',
+                  u'    IF v_count > %d THEN\n' % i,
+                  u'      other_pkg.do_something(p_id, v_text || \'%%\'); /* inline comment */\n',
+                  u'    END IF;\n',
+                  u'  END proc_%d;\n' % i ]
+    code.append(u'END bench_pkg;\n')
+    return code
+
+#------------------------------------------------------------------------------
+if __name__ == "__main__":
+    keywords = readList('sql.keywords')
+    types    = readList('sql.types')
+    if len(sys.argv) > 1:
+        sources = [(fname, [line.decode('utf-8','replace') for line in open(fname)]) for fname in sys.argv[1:]]
+    else:
+        sources = [('generated', sampleCode())]
+    for name, code in sources:
+        start = time.time()
+        previous = hypercode_previous(code, keywords, types)
+        tprev = time.time() - start
+        start = time.time()
+        current = hypercode(code, keywords, types)
+        tcur = time.time() - start
+        print '%s (%d lines): previous %.3fs, current %.3fs (x%.1f)%s' % (name, len(code), tprev, tcur,
+              tprev / max(tcur, 0.001), ['', ' - OUTPUT DIFFERS!'][previous != current])
@@ -0,0 +1,87 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark for the regular expressions used in the scanner loop: runs the
+per-line comment strip and eatStrings over the given SQL files (or, if none are
+given, a generated package body of 10,000 lines), and obtains the per-object
+parameter patterns for all procedures found (twice, as for a package spec and
+its body) - once compiling the patterns inline as was done before, once with
+the precompiled registry (hypercore.patterns) - makes sure both produce the
+same results, and reports the time taken per line resp. per pattern.
+Usage: python tools/bench_patterns.py [file.sql ...]
+"""
+
+import os, sys, time, re
+basedir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0,os.path.join(basedir,'lib'))
+sys.path.insert(0,os.path.join(basedir,'tools'))
+from hypercore import patterns
+from bench_hypercode import sampleCode
+
+#------------------------------------------------------------------------------
+def lines_previous(lines):
+    """ Inline compiled patterns, as it was before (for comparison) """
+    result = []
+    for line in lines:
+        line = re.sub(re.compile("--[^']*?$" )  ,"" ,line)
+        line, matched = re.subn(re.compile("('[^']*')+"),"''",line)
+        result.append(line)
+    return result
+
+#------------------------------------------------------------------------------
+def names_previous(names):
+    """ Dynamic patterns via re.compile (i.e. the re module's cache) """
+    result = []
+    for name in names + names:
+        result.append(re.compile('(?ims)procedure\s+'+name+'\s*\((.*?)\)\s*[ia]s').pattern)
+    return result
+
+#------------------------------------------------------------------------------
+def lines_current(lines):
+    """ Precompiled patterns from the registry """
+    result = []
+    for line in lines:
+        line = patterns.inlineCommentEnd.sub("" ,line)
+        line, matched = patterns.string.subn("''",line)
+        result.append(line)
+    return result
+
+#------------------------------------------------------------------------------
+def names_current(names):
+    """ Dynamic patterns via the size-bounded compile cache """
+    result = []
+    for name in names + names:
+        result.append(patterns.compiled('(?ims)procedure\s+'+name+'\s*\((.*?)\)\s*[ia]s').pattern)
+    return result
+
+#------------------------------------------------------------------------------
+def timed(func,arg):
+    """
+    Run a function and measure the time it takes
+    @param function func function to run
+    @param mixed arg argument to pass
+    @return tuple (result, seconds)
+    """
+    start = time.time()
+    result = func(arg)
+    return result, time.time() - start
+
+#------------------------------------------------------------------------------
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sources = [(fname, open(fname).readlines()) for fname in sys.argv[1:]]
+    else:
+        sources = [('generated', [line.encode('utf-8') for line in sampleCode()])]
+    for name, code in sources:
+        names = re.findall(r'(?i)procedure\s+(\w+)', ''.join(code))
+        previous, tprev = timed(lines_previous, code)
+        current, tcur = timed(lines_current, code)
+        print '%s (%d lines): previous %.2fus/line, current %.2fus/line%s' % (name, len(code),
+              tprev*1000000/max(len(code),1), tcur*1000000/max(len(code),1),
+              ['', ' - RESULTS DIFFER!'][previous != current])
+        if not names: continue
+        previous, tprev = timed(names_previous, names)
+        current, tcur = timed(names_current, names)
+        print '%s (%d names): previous %.2fus/pattern, current %.2fus/pattern%s' % (name, len(names),
+              tprev*500000/len(names), tcur*500000/len(names),
+              ['', ' - RESULTS DIFFER!'][previous != current])
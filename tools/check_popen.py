@@ -0,0 +1,38 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Check for the timeout of iz_tools.system.popen(): runs a command which sleeps
+longer than the timeout given, and makes sure it is stopped (raising
+ProcessTimeout) when the timeout is reached - and not only when the command
+finished by itself. Also checks a command finishing in time still returns its
+output.
+Usage: python tools/check_popen.py
+"""
+
+import os, sys, time
+basedir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0,os.path.join(basedir,'lib'))
+from iz_tools.system import popen, ProcessTimeout
+
+#------------------------------------------------------------------------------
+if __name__ == "__main__":
+    failed = False
+    start = time.time()
+    try:
+        popen('sleep 4; echo done', 1)
+        print 'sleep 4 with timeout 1: not stopped - FAILED!'
+        failed = True
+    except ProcessTimeout:
+        took = time.time() - start
+        if took < 2:
+            print 'sleep 4 with timeout 1: stopped after %.2fs' % took
+        else:
+            print 'sleep 4 with timeout 1: stopped only after %.2fs - FAILED!' % took
+            failed = True
+    out, err = popen('echo done', 5)
+    if out.strip() == 'done':
+        print 'echo with timeout 5: finished in time'
+    else:
+        print 'echo with timeout 5: unexpected output %r - FAILED!' % out
+        failed = True
+    sys.exit(int(failed))